@@ -6,6 +6,7 @@ import { Message } from '../Message/Message';
 import { FontAwesomeIcon } from '@fortawesome/react-fontawesome';
 import { faPaperPlane, faWindowClose, faTimes, faLightbulb, faBoltLightning } from '@fortawesome/free-solid-svg-icons';
 import { Loading } from '../Loading/Loading';
+import { getClientId } from '@/hooks/useClientId';
 
 type Message = {
     role: string,
@@ -128,22 +129,84 @@ export const ChatBot = ({ fen , updateBoard, updateCause, closeChat, talkToGemin
         setMessages(newMessages);
         setPrompt("");
 
-        await axios.post(`${process.env.NEXT_PUBLIC_SERVER}/reinforced_chatbot`, {
-            prompt: storePrompt,
-            fen: fenString
-        }).then((response) => {
-
+        // Server-sent events: "node" when a pipeline step finishes, "token" for each
+        // commentary token and "done" with the verified answer.
+        const showAnswer = (answer: string) => {
             let newAnswer: Message = {
                 role: "assistant",
-                message: response.data.answer
+                message: answer
+            }
+
+            setMessages([...newMessages, newAnswer]);
+        }
+
+        let draft = "";
+        let finished = false;
+
+        const handleEvent = (event: string, data: any) => {
+            if (event === "token") {
+                draft += data.text;
+                showAnswer(draft);
+                setIsLoading(false);
+            }
+            else if (event === "node" && data.status === "Reflex") {
+                draft = ""; // The commentary is regenerated
+            }
+            else if (event === "done") {
+                finished = true;
+                showAnswer(data.answer);
+                setIsLoading(false);
+            }
+        }
+
+        try {
+            const response = await fetch(`${process.env.NEXT_PUBLIC_SERVER}/reinforced_chatbot/stream`, {
+                method: "POST",
+                headers: { "Content-Type": "application/json", "X-Client-Id": getClientId() },
+                body: JSON.stringify({
+                    prompt: storePrompt,
+                    fen: fenString
+                })
+            });
+
+            if (!response.ok || !response.body) {
+                throw new Error(`Stream request failed with status ${response.status}`);
             }
 
-            let updatedMessages = [...newMessages, newAnswer];
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = "";
 
-            setMessages(updatedMessages);
-            setIsLoading(false);
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) {
+                    break;
+                }
 
-        }).catch(error => console.log(error));
+                buffer += decoder.decode(value, { stream: true });
+                const events = buffer.split("\n\n");
+                buffer = events.pop() ?? "";
+
+                for (const block of events) {
+                    const lines = block.split("\n");
+                    const event = lines.find(line => line.startsWith("event: "))?.slice(7) ?? "message";
+                    const data = lines.find(line => line.startsWith("data: "))?.slice(6);
+                    if (data !== undefined) {
+                        handleEvent(event, JSON.parse(data));
+                    }
+                }
+            }
+        }
+        catch (error) {
+            console.log(error);
+        }
+        finally {
+            // The stream failed or ended without a "done" event
+            if (!finished) {
+                showAnswer(draft || "Try Again!");
+                setIsLoading(false);
+            }
+        }
     }
 
     const fetchChatResponse = async (event: any) => {
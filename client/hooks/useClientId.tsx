@@ -0,0 +1,22 @@
+import { useEffect } from "react";
+import axios from "axios";
+
+const STORAGE_KEY = "caissa-client-id";
+
+// Identifies this browser to the server, which keeps the conversation and current FEN per client.
+export const getClientId = (): string => {
+    let clientId = window.localStorage.getItem(STORAGE_KEY);
+
+    if (!clientId) {
+        clientId = window.crypto.randomUUID();
+        window.localStorage.setItem(STORAGE_KEY, clientId);
+    }
+
+    return clientId;
+}
+
+export const useClientId = () => {
+    useEffect(() => {
+        axios.defaults.headers.common["X-Client-Id"] = getClientId();
+    }, []);
+}
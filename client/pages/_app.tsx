@@ -1,7 +1,10 @@
 import "@/styles/globals.css";
 import type { AppProps } from "next/app";
+import { useClientId } from "@/hooks/useClientId";
 
 export default function App({ Component, pageProps }: AppProps) {
+  useClientId();
+
   return (
       <Component {...pageProps} />
   );
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Analyse a JSONL or CSV of puzzle positions with NeuroSymbolic.suggest.
+
+Each row needs a FEN and may carry moves and themes; the Lichess puzzle export
+(PuzzleId, FEN, Moves, Themes, ...) is read as is with --lichess. Results are
+appended to the output file as they complete, and positions already in the
+output file are skipped, so an interrupted run can simply be restarted.
+
+Example:
+    PYTHONPATH=. python3 scripts/analyze_batch.py --input lichess_db_puzzle.csv --lichess \
+        --output results.jsonl --workers 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+
+from server.batch import run_batch
+from server.neurosymbolicAI import NeuroSymbolic
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Bulk-analyse puzzle positions.")
+    parser.add_argument("--input", required=True, help="JSONL or CSV file of positions.")
+    parser.add_argument("--output", required=True, help="JSONL or CSV file results are appended to.")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("CAISSA_BATCH_WORKERS", "2")), help="Worker threads.")
+    parser.add_argument("--flush-every", type=int, default=50, help="Rows written between flushes (resume checkpoints).")
+    parser.add_argument("--no-predict", action="store_true", help="Only explain the given moves, skip ChessGPT predictions.")
+    parser.add_argument("--lichess", action="store_true", help="Apply the first move of each row, as in the Lichess puzzle export.")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    ns = NeuroSymbolic()
+
+    stats = run_batch(
+        ns,
+        args.input,
+        args.output,
+        workers=args.workers,
+        flush_every=args.flush_every,
+        predict=not args.no_predict,
+        lichess=args.lichess,
+    )
+
+    print(f"Analysed: {stats['analysed']} ({stats['failed']} failed)")
+    print(f"Skipped (already in output): {stats['skipped']}")
+    print(f"Elapsed: {stats['seconds']:.1f}s")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Compare the ReAct AgentExecutor path with the single-call DirectAgent path used by
+the Verifier and Builder agents, reporting latency and OpenAI token usage.
+
+The LLM cache is bypassed so every call reaches the API.
+
+Example:
+    PYTHONPATH=. python3 scripts/benchmark_agent_calls.py --iterations 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+
+from langchain.agents import AgentExecutor, create_react_agent
+from langchain.prompts import PromptTemplate
+from langchain_community.callbacks import get_openai_callback
+from langchain_community.chat_models import ChatOpenAI
+
+from server.config import get_secret
+from server.neurosymbolicAI.direct_agent import DirectAgent
+from server.prompts import BUILDER_AGENT_PROMPT, VERIFIER_FIX_PROMPT, VERIFIER_JSON_PROMPT
+
+CASES = {
+    "verifier_json": (
+        VERIFIER_JSON_PROMPT,
+        "The white knight at f3 defends the white pawn at e5 and the black queen is on d8.",
+    ),
+    "verifier_fix": (
+        VERIFIER_FIX_PROMPT,
+        str({"statement": "The queen is on d8", "piece": "queen", "color": "black", "position": "d8"}),
+    ),
+    "builder": (
+        BUILDER_AGENT_PROMPT,
+        "A move_threat_and_defend is a feature of a move that defend an ally piece and attack an opponent piece.",
+    ),
+}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark ReAct executors against direct agent calls.")
+    parser.add_argument("--iterations", type=int, default=3, help="Number of repetitions per case and path.")
+    parser.add_argument("--case", choices=sorted(CASES), action="append", help="Restrict to the given case(s).")
+    return parser.parse_args()
+
+
+def run(runner, text: str, iterations: int) -> tuple[list[float], list[int], str]:
+    durations: list[float] = []
+    tokens: list[int] = []
+    output = ""
+
+    for _ in range(iterations):
+        with get_openai_callback() as usage:
+            start = time.perf_counter()
+            output = runner.invoke({"input": text})["output"]
+            durations.append(time.perf_counter() - start)
+        tokens.append(usage.total_tokens)
+
+    return durations, tokens, output
+
+
+def main() -> int:
+    args = parse_args()
+    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0, api_key=get_secret("OPENAI_API_KEY"), cache=False)
+
+    for name in args.case or sorted(CASES):
+        template, text = CASES[name]
+        prompt = PromptTemplate.from_template(template)
+        runners = {
+            "react": AgentExecutor(
+                agent=create_react_agent(llm, [], prompt),
+                tools=[],
+                handle_parsing_errors="MUST return first Final Answer",
+            ),
+            "direct": DirectAgent(llm, prompt),
+        }
+
+        results = {path: run(runner, text, args.iterations) for path, runner in runners.items()}
+
+        print(f"== {name}")
+        for path, (durations, tokens, output) in results.items():
+            print(f"{path:>6}: mean {statistics.mean(durations):.3f}s, mean tokens {statistics.mean(tokens):.0f}")
+            print(f"        output: {output}")
+
+        react_tokens = statistics.mean(results["react"][1])
+        direct_tokens = statistics.mean(results["direct"][1])
+        react_time = statistics.mean(results["react"][0])
+        direct_time = statistics.mean(results["direct"][0])
+        print(f"saving: {react_time - direct_time:.3f}s, {react_tokens - direct_tokens:.0f} tokens per call")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
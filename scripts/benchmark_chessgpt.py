@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Compare ChessGPT inference modes on CPU: generated tokens per second and memory.
+
+Every mode is loaded in a fresh process, so the resident set size it reports
+only holds that one model. The modes are float32 (the default), int8
+(dynamic quantisation of the linear layers, CAISSA_LLM_INT8=1) and onnx (ONNX Runtime, needs
+optimum[onnxruntime]).
+
+Example:
+    PYTHONPATH=. python3 scripts/benchmark_chessgpt.py --modes float32 int8 --threads 8 --iterations 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+FEN = "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3"
+MODES = {
+    "float32": {"int8": False, "backend": "torch"},
+    "int8": {"int8": True, "backend": "torch"},
+    "onnx": {"int8": False, "backend": "onnx"},
+}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark ChessGPT inference modes.")
+    parser.add_argument("--modes", nargs="+", default=["float32", "int8"], choices=sorted(MODES), help="Modes to compare.")
+    parser.add_argument("--threads", type=int, default=0, help="Torch intra-op threads, 0 keeps the torch default.")
+    parser.add_argument("--iterations", type=int, default=5, help="Generations per mode.")
+    parser.add_argument("--max-new-tokens", type=int, default=64, help="Tokens generated per iteration.")
+    parser.add_argument("--single", choices=sorted(MODES), help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # peak resident set size, in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_mode(mode: str, args: argparse.Namespace) -> dict:
+    from server.neurosymbolicAI.llmAI import llm_ai
+
+    # one prompt at a time, the batcher would only add its wait window
+    llm_ai.BATCH_SIZE = 1
+    before = rss_mb()
+    start = time.perf_counter()
+    model = llm_ai.ChessGPT(threads=args.threads, **MODES[mode])
+    load_seconds = time.perf_counter() - start
+
+    prompt = f"With the FEN board state {FEN} give next UCI move?"
+    settings = {"max_new_tokens": args.max_new_tokens, "min_new_tokens": args.max_new_tokens, "do_sample": False}
+    model.generate_batch([prompt], settings)  # warm-up
+
+    tokens = 0
+    start = time.perf_counter()
+    for _ in range(args.iterations):
+        completion = model.generate_batch([prompt], settings)[0]
+        tokens += len(model.tokenizer(completion).input_ids)
+    seconds = time.perf_counter() - start
+
+    return {
+        "mode": mode,
+        "backend": model.backend,
+        "quantized": model.quantized,
+        "load_seconds": round(load_seconds, 2),
+        "tokens_per_second": round(tokens / seconds, 2),
+        "rss_before_mb": round(before, 1),
+        "rss_after_mb": round(rss_mb(), 1),
+    }
+
+
+def main() -> int:
+    args = parse_args()
+
+    if args.single:
+        print(json.dumps(run_mode(args.single, args)))
+        return 0
+
+    results = []
+    for mode in args.modes:
+        command = [
+            sys.executable, __file__, "--single", mode,
+            "--threads", str(args.threads),
+            "--iterations", str(args.iterations),
+            "--max-new-tokens", str(args.max_new_tokens),
+        ]
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"{'Mode':<8} {'Backend':<8} {'Load (s)':>9} {'Tokens/s':>9} {'RSS (MB)':>9}")
+    for result in results:
+        print(f"{result['mode']:<8} {result['backend']:<8} {result['load_seconds']:>9} {result['tokens_per_second']:>9} {result['rss_after_mb']:>9}")
+
+    baseline = results[0]
+    for result in results[1:]:
+        speedup = result["tokens_per_second"] / baseline["tokens_per_second"]
+        memory = result["rss_after_mb"] / baseline["rss_after_mb"]
+        print(f"{result['mode']} vs {baseline['mode']}: {speedup:.2f}x tokens/s, {memory:.2f}x RSS")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
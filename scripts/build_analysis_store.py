@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Prebuild the analysis store loaded by the server with CAISSA_ANALYSIS_STORE.
+
+Positions are collected from PGN games (the first --plies half-moves of each
+game) and EPD files, ranked by how often they occur, and the most frequent ones
+are analysed with the same construct_graph and tactic sweep as /set_fen. The
+starting position is always included. Positions already in the output store are
+kept and not analysed again unless --rebuild is given.
+
+Example:
+    PYTHONPATH=. python3 scripts/build_analysis_store.py --corpus openings.pgn puzzles.epd \
+        --output analysis.store --plies 16 --limit 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from collections import Counter
+
+import chess
+import chess.pgn
+
+from server import server as server_module
+from server.analysis_store import load_store, write_store
+from server.neurosymbolicAI.symbolicAI.symbolic_ai import RecordingGraph, Symbolic
+from server.speculation import position_key
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build the prebuilt position analysis store.")
+    parser.add_argument("--corpus", nargs="+", default=[], help="PGN or EPD files to collect positions from.")
+    parser.add_argument("--output", required=True, help="Store file to write.")
+    parser.add_argument(
+        "--kb-path",
+        default=os.getenv("KB_PATH", "server/neurosymbolicAI/symbolicAI/general.pl"),
+        help="Path to the Prolog knowledge base.",
+    )
+    parser.add_argument("--plies", type=int, default=16, help="Half-moves of each PGN game to collect.")
+    parser.add_argument("--min-count", type=int, default=1, help="Occurrences a position needs to be analysed.")
+    parser.add_argument("--limit", type=int, default=5000, help="Maximum number of positions in the store.")
+    parser.add_argument("--rebuild", action="store_true", help="Analyse every position again instead of keeping the existing store.")
+    return parser.parse_args()
+
+
+def pgn_positions(path: str, plies: int):
+    with open(path, encoding="utf-8", errors="replace") as file:
+        while (game := chess.pgn.read_game(file)) is not None:
+            board = game.board()
+            yield board.fen()
+            for move in list(game.mainline_moves())[:plies]:
+                board.push(move)
+                yield board.fen()
+
+
+def epd_positions(path: str):
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            fields = line.split()
+            if len(fields) >= 4:
+                yield " ".join(fields[:4]) + " 0 1"
+
+
+def collect_positions(paths, plies: int) -> Counter:
+    counts = Counter({chess.STARTING_FEN: 1})
+    for path in paths:
+        positions = epd_positions(path) if path.lower().endswith(".epd") else pgn_positions(path, plies)
+        counts.update(positions)
+    return counts
+
+
+def main() -> int:
+    args = parse_args()
+
+    # keys of a store are piece placements, which write_store accepts as FENs
+    existing = {}
+    if os.path.exists(args.output) and not args.rebuild:
+        store = load_store(args.output)
+        if store is not None:
+            existing = dict(store.items())
+            store.close()
+
+    counts = collect_positions(args.corpus, args.plies)
+    ranked = [fen for fen, count in counts.most_common() if count >= args.min_count or fen == chess.STARTING_FEN]
+    todo = [fen for fen in ranked[:args.limit] if position_key(fen) not in existing]
+    print(f"Positions collected: {len(counts)}, kept from the store: {len(existing)}, to analyse: {len(todo)}")
+
+    recorder = Symbolic(graph=RecordingGraph())
+    recorder.consult(args.kb_path)
+    analyses = dict(existing)
+    start = time.perf_counter()
+
+    for index, fen in enumerate(todo, 1):
+        recorder.update_board(fen)
+        recorder.construct_graph()
+        server_module.add_tactics_to_graph(args.kb_path, fen, symbolic_instance=recorder)
+        analyses[position_key(fen)] = recorder.graph.take()
+        if index % 50 == 0:
+            print(f"Analysed {index}/{len(todo)} in {time.perf_counter() - start:.1f}s")
+
+    written = write_store(args.output, analyses.items())
+    print(f"Wrote {written} positions to {args.output} ({os.path.getsize(args.output)} bytes)")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Save a local safetensors copy of the ChessGPT weights for CAISSA_LLM_WEIGHTS_DIR.
+
+Safetensors files are memory-mapped when the model loads, so every worker
+process pointing at the same copy shares its pages through the page cache.
+The weights are stored in the dtype the server loads them with (float32 on
+CPU, float16 on GPU) so loading does not have to convert, and copy, them.
+int8 quantisation is off by default; CAISSA_LLM_INT8=1 creates per-process
+copies of the linear layers.
+
+Example:
+    PYTHONPATH=. python3 scripts/export_chessgpt.py --output models/chessgpt --dtype float32
+    CAISSA_LLM_WEIGHTS_DIR=models/chessgpt uvicorn server.asgi:app --workers 4
+"""
+
+from __future__ import annotations
+
+import argparse
+
+import torch
+from transformers import AutoModelForCausalLM, AutoTokenizer
+
+from server.neurosymbolicAI.llmAI.llm_ai import MODEL_ID
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Export ChessGPT weights as safetensors.")
+    parser.add_argument("--output", required=True, help="Directory to write the model to.")
+    parser.add_argument("--dtype", default="float32", choices=["float32", "float16", "bfloat16"], help="Stored dtype.")
+    parser.add_argument("--max-shard-size", default="2GB", help="Largest safetensors file.")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_ID)
+    model = AutoModelForCausalLM.from_pretrained(
+        MODEL_ID,
+        low_cpu_mem_usage=True,
+        trust_remote_code=True,
+        torch_dtype=getattr(torch, args.dtype),
+    )
+
+    model.save_pretrained(args.output, safe_serialization=True, max_shard_size=args.max_shard_size)
+    tokenizer.save_pretrained(args.output)
+    print(f"Saved {MODEL_ID} ({args.dtype}) to {args.output}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
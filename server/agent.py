@@ -1,7 +1,6 @@
 from pydoc import describe
 from langchain.agents import AgentExecutor, create_react_agent
 from langchain.tools import Tool
-from langchain.chains.conversation.memory import ConversationBufferWindowMemory
 from langchain.prompts import PromptTemplate
 from langchain import hub
 # from gemini_llm import llm
@@ -69,5 +68,13 @@ def generate_response(prompt):
     
     return response['output']
 
+async def agenerate_response(prompt):
+    """
+    Async version of generate_response, awaiting the Conversational agent.
+    """
+    response = await agent_executor.ainvoke({"input": prompt})
+    
+    return response['output']
+
 
     
@@ -0,0 +1,173 @@
+'''
+Read-only store of prebuilt position analyses.
+
+The knowledge graph of a position is the same every time it is built, so the
+positions the UI loads most (the starting position, common openings, puzzle
+sets) can be analysed offline with scripts/build_analysis_store.py. The store
+keeps the graph writes of each position, keyed by its piece placement (see
+speculation.position_key, used when writing and looking up), in one file that is memory-mapped at server start: /set_fen for a
+known position replays the writes instead of running the Prolog tactics.
+
+File layout (little endian):
+    magic, entry count (u64),
+    entry count x (data offset u64, key length u32, value length u32), sorted by key,
+    keys and values.
+Values are zlib-compressed JSON lists of [tx_function name, args].
+'''
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+from server.speculation import position_key
+
+MAGIC = b"CAISSA-ANALYSIS-2\n"
+_COUNT = struct.Struct("<Q")
+_ENTRY = struct.Struct("<QII")
+
+
+def encode_writes(writes) -> bytes:
+    '''
+    Serialise recorded (tx_function, args) graph writes.
+    '''
+    return zlib.compress(json.dumps([[getattr(tx_function, "__name__", tx_function), list(args)] for tx_function, args in writes]).encode("utf-8"))
+
+
+def decode_writes(data: bytes) -> list:
+    '''
+    Writes of encode_writes as (tx_function name, args), ready for InferenceGraph.replay.
+    '''
+    return [(name, tuple(args)) for name, args in json.loads(zlib.decompress(data))]
+
+
+def write_store(path: str, analyses) -> int:
+    '''
+    Write a store file, replacing the previous one once it is complete.
+
+    :param: :analyses: iterable of (fen, recorded writes)
+    :return: number of positions written
+    '''
+    entries = {}
+    for fen, writes in analyses:
+        entries[position_key(fen).encode("utf-8")] = encode_writes(writes)
+    keys = sorted(entries)
+
+    offset = len(MAGIC) + _COUNT.size + _ENTRY.size * len(keys)
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(MAGIC)
+        file.write(_COUNT.pack(len(keys)))
+        for key in keys:
+            file.write(_ENTRY.pack(offset, len(key), len(entries[key])))
+            offset += len(key) + len(entries[key])
+        for key in keys:
+            file.write(key)
+            file.write(entries[key])
+    os.replace(temporary, path)
+    return len(keys)
+
+
+class AnalysisStore:
+    '''
+    Memory-mapped, read-only view of a store file.
+
+    Lookups binary-search the sorted index in place, so opening the store costs
+    no more than mapping the file and only the pages that are read are loaded.
+
+    :param: :path: store file written by write_store
+    '''
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not an analysis store")
+        (self.count,) = _COUNT.unpack_from(self._map, len(MAGIC))
+        self._index = len(MAGIC) + _COUNT.size
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _entry(self, position: int):
+        offset, key_length, value_length = _ENTRY.unpack_from(self._map, self._index + position * _ENTRY.size)
+        return self._map[offset:offset + key_length], offset + key_length, value_length
+
+    def _find(self, fen: str):
+        try:
+            key = position_key(fen).encode("utf-8")
+        except ValueError:
+            return None
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            entry_key, value_offset, value_length = self._entry(middle)
+            if entry_key == key:
+                return value_offset, value_length
+            if entry_key < key:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def __contains__(self, fen: str) -> bool:
+        return self._find(fen) is not None
+
+    def get(self, fen: str):
+        '''
+        Graph writes of a position, None when it is not in the store.
+        '''
+        found = self._find(fen)
+        with self._lock:
+            if found is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        value_offset, value_length = found
+        return decode_writes(self._map[value_offset:value_offset + value_length])
+
+    def items(self):
+        '''
+        Iterate over (key, graph writes) of every position, in key order.
+        '''
+        for position in range(self.count):
+            key, value_offset, value_length = self._entry(position)
+            yield key.decode("utf-8"), decode_writes(self._map[value_offset:value_offset + value_length])
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "positions": self.count,
+                "bytes": len(self._map),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def load_store(path: str | None):
+    '''
+    Open the store at path, None when no path is set or the file cannot be read.
+    '''
+    if not path:
+        return None
+    try:
+        return AnalysisStore(path)
+    except (OSError, ValueError) as exc:
+        print(f"Analysis store {path} not loaded: {exc}")
+        return None
+
+
+__all__ = ["AnalysisStore", "decode_writes", "encode_writes", "load_store", "write_store"]
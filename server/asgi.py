@@ -0,0 +1,202 @@
+'''
+ASGI entry point serving the LLM-bound routes asynchronously.
+
+The Flask handlers of /chatbot, /reinforced_chatbot and /neurosym hold a worker
+thread for the whole multi-call LLM pipeline. Here those routes are coroutines:
+LLM calls are awaited through agent.agenerate_response and pipeline.achat /
+achat_stream, so one worker keeps many chat sessions in flight. Prolog-bound work
+(NeuroSymbolic.suggest) runs on a small dedicated thread pool, since the
+SWI-Prolog engine is shared by the whole process anyway. The remaining routes
+are served by the Flask app through WSGIMiddleware.
+
+Run with:
+    uvicorn server.asgi:app --workers 2
+'''
+
+from __future__ import annotations
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.wsgi import WSGIMiddleware
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+from server import server as flask_server
+from server.agent import agenerate_response
+from server.neurosymbolicAI.symbolicAI.symbolic_ai import prolog_lock
+from server.pipeline import achat, achat_stream
+from server.pool import pool_size
+from server.sessions import session_store
+from server.streaming import sse
+
+# Prolog-bound work, each call holds prolog_lock from binding the position to its last query
+prolog_executor = ThreadPoolExecutor(max_workers=pool_size("prolog", 1), thread_name_prefix="prolog")
+# LangGraph runs the sync pipeline nodes (verification, reflex checkpoint) on the loop's default executor
+BLOCKING_THREADS = int(os.getenv("CAISSA_ASGI_THREADS", "32"))
+
+
+async def run_prolog(func, *args):
+    '''
+    Run a Prolog-bound callable on the Prolog thread pool without blocking the event loop.
+    '''
+    return await asyncio.get_running_loop().run_in_executor(prolog_executor, func, *args)
+
+
+class PauseSpeculation:
+    '''
+    ASGI middleware pausing the speculative worker while a request is in flight.
+
+    The Flask before_request and teardown_request hooks only run for the mounted
+    routes, the native routes above also rebind the shared Prolog engine.
+    '''
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        speculator = flask_server.speculator
+        if scope["type"] != "http" or speculator is None:
+            await self.app(scope, receive, send)
+            return
+
+        # pause waits for the running speculative step, off the event loop
+        await asyncio.get_running_loop().run_in_executor(None, speculator.pause)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            speculator.resume()
+
+
+def current_session(request):
+    '''
+    Session of the client sending a request, keyed by its X-Client-Id header.
+    '''
+    client_id = request.headers.get('X-Client-Id') or (request.client.host if request.client else None) or "anonymous"
+    return session_store.get(client_id)
+
+
+async def post_message_with_reinforced_chatbot(request):
+    '''
+    Chat with Caïssa llm enhanced by langGraph.
+    '''
+    data = await request.json()
+    prompt = data.get('prompt')
+    session = current_session(request)
+    fen_string = data.get('fen') or session.fen
+    session.fen = fen_string
+
+    try:
+        result = await achat(input=prompt, fen_string=fen_string, details=True)
+    except Exception as e:
+        print(f"Error {e}")
+        result = {'answer': "Try Again!", 'reflex_iterations': 0, 'stop_reason': "error"}
+
+    session.record(prompt, result['answer'])
+    return JSONResponse({
+        'answer': result['answer'],
+        'reflex_iterations': result['reflex_iterations'],
+        'stop_reason': result['stop_reason'],
+    })
+
+
+async def stream_message_with_reinforced_chatbot(request):
+    '''
+    Chat with Caïssa llm enhanced by langGraph, streamed as server-sent events.
+    '''
+    data = await request.json()
+    prompt = data.get('prompt')
+    session = current_session(request)
+    fen_string = data.get('fen') or session.fen
+    session.fen = fen_string
+
+    async def events():
+        try:
+            async for event, payload in achat_stream(input=prompt, fen_string=fen_string):
+                if event == "done":
+                    session.record(prompt, payload['answer'])
+                yield sse(event, payload)
+        except Exception as e:
+            print(f"Error {e}")
+            yield sse("done", {'answer': "Try Again!", 'reflex_iterations': 0, 'stop_reason': "error"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={'Cache-Control': "no-cache", 'X-Accel-Buffering': "no"},
+    )
+
+
+async def post_message(request):
+    '''
+    Chat with Caïssa.
+    '''
+    data = await request.json()
+    prompt = data.get('prompt')
+    session = current_session(request)
+
+    try:
+        response = await agenerate_response(session.context(prompt))
+    except Exception as e:
+        print(f"Error {e}")
+        response = "Try Again!"
+
+    session.record(prompt, response)
+
+    return JSONResponse({
+        'answer': response,
+    })
+
+
+def _suggest(fen_string):
+    ns = flask_server.ns
+    # other requests, analysis jobs and the speculator rebind the shared engine
+    with prolog_lock:
+        ns.symbolic.parse_fen(fen_string)
+        return ns.suggest(fen_string = fen_string, move = None, test = False)
+
+
+async def post_tactic(request):
+    '''
+    Chat with neurosymbolic module.
+    '''
+    data = await request.json()
+    session = current_session(request)
+    session.fen = data.get('fen') or session.fen
+    response = await run_prolog(_suggest, session.fen)
+
+    return JSONResponse({
+        'answer': response
+    })
+
+
+@asynccontextmanager
+async def lifespan(app):
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=BLOCKING_THREADS, thread_name_prefix="pipeline")
+    )
+    yield
+
+
+app = Starlette(
+    routes=[
+        Route("/reinforced_chatbot", post_message_with_reinforced_chatbot, methods=['POST']),
+        Route("/reinforced_chatbot/stream", stream_message_with_reinforced_chatbot, methods=['POST']),
+        Route("/chatbot", post_message, methods=['POST']),
+        Route("/neurosym", post_tactic, methods=['POST']),
+        Mount("/", app=WSGIMiddleware(flask_server.app)),
+    ],
+    middleware=[
+        Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"]),
+        Middleware(PauseSpeculation),
+    ],
+    lifespan=lifespan,
+)
+
+
+__all__ = ["PauseSpeculation", "app", "run_prolog"]
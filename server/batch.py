@@ -0,0 +1,297 @@
+'''
+Bulk analysis of puzzle datasets.
+
+Positions are read from JSONL or CSV (the Lichess puzzle export works as is),
+analysed across a thread pool sharing one NeuroSymbolic instance, and written
+as they complete through a buffered writer that flushes every few rows. Rows
+already present in the output file are skipped, so an interrupted run resumes
+where its last flush left off.
+
+ChessGPT predictions run concurrently; the symbolic reasoning of a position holds
+prolog_lock, since parse_fen binds the process-wide Prolog engine to that position.
+NeuroSymbolic.reason works the tactics out on a RecordingGraph, so a batch never
+rewrites the knowledge graph the chat is querying.
+'''
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import chess
+
+RESULT_FIELDS = ("key", "fen", "best_move", "predicted_move", "themes", "tactics", "statement", "error")
+
+# accepted column names, the first ones match the Lichess puzzle export
+_COLUMNS = {
+    "key": ("PuzzleId", "id", "key"),
+    "fen": ("FEN", "fen", "fen_string"),
+    "moves": ("Moves", "moves", "best_move"),
+    "themes": ("Themes", "themes", "theme"),
+}
+
+
+def _field(row: dict, name: str):
+    for column in _COLUMNS[name]:
+        if row.get(column) not in (None, ""):
+            return row[column]
+    return None
+
+
+def _record(row: dict, index: int, lichess: bool) -> dict:
+    '''
+    Normalise one input row to {key, fen, best_move, themes, error}.
+
+    A row whose first move cannot be applied keeps its error, so it is reported as
+    one failed position instead of stopping the run.
+
+    :param: :lichess: the first move is the opponent's move leading to the puzzle, as in the Lichess export
+    '''
+    fen = _field(row, "fen")
+    moves = _field(row, "moves")
+    moves = moves.split() if isinstance(moves, str) else list(moves or [])
+    themes = _field(row, "themes")
+    themes = themes.split() if isinstance(themes, str) else list(themes or [])
+    error = None
+
+    if lichess and fen and moves:
+        try:
+            board = chess.Board(fen)
+            board.push_uci(moves[0])
+            fen, moves = board.fen(), moves[1:]
+        except ValueError as exc:
+            error = f"cannot apply the first move {moves[0]}: {exc}"
+
+    key = _field(row, "key")
+    return {
+        "key": str(key) if key is not None else str(index),
+        "fen": fen,
+        "best_move": moves[0] if moves else None,
+        "themes": themes,
+        "error": error,
+    }
+
+
+def read_positions(stream, fmt: str, lichess: bool = False):
+    '''
+    Iterate over the positions of a JSONL or CSV stream.
+
+    :param: :stream: text stream or iterable of lines
+    :param: :fmt: "jsonl" or "csv"
+    :param: :lichess: apply the first move of each row before analysing, as in the Lichess puzzle export
+
+    :raises ValueError: when a JSONL line is not a JSON object
+    '''
+    if fmt == "csv":
+        rows = csv.DictReader(stream)
+    else:
+        rows = (_json_row(line, number) for number, line in enumerate(stream, 1) if line.strip())
+
+    for index, row in enumerate(rows):
+        yield _record(row, index, lichess)
+
+
+def _json_row(line: str, number: int) -> dict:
+    try:
+        row = json.loads(line)
+    except ValueError as exc:
+        raise ValueError(f"line {number} is not valid JSON: {exc}") from exc
+    if not isinstance(row, dict):
+        raise ValueError(f"line {number} is not a JSON object")
+    return row
+
+
+def input_format(path: str) -> str:
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+def _prolog_lock():
+    # imported on use so the server still starts when the symbolic dependencies are missing
+    try:  # pragma: no cover
+        from .neurosymbolicAI.symbolicAI.symbolic_ai import prolog_lock
+    except ImportError:  # pragma: no cover
+        from neurosymbolicAI.symbolicAI.symbolic_ai import prolog_lock
+    return prolog_lock
+
+
+def analyse_record(ns, record: dict, predict: bool = True) -> dict:
+    '''
+    Analyse one position with NeuroSymbolic.suggest.
+
+    :param: :ns: shared NeuroSymbolic instance
+    :param: :record: normalised position from read_positions
+    :param: :predict: ask ChessGPT for its move, otherwise only the best move is explained
+    '''
+    result = {field: None for field in RESULT_FIELDS}
+    result.update(key=record["key"], fen=record["fen"], best_move=record["best_move"], themes=record["themes"], tactics=[])
+
+    try:
+        if record.get("error"):
+            raise ValueError(record["error"])
+        if not record["fen"]:
+            raise ValueError("missing FEN")
+        predicted_move = ns.predict(record["fen"]) if predict else None
+        move = record["best_move"] or predicted_move
+        if not move:
+            raise ValueError("no move to explain")
+
+        with _prolog_lock():
+            reason = ns.suggest(record["fen"], move, True)
+
+        # suggest reports a bad position or move as a message, or as a tuple led by "Error: ..."
+        if isinstance(reason, str):
+            raise ValueError(reason)
+        if str(reason[0]).startswith("Error:"):
+            raise ValueError(reason[0])
+        result["predicted_move"] = predicted_move
+        result["statement"] = reason[0]
+        result["tactics"] = [item[0] for item in reason[2]]
+    except Exception as exc:
+        result["error"] = str(exc)
+
+    return result
+
+
+def analyse_batch(ns, records, workers: int = 2, skip=frozenset(), predict: bool = True):
+    '''
+    Analyse positions on a thread pool, yielding the results as they complete.
+
+    At most a few positions per worker are in flight, so large datasets are streamed
+    rather than loaded.
+
+    :param: :skip: keys of positions already analysed
+    '''
+    window = max(workers, 1) * 4
+    with ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="batch") as executor:
+        pending = set()
+        for record in records:
+            if record["key"] in skip:
+                continue
+            pending.add(executor.submit(analyse_record, ns, record, predict))
+            if len(pending) >= window:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    yield future.result()
+        for future in pending:
+            yield future.result()
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as file:
+        file.seek(-1, os.SEEK_END)
+        return file.read(1) == b"\n"
+
+
+class ResultWriter:
+    '''
+    Buffered JSONL or CSV writer for analysis results.
+
+    :param: :path: output file, appended to
+    :param: :flush_every: rows written between flushes, each flush is a resume checkpoint
+    '''
+
+    def __init__(self, path: str, flush_every: int = 50):
+        self.path = path
+        self.flush_every = flush_every
+        self.format = input_format(path)
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "a", newline="", encoding="utf-8", buffering=1 << 16)
+        self._csv = csv.DictWriter(self._file, fieldnames=RESULT_FIELDS) if self.format == "csv" else None
+        if self._csv is not None and new_file:
+            self._csv.writeheader()
+        elif not new_file and not _ends_with_newline(path):
+            self._file.write("\n")  # the last row was cut short by an interrupted run
+        self._lock = threading.Lock()
+        self._unflushed = 0
+        self.written = 0
+
+    def write(self, result: dict) -> None:
+        with self._lock:
+            if self._csv is not None:
+                self._csv.writerow({field: json.dumps(value) if isinstance(value, list) else value for field, value in result.items()})
+            else:
+                self._file.write(json.dumps(result) + "\n")
+            self.written += 1
+            self._unflushed += 1
+            if self._unflushed >= self.flush_every:
+                self._file.flush()
+                self._unflushed = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def completed_keys(path: str) -> set:
+    '''
+    Keys of the positions already written to an output file, read to resume a run.
+    '''
+    if not os.path.exists(path):
+        return set()
+
+    with open(path, newline="", encoding="utf-8") as file:
+        if input_format(path) == "csv":
+            return {row["key"] for row in csv.DictReader(file) if row.get("key")}
+        keys = set()
+        for line in file:
+            try:
+                keys.add(json.loads(line)["key"])
+            except (ValueError, KeyError):
+                pass  # a line cut short by an interrupted run
+        return keys
+
+
+def run_batch(ns, input_path: str, output_path: str, workers: int = 2, flush_every: int = 50, predict: bool = True, lichess: bool = False) -> dict:
+    '''
+    Analyse every position of an input file into an output file, resuming from the positions already written.
+
+    :return: counts of the positions analysed, skipped and failed, and the elapsed seconds
+    '''
+    skip = completed_keys(output_path)
+    start = time.perf_counter()
+    failed = 0
+
+    with open(input_path, newline="", encoding="utf-8") as source, ResultWriter(output_path, flush_every) as writer:
+        records = read_positions(source, input_format(input_path), lichess=lichess)
+        for result in analyse_batch(ns, records, workers=workers, skip=skip, predict=predict):
+            writer.write(result)
+            failed += result["error"] is not None
+
+    return {
+        "analysed": writer.written,
+        "skipped": len(skip),
+        "failed": failed,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def parse_upload(text: str, fmt: str, lichess: bool = False) -> list:
+    '''
+    Positions of a JSONL or CSV request body.
+
+    :raises ValueError: when a JSONL line is not a JSON object
+    '''
+    return list(read_positions(io.StringIO(text), fmt, lichess=lichess))
+
+
+__all__ = [
+    "RESULT_FIELDS",
+    "ResultWriter",
+    "analyse_batch",
+    "analyse_record",
+    "completed_keys",
+    "parse_upload",
+    "read_positions",
+    "run_batch",
+]
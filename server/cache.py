@@ -0,0 +1,98 @@
+'''
+In-process caches shared by the knowledge graph and the chatbot tools, and the
+Cypher that versions the knowledge graph they cache.
+'''
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    '''
+    Thread-safe least-recently-used cache with an optional time-to-live.
+
+    :param: :maxsize: number of entries kept before the oldest one is evicted, 0 disables caching
+    :param: :ttl: seconds an entry stays valid, None keeps entries until they are evicted
+    '''
+
+    _MISSING = object()
+
+    def __init__(self, maxsize: int = 1024, ttl: float | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, self._MISSING)
+            if entry is not self._MISSING:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value) -> None:
+        if self.maxsize <= 0:
+            return
+        expires_at = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key, loader):
+        '''
+        Return the cached value for key, calling loader and storing its result on a miss.
+        '''
+        value = self.get(key, self._MISSING)
+        if value is self._MISSING:
+            value = loader()
+            self.set(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            if self._data:
+                self._data.clear()
+                self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+# The knowledge graph is shared by every worker process, so its version lives in
+# the database: each write transaction replaces the token on a single GraphVersion
+# node, and read caches key their entries by the token they read before querying.
+# A random token rather than a counter, since delete_all_nodes removes the node.
+GRAPH_VERSION_BUMP = "MERGE (v:GraphVersion {name: 'caissa'}) SET v.token = randomUUID()"
+GRAPH_VERSION_QUERY = "OPTIONAL MATCH (v:GraphVersion {name: 'caissa'}) RETURN v.token AS token"
+
+__all__ = ["LRUCache", "GRAPH_VERSION_BUMP", "GRAPH_VERSION_QUERY"]
@@ -0,0 +1,317 @@
+'''
+Background jobs for the full-position analysis.
+
+Building the knowledge graph of a position (construct_graph plus the tactic sweep
+of add_tactics_to_graph) takes seconds to tens of seconds. JobQueue runs that work
+on background worker threads: a caller submits a FEN, gets a job id at once, and
+either polls the job or is notified through a webhook when the graph is ready.
+Pending jobs for the same FEN are coalesced.
+
+Jobs are also written to a SQLite JobStore, so that with several server worker
+processes a job submitted to one of them can be polled through any other.
+
+Webhooks are only sent to http(s) URLs on the hosts listed in the comma-separated
+CAISSA_WEBHOOK_HOSTS, so a client cannot make the server post to arbitrary
+addresses; with no hosts configured callbacks are refused.
+'''
+
+from __future__ import annotations
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import urllib.parse
+import urllib.request
+import uuid
+from collections import OrderedDict, deque
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def allowed_webhook_hosts() -> set:
+    '''
+    Hosts that may receive webhooks, read from CAISSA_WEBHOOK_HOSTS.
+    '''
+    return {host.strip().lower() for host in os.getenv("CAISSA_WEBHOOK_HOSTS", "").split(",") if host.strip()}
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # a redirect would send the job to a host that was never checked
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+_opener = urllib.request.build_opener(_NoRedirect)
+
+
+class Job:
+    '''
+    One analysis request.
+
+    :param: :fen: forsyth-edwards notation to analyse
+    :param: :callback_url: URL receiving the job as JSON once it finishes, None for polling only
+    '''
+
+    def __init__(self, fen: str, callback_url: str | None = None):
+        self.id = uuid.uuid4().hex
+        self.fen = fen
+        self.callback_url = callback_url
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.finished = threading.Event()
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Job":
+        '''
+        Rebuild a job, e.g. one loaded from a JobStore.
+        '''
+        job = cls(data["fen"])
+        job.id = data["job_id"]
+        for name in ("status", "result", "error", "submitted_at", "started_at", "finished_at"):
+            setattr(job, name, data[name])
+        if job.finished_at is not None:
+            job.finished.set()
+        return job
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "fen": self.fen,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(__file__), ".analysis_jobs.sqlite")
+
+
+class JobStore:
+    '''
+    SQLite table of analysis jobs shared by the server worker processes.
+
+    :param: :path: SQLite database file, ":memory:" keeps the jobs in the process
+    :param: :history: number of finished jobs kept
+    '''
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH, history: int = 1000):
+        self.path = path
+        self.history = history
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS analysis_jobs (
+                id TEXT PRIMARY KEY,
+                job TEXT NOT NULL,
+                finished_at REAL
+            )"""
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS analysis_jobs_finished_at ON analysis_jobs (finished_at)")
+        self._connection.commit()
+
+    def save(self, job: Job) -> None:
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO analysis_jobs (id, job, finished_at) VALUES (?, ?, ?)",
+                (job.id, json.dumps(job.to_dict(), default=str), job.finished_at),
+            )
+            if job.finished_at is not None:
+                self._connection.execute(
+                    "DELETE FROM analysis_jobs WHERE id IN (SELECT id FROM analysis_jobs WHERE finished_at IS NOT NULL ORDER BY finished_at DESC LIMIT -1 OFFSET ?)",
+                    (self.history,),
+                )
+            self._connection.commit()
+
+    def load(self, job_id: str):
+        with self._lock:
+            row = self._connection.execute("SELECT job FROM analysis_jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job.from_dict(json.loads(row[0])) if row is not None else None
+
+
+def build_job_store(history: int = 1000):
+    '''
+    Build the job store shared by the server workers from the environment.
+
+    CAISSA_JOB_STORE=0 disables it, CAISSA_JOB_STORE_PATH sets the SQLite file.
+
+    :return: a JobStore, or None when it is disabled
+    '''
+    if os.getenv("CAISSA_JOB_STORE", "1") == "0":
+        return None
+    return JobStore(os.getenv("CAISSA_JOB_STORE_PATH", DEFAULT_STORE_PATH), history=history)
+
+
+class JobQueue:
+    '''
+    Thread-backed queue running a handler on submitted FENs.
+
+    :param: :handler: callable taking a FEN, its return value becomes the job result
+    :param: :workers: number of worker threads, started on the first submit
+    :param: :history: number of finished jobs kept for polling
+    :param: :webhook_timeout: seconds to wait for a webhook to answer
+    :param: :webhook_hosts: hosts allowed in callback URLs, None reads CAISSA_WEBHOOK_HOSTS
+    :param: :store: JobStore the jobs are written to, so other processes can look them up
+    '''
+
+    def __init__(self, handler, workers: int = 1, history: int = 1000, webhook_timeout: float = 10, webhook_hosts=None, store=None):
+        self.handler = handler
+        self.store = store
+        self.workers = workers
+        self.history = history
+        self.webhook_timeout = webhook_timeout
+        self.webhook_hosts = {host.lower() for host in webhook_hosts} if webhook_hosts is not None else allowed_webhook_hosts()
+        self._queue = queue.Queue()
+        self._jobs = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        self._waits = deque(maxlen=1000)
+        self._runs = deque(maxlen=1000)
+        self.submitted = 0
+        self.coalesced = 0
+        self.completed = 0
+        self.failed = 0
+
+    def callback_allowed(self, callback_url: str) -> bool:
+        '''
+        Whether a webhook may be sent to callback_url: http or https on an allowed host.
+        '''
+        if not isinstance(callback_url, str):
+            return False
+        try:
+            parts = urllib.parse.urlsplit(callback_url)
+        except ValueError:
+            return False
+        return parts.scheme in ("http", "https") and (parts.hostname or "").lower() in self.webhook_hosts
+
+    def submit(self, fen: str, callback_url: str | None = None) -> Job:
+        '''
+        Queue the analysis of a FEN, reusing the pending job of the same FEN when there is one.
+
+        :raises ValueError: when callback_url is not allowed, see callback_allowed
+        '''
+        if callback_url is not None and not self.callback_allowed(callback_url):
+            raise ValueError(f"callback_url {callback_url!r} is not allowed")
+
+        with self._lock:
+            pending = self._pending.get(fen)
+            if pending is not None and callback_url is None:
+                self.coalesced += 1
+                return pending
+
+            job = Job(fen, callback_url)
+            self._jobs[job.id] = job
+            self._pending.setdefault(fen, job)
+            self.submitted += 1
+            self._start_workers()
+        self._save(job)
+        self._queue.put(job)
+        return job
+
+    def get(self, job_id: str):
+        '''
+        Look a job up, falling back to the store for jobs submitted to another process.
+        '''
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None and self.store is not None:
+            job = self.store.load(job_id)
+        return job
+
+    def _save(self, job: Job) -> None:
+        if self.store is None:
+            return
+        try:
+            self.store.save(job)
+        except sqlite3.Error as exc:
+            print(f"Saving analysis job {job.id} failed: {exc}")
+
+    def _start_workers(self) -> None:
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"analysis-{len(self._threads)}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _work(self) -> None:
+        while True:
+            self.run(self._queue.get())
+
+    def run(self, job: Job) -> None:
+        '''
+        Run one job on the calling thread.
+        '''
+        job.started_at = time.time()
+        job.status = RUNNING
+        self._save(job)
+        try:
+            job.result = self.handler(job.fen)
+            job.status = DONE
+        except Exception as exc:
+            print(f"Analysis job {job.id} failed: {exc}")
+            job.error = str(exc)
+            job.status = FAILED
+        job.finished_at = time.time()
+
+        with self._lock:
+            if self._pending.get(job.fen) is job:
+                del self._pending[job.fen]
+            self._waits.append(job.started_at - job.submitted_at)
+            self._runs.append(job.finished_at - job.started_at)
+            if job.status == DONE:
+                self.completed += 1
+            else:
+                self.failed += 1
+            self._trim()
+        self._save(job)
+        job.finished.set()
+
+        if job.callback_url:
+            self._notify(job)
+
+    def _trim(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished_at is not None]
+        for job_id in finished[:max(len(finished) - self.history, 0)]:
+            del self._jobs[job_id]
+
+    def _notify(self, job: Job) -> None:
+        request = urllib.request.Request(
+            job.callback_url,
+            data=json.dumps(job.to_dict(), default=str).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        try:
+            _opener.open(request, timeout=self.webhook_timeout).close()
+        except Exception as exc:
+            print(f"Webhook for analysis job {job.id} failed: {exc}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = sorted(self._waits)
+            runs = sorted(self._runs)
+            return {
+                "queue_depth": self._queue.qsize(),
+                "submitted": self.submitted,
+                "coalesced": self.coalesced,
+                "completed": self.completed,
+                "failed": self.failed,
+                "wait_mean": round(sum(waits) / len(waits), 4) if waits else 0.0,
+                "run_mean": round(sum(runs) / len(runs), 4) if runs else 0.0,
+                "run_p95": round(runs[int(0.95 * (len(runs) - 1))], 4) if runs else 0.0,
+            }
+
+
+__all__ = ["Job", "JobQueue", "JobStore", "build_job_store", "QUEUED", "RUNNING", "DONE", "FAILED", "allowed_webhook_hosts"]
@@ -1,8 +1,19 @@
 from langchain_community.chat_models import ChatOpenAI
 from server.config import get_secret
+from server.llm_cache import llm_cache
 
 llm = ChatOpenAI(
     model="gpt-4o-mini",
     temperature=0,
     api_key=get_secret("OPENAI_API_KEY"),
+    cache=llm_cache,
+)
+
+# Emits tokens to callbacks while generating, for the streaming chatbot route
+streaming_llm = ChatOpenAI(
+    model="gpt-4o-mini",
+    temperature=0,
+    api_key=get_secret("OPENAI_API_KEY"),
+    cache=llm_cache,
+    streaming=True,
 )
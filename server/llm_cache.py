@@ -0,0 +1,143 @@
+'''
+Persistent cache for LLM responses shared by the chatbot agents, the Verifier and the Builder.
+
+Every LLM of the server runs gpt-4o-mini at temperature 0, so replayed puzzles and
+benchmark runs send the exact same prompts again. The cache plugs into LangChain
+through the cache= argument of the chat models and stores generations in SQLite,
+keyed by the prompt and the model string LangChain derives from the model name and
+its parameters.
+'''
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+
+try:  # pragma: no cover
+    from . import metrics
+except ImportError:  # pragma: no cover
+    import metrics
+
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), ".llm_cache.sqlite")
+
+
+class SQLiteLLMCache(BaseCache):
+    '''
+    LangChain cache storing generations in a SQLite file, with a time-to-live and a size cap.
+
+    :param: :path: SQLite database file, ":memory:" keeps the cache in the process
+    :param: :maxsize: number of responses kept, the least recently used ones are evicted first
+    :param: :ttl: seconds a response stays valid, None keeps responses until they are evicted
+    '''
+
+    def __init__(self, path: str = DEFAULT_PATH, maxsize: int = 10000, ttl: float | None = None):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed_at ON llm_cache (accessed_at)")
+        self._connection.commit()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str):
+        key = self._key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute("SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl is not None and row[1] + self.ttl <= now:
+                self._connection.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._connection.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._connection.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._connection.commit()
+            self.hits += 1
+        return [loads(generation) for generation in json.loads(row[0])]
+
+    def update(self, prompt: str, llm_string: str, return_val) -> None:
+        if self.maxsize <= 0:
+            return
+        response = json.dumps([dumps(generation) for generation in return_val])
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, response, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (self._key(prompt, llm_string), response, now, now),
+            )
+            evicted = self._connection.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,),
+            ).rowcount
+            self._connection.commit()
+            self.evictions += max(evicted, 0)
+
+    def clear(self, **kwargs) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM llm_cache")
+            self._connection.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = self._connection.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "size": size,
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+def build_llm_cache():
+    '''
+    Build the process-wide LLM cache from the environment.
+
+    CAISSA_LLM_CACHE=0 disables caching, CAISSA_LLM_CACHE_PATH, CAISSA_LLM_CACHE_SIZE and
+    CAISSA_LLM_CACHE_TTL (seconds, 0 for no expiry) configure it.
+
+    :return: a SQLiteLLMCache, or None when caching is disabled
+    '''
+    if os.getenv("CAISSA_LLM_CACHE", "1") == "0":
+        return None
+
+    ttl = float(os.getenv("CAISSA_LLM_CACHE_TTL", str(7 * 24 * 3600)))
+    return SQLiteLLMCache(
+        path=os.getenv("CAISSA_LLM_CACHE_PATH", DEFAULT_PATH),
+        maxsize=int(os.getenv("CAISSA_LLM_CACHE_SIZE", "10000")),
+        ttl=ttl or None,
+    )
+
+
+llm_cache = build_llm_cache()
+
+if llm_cache is not None:  # pragma: no branch
+    metrics.register("llm_cache", llm_cache.stats)
+
+
+__all__ = ["SQLiteLLMCache", "build_llm_cache", "llm_cache"]
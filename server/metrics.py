@@ -0,0 +1,44 @@
+'''
+Process-wide registry of runtime counters exposed through the /metrics route.
+'''
+
+from __future__ import annotations
+
+import threading
+
+_providers = {}
+_lock = threading.Lock()
+
+
+def register(name: str, provider) -> None:
+    '''
+    Register a metrics provider under a name.
+
+    :param: :name: key used in the metrics snapshot
+    :param: :provider: zero-argument callable returning a JSON-serialisable dict
+
+    :return: #### None
+    '''
+    with _lock:
+        _providers[name] = provider
+
+
+def snapshot() -> dict:
+    '''
+    Collect the current value of every registered provider.
+
+    :return: dict mapping provider names to their metrics
+    '''
+    with _lock:
+        providers = dict(_providers)
+
+    result = {}
+    for name, provider in providers.items():
+        try:
+            result[name] = provider()
+        except Exception as exc:  # noqa: BLE001 - metrics must never break the caller
+            result[name] = {"error": str(exc)}
+    return result
+
+
+__all__ = ["register", "snapshot"]
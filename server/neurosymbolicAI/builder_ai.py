@@ -6,7 +6,9 @@ from langchain.agents import AgentExecutor, create_react_agent
 from langchain_core.output_parsers import JsonOutputParser
 from pydantic import BaseModel, Field
 from .symbolicAI import Symbolic
+from .direct_agent import DirectAgent, direct_agents_enabled
 from server.config import get_secret
+from server.llm_cache import llm_cache
 try:  # pragma: no cover
     from ..prompts import BUILDER_AGENT_PROMPT
 except ImportError:  # pragma: no cover
@@ -38,6 +40,7 @@ class Builder:
             model="gpt-4o-mini",
             temperature=0,
             api_key=get_secret("OPENAI_API_KEY"),
+            cache=llm_cache,
         )
 
         self.sym = Symbolic()
@@ -45,13 +48,16 @@ class Builder:
 
         self.parser = JsonOutputParser(pydantic_object=Relation)
         self.agent_prompt = PromptTemplate.from_template(BUILDER_AGENT_PROMPT)
-        self.agent = create_react_agent(self.llm, [], self.agent_prompt)
-        self.agent_executor = AgentExecutor(
-            agent=self.agent,
-            tools=[],
-            verbose=True,
-            handle_parsing_errors="MUST return first Final Answer",
-        )
+        if direct_agents_enabled():
+            self.agent_executor = DirectAgent(self.llm, self.agent_prompt)
+        else:
+            self.agent = create_react_agent(self.llm, [], self.agent_prompt)
+            self.agent_executor = AgentExecutor(
+                agent=self.agent,
+                tools=[],
+                verbose=True,
+                handle_parsing_errors="MUST return first Final Answer",
+            )
 
     def parse_fen(self, fen_string: str) -> None:
         self.sym.parse_fen(fen_string)
@@ -92,39 +98,30 @@ class Builder:
         print("feature_relationships:", feature_relationships)
         print("type(feature_relationships):", type(feature_relationships))
 
-        list_of_moves = []
-        initial_flag = True
+        list_of_moves = None
 
         for index in range(len(feature_relationships)):
             relation_name = feature_relationships[f"relation_{index + 1}"]
             print("relation_name:", relation_name)
 
             records = self.sym.graph.find_moves(relation_name)
-            print("records:", records)
-
-            relation_list = []
-            for record in records:
-                piece = record["piece"]
-                color = record["color"]
-                from_position = record["from"]
-                to_position = record["to"]
-
-                move_tuple = (piece, color, from_position, to_position)
-                relation_list.append(move_tuple)
-
-                print("piece:", record["piece"])
-                print("color:", record["color"])
-                print("from:", record["from"])
-                print("to:", record["to"])
-
-            if initial_flag:
-                list_of_moves = relation_list
-                initial_flag = False
+            print("records:", len(records))
+
+            relation_moves = [
+                (record["piece"], record["color"], record["from"], record["to"])
+                for record in records
+            ]
+
+            if list_of_moves is None:
+                # keep the first relation's ordering, dropping duplicate edges
+                list_of_moves = list(dict.fromkeys(relation_moves))
             else:
-                common_list = [piece for piece in relation_list if piece in list_of_moves]
-                list_of_moves = common_list
+                relation_set = set(relation_moves)
+                list_of_moves = [move for move in list_of_moves if move in relation_set]
+
+            if not list_of_moves:
+                break
 
+        list_of_moves = list_of_moves or []
         print("list_of_moves:", list_of_moves)
-        for elem in list_of_moves:
-            piece, color, from_position, to_position = elem
-            self.sym.graph.build_feature(piece, color, from_position, to_position, feature_name)
+        self.sym.graph.build_features(list_of_moves, feature_name)
@@ -0,0 +1,263 @@
+'''
+Rule-based claim extraction for the verifier.
+
+Most commentary checked by the Verifier is produced by NeuroSymbolic.suggest and
+give_move_description from fixed sentence templates. Those sentences (and a few
+common free-text shapes) are parsed here with regular expressions into the same
+claim dictionaries Verifier.extract_claims builds from the LLM, so only the
+sentences no rule recognises are sent to the LLM.
+'''
+
+from __future__ import annotations
+
+import re
+import threading
+
+from server import metrics
+
+_ALLY_FIELDS = ("ally_piece", "ally_color", "ally_position")
+_OPPONENT_FIELDS = ("opponent_piece", "opponent_color", "opponent_position")
+CLAIM_FIELDS = {
+    "positions": ("piece", "color", "position"),
+    "relations": ("piece", "color", "position", "relation") + _ALLY_FIELDS + _OPPONENT_FIELDS,
+    "move_features": ("piece", "color", "position", "move", "feature") + _ALLY_FIELDS + _OPPONENT_FIELDS,
+}
+
+_COLOR = r"white|black"
+_PIECE = r"king|queen|rook|bishop|knight|pawn"
+_SQUARE = r"[a-h][1-8]"
+
+
+def _ref(named: bool = True) -> str:
+    # "white knight at f3", "the black queen is on d8"
+    group = (lambda field: f"?P<{field}>") if named else (lambda field: "?:")
+    return (
+        rf"(?:the )?({group('color')}{_COLOR}) ({group('piece')}{_PIECE}) "
+        rf"(?:is )?(?:at|on) ({group('position')}{_SQUARE})"
+    )
+
+
+def _ref_list(name: str) -> str:
+    return rf"(?P<{name}>{_ref(False)}(?:(?:,| and|, and) {_ref(False)})*)"
+
+
+# a claim names at least a colour or a piece, plural as in "both rooks"
+_HAS_SUBJECT = re.compile(rf"\b(?:{_COLOR}|{_PIECE})s?\b", re.IGNORECASE)
+# give_move_description joins some sentences without a space ("... at e2.The opponent ...")
+_SENTENCE_END = re.compile(r"(?<=[.!?])(?:\s+|(?=[A-Z]))")
+_REF = re.compile(_ref())
+
+# give_move_description
+_MOVE_HEADER = re.compile(rf"the move of (?P<color>{_COLOR}) (?P<piece>{_PIECE}) from (?P<position>{_SQUARE}) to (?P<move>{_SQUARE})")
+_MOVE_LIST = re.compile(
+    r"the (?:ally|opponent) pieces that (?P<kind>defend the move|attacks? the move|are defended by the move|are attacked by the move) are "
+    + _ref_list("targets")
+)
+_MOVE_LIST_FEATURES = {
+    "defend the move": "move_is_protected",
+    "attack the move": "move_is_attacked",
+    "attacks the move": "move_is_attacked",
+    "are defended by the move": "move_defend",
+    "are attacked by the move": "move_threat",
+}
+_COUNTER_ATTACKS = re.compile(rf"the counter attacks? that can be done by (?:{_COLOR}) (?:is|are) (?P<moves>.+)")
+_COUNTER_MOVE = re.compile(rf"(?P<color>{_COLOR}) (?P<piece>{_PIECE}) from (?P<position>{_SQUARE}) to {_SQUARE}")
+
+# NeuroSymbolic.suggest
+# the tactic definitions after "I am using ... tactic" mention kings but say nothing about the board
+_DEFINITION = re.compile(
+    r"an? (?:discovered attack|fork|skewer|pin|interference|hanging piece|mate|matein2) (?:is|happens|consists) .+"
+)
+_FORK = re.compile(
+    rf"(?P<color>{_COLOR}) (?P<piece>{_PIECE}) at (?P<position>{_SQUARE}) moves to (?P<move>{_SQUARE}) to attack "
+    + _ref_list("targets")
+)
+_HANGING = re.compile(
+    rf"(?P<color>{_COLOR}) (?P<piece>{_PIECE}) attacks (?P<opponent_color>{_COLOR}) (?P<opponent_piece>{_PIECE}) "
+    rf"by moving from (?P<position>{_SQUARE}) to (?P<move>{_SQUARE})"
+)
+_TACTIC_OUTCOME = re.compile(r"to be able to attack|to be skewed for|to be pinned for|\binterfers?\b|to be in checkmate|\bthen\b")
+_MOVER = re.compile(
+    rf"(?:by moving )?(?P<color>{_COLOR}) (?P<piece>{_PIECE}) (?:(?:moves?|moving) )?from (?P<position>{_SQUARE}) to {_SQUARE}"
+)
+
+# free text
+_MOVE_FEATURE = re.compile(
+    rf"(?:the )?(?P<color>{_COLOR}) (?P<piece>{_PIECE}) (?:moves?|moving) from (?P<position>{_SQUARE}) to (?P<move>{_SQUARE}) "
+    r"(?:and )?(?P<verb>threatens|attacks|defends|protects) "
+    + _ref_list("targets")
+)
+_RELATION = re.compile(_ref() + r" (?P<verb>threatens|attacks|defends|protects) " + _ref_list("targets"))
+_POSITION = re.compile(_ref())
+
+_THREAT_VERBS = ("threatens", "attacks")
+
+_lock = threading.Lock()
+_counts = {"sentences": 0, "matched": 0, "fallback": 0}
+
+
+def _claim(kind: str, statement: str, **values) -> tuple:
+    claim = {"statement": statement}
+    for field in CLAIM_FIELDS[kind]:
+        claim[field] = values.get(field, "N/A")
+    return kind, claim
+
+
+def _position_claim(color, piece, position) -> tuple:
+    return _claim("positions", f"The {color} {piece} is at {position}", piece=piece, color=color, position=position)
+
+
+def _relation_claim(mover: dict, verb: str, target: dict) -> tuple:
+    relation = "threat" if verb in _THREAT_VERBS else "defend"
+    side = "opponent" if relation == "threat" else "ally"
+    wording = "threatens" if relation == "threat" else "defends"
+    return _claim(
+        "relations",
+        f"The {mover['color']} {mover['piece']} at {mover['position']} {wording} the {target['color']} {target['piece']} at {target['position']}",
+        piece=mover["piece"], color=mover["color"], position=mover["position"], relation=relation,
+        **{f"{side}_piece": target["piece"], f"{side}_color": target["color"], f"{side}_position": target["position"]},
+    )
+
+
+def _move_feature_claim(mover: dict, feature: str, target: dict) -> tuple:
+    side = "ally" if feature in ("move_defend", "move_is_protected") else "opponent"
+    wording = {
+        "move_defend": "defends the",
+        "move_threat": "threatens the",
+        "move_is_protected": "is defended by the",
+        "move_is_attacked": "is attacked by the",
+    }[feature]
+    target_position = "" if target["position"] == "N/A" else f" at {target['position']}"
+    return _claim(
+        "move_features",
+        f"The {mover['color']} {mover['piece']} move from {mover['position']} to {mover['move']} {wording} {target['color']} {target['piece']}{target_position}",
+        piece=mover["piece"], color=mover["color"], position=mover["position"], move=mover["move"], feature=feature,
+        **{f"{side}_piece": target["piece"], f"{side}_color": target["color"], f"{side}_position": target["position"]},
+    )
+
+
+def _targets(text: str) -> list:
+    return [match.groupdict() for match in _REF.finditer(text)]
+
+
+def _sentence_claims(sentence: str, context: dict) -> list | None:
+    '''
+    (kind, claim) pairs of one lowercased sentence, or None when no rule recognises it.
+
+    :param: :sentence: lowercased sentence without its final punctuation
+    :param: :context: state shared across the sentences of a commentary, holds the move described by give_move_description
+    '''
+
+    if _DEFINITION.fullmatch(sentence):
+        return []
+
+    match = _MOVE_HEADER.fullmatch(sentence)
+    if match:
+        context["move"] = match.groupdict()
+        return [_position_claim(match["color"], match["piece"], match["position"])]
+
+    match = _MOVE_LIST.fullmatch(sentence)
+    if match:
+        if "move" not in context:
+            return None
+        feature = _MOVE_LIST_FEATURES[match["kind"]]
+        return [_move_feature_claim(context["move"], feature, target) for target in _targets(match["targets"])]
+
+    match = _COUNTER_ATTACKS.fullmatch(sentence)
+    if match:
+        moves = list(_COUNTER_MOVE.finditer(match["moves"]))
+        if not moves:
+            return None
+        return [_position_claim(move["color"], move["piece"], move["position"]) for move in moves]
+
+    match = _FORK.fullmatch(sentence)
+    if match:
+        return [_move_feature_claim(match.groupdict(), "move_threat", target) for target in _targets(match["targets"])]
+
+    match = _HANGING.fullmatch(sentence)
+    if match:
+        target = {"piece": match["opponent_piece"], "color": match["opponent_color"], "position": "N/A"}
+        return [_move_feature_claim(match.groupdict(), "move_threat", target)]
+
+    match = _MOVE_FEATURE.fullmatch(sentence)
+    if match:
+        feature = "move_threat" if match["verb"] in _THREAT_VERBS else "move_defend"
+        return [_move_feature_claim(match.groupdict(), feature, target) for target in _targets(match["targets"])]
+
+    if _TACTIC_OUTCOME.search(sentence):
+        # discovered attack, skewer, pin, interference and mate templates describe the
+        # position after the move; only the pieces as they stand now can be checked
+        current = sentence.split(" then ")[0]
+        claims = []
+        mover = _MOVER.search(current)
+        if mover:
+            claims.append(_position_claim(mover["color"], mover["piece"], mover["position"]))
+        claims.extend(_position_claim(target["color"], target["piece"], target["position"]) for target in _targets(current))
+        return claims or None
+
+    match = _RELATION.fullmatch(sentence)
+    if match:
+        return [_relation_claim(match.groupdict(), match["verb"], target) for target in _targets(match["targets"])]
+
+    match = _POSITION.fullmatch(sentence)
+    if match:
+        return [_position_claim(match["color"], match["piece"], match["position"])]
+
+    return None
+
+
+def extract_claims(response: str) -> tuple:
+    '''
+    Extracts claims from the sentences of a commentary that follow a known template.
+
+    Sentences that name neither a colour nor a piece carry nothing to verify and are
+    skipped; the others are unmatched unless a rule recognises them, even without a square.
+
+    :param: :response: commentary to extract claims from
+    :return: tuple of the claims dict keyed like CLAIM_FIELDS and the list of unmatched sentences
+    '''
+
+    claims = {kind: [] for kind in CLAIM_FIELDS}
+    unmatched = []
+    context = {}
+    seen = set()
+    sentences = 0
+
+    for sentence in _SENTENCE_END.split(str(response).strip()):
+        if not _HAS_SUBJECT.search(sentence):
+            continue
+        sentences += 1
+
+        normalized = " ".join(sentence.lower().split()).rstrip(".!?")
+        sentence_claims = _sentence_claims(normalized, context)
+        if sentence_claims is None:
+            unmatched.append(sentence)
+            continue
+
+        for kind, claim in sentence_claims:
+            if (kind, claim["statement"]) not in seen:
+                seen.add((kind, claim["statement"]))
+                claims[kind].append(claim)
+
+    with _lock:
+        _counts["sentences"] += sentences
+        _counts["matched"] += sentences - len(unmatched)
+        _counts["fallback"] += len(unmatched)
+
+    return claims, unmatched
+
+
+def rule_stats() -> dict:
+    '''
+    Counts of commentary sentences parsed by the rules and sent to the LLM instead.
+    '''
+    with _lock:
+        stats = dict(_counts)
+    stats["fallback_rate"] = stats["fallback"] / stats["sentences"] if stats["sentences"] else 0.0
+    return stats
+
+
+metrics.register("verifier_claim_rules", rule_stats)
+
+
+__all__ = ["CLAIM_FIELDS", "extract_claims", "rule_stats"]
@@ -0,0 +1,58 @@
+'''
+Single-call stand-in for the tool-less ReAct AgentExecutors of the Verifier and the Builder.
+
+Their agents are created with an empty tool list, so every run is a single
+Thought / Final Answer exchange wrapped in scratchpad handling and parsing retries.
+DirectAgent sends the same prompt once, with an empty tool list and scratchpad, and
+returns the Final Answer in the executor's {"input", "output"} shape so callers do
+not change. scripts/benchmark_agent_calls.py compares both paths.
+'''
+
+from __future__ import annotations
+
+import os
+import re
+
+# create_react_agent stops generation before the model invents a tool observation
+REACT_STOP = ["\nObservation"]
+
+_FINAL_ANSWER = re.compile(r"Final Answer:\s*(.*)", re.DOTALL)
+_CODE_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+def final_answer(text: str) -> str:
+    '''
+    Extract the Final Answer of a ReAct-formatted completion, the whole text when there is none.
+    '''
+    match = _FINAL_ANSWER.search(text)
+    answer = match.group(1) if match else text
+    return _CODE_FENCE.sub("", answer.strip()).strip()
+
+
+class DirectAgent:
+    '''
+    Invoke a tool-less ReAct prompt with one LLM call.
+
+    :param: :llm: chat model used by the agent
+    :param: :prompt: PromptTemplate expecting input, tools, tool_names and agent_scratchpad
+    '''
+
+    def __init__(self, llm, prompt):
+        self.llm = llm
+        self.prompt = prompt
+
+    def invoke(self, inputs: dict) -> dict:
+        text = self.prompt.format(tools="", tool_names="", agent_scratchpad="", **inputs)
+        message = self.llm.invoke(text, stop=REACT_STOP)
+        output = getattr(message, "content", message)
+        return {**inputs, "output": final_answer(output)}
+
+
+def direct_agents_enabled() -> bool:
+    '''
+    CAISSA_DIRECT_AGENTS=0 restores the ReAct AgentExecutors.
+    '''
+    return os.getenv("CAISSA_DIRECT_AGENTS", "1") != "0"
+
+
+__all__ = ["DirectAgent", "direct_agents_enabled", "final_answer"]
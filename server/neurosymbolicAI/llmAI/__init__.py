@@ -1 +1 @@
-from .llm_ai import ChessGPT
\ No newline at end of file
+from .llm_ai import ChessGPT, get_chessgpt
\ No newline at end of file
@@ -0,0 +1,111 @@
+'''
+Micro-batching of ChessGPT generations.
+
+Concurrent requests would each call model.generate with a single prompt, which
+leaves the model underused on CPU. MicroBatcher queues the prompts, waits a few
+milliseconds for more prompts with the same generation settings, and runs them
+as one padded batch, handing every caller its own output.
+'''
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    '''
+    Coalesce concurrent prompts into batches.
+
+    :param: :generate: callable taking (prompts, settings) and returning one output per prompt
+    :param: :max_batch_size: most prompts in one batch
+    :param: :max_wait: seconds the first prompt of a batch waits for others to join
+    '''
+
+    def __init__(self, generate, max_batch_size: int = 8, max_wait: float = 0.01):
+        self.generate = generate
+        self.max_batch_size = max(max_batch_size, 1)
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.batches = 0
+        self.prompts = 0
+        self.largest = 0
+        self.wait_seconds = 0.0
+
+    def submit(self, prompt: str, settings: tuple = ()):
+        '''
+        Generate for one prompt, blocking until its batch has run.
+
+        :param: :settings: generation keyword arguments as sorted (name, value) pairs, only equal settings share a batch
+        '''
+        future = Future()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._work, name="chessgpt-batcher", daemon=True)
+                self._thread.start()
+        self._queue.put((prompt, settings, future, time.perf_counter()))
+        return future.result()
+
+    def _work(self) -> None:
+        held = []
+        while True:
+            first = held.pop(0) if held else self._queue.get()
+            batch = [first]
+            for item in list(held):
+                if item[1] == first[1] and len(batch) < self.max_batch_size:
+                    batch.append(item)
+                    held.remove(item)
+
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item[1] == first[1]:
+                    batch.append(item)
+                else:
+                    held.append(item)
+
+            self.run(batch)
+
+    def run(self, batch: list) -> None:
+        '''
+        Generate one batch of (prompt, settings, future, submitted_at) items and resolve their futures.
+        '''
+        started = time.perf_counter()
+        try:
+            outputs = self.generate([item[0] for item in batch], dict(batch[0][1]))
+        except Exception as exc:
+            for item in batch:
+                item[2].set_exception(exc)
+            return
+
+        with self._lock:
+            self.batches += 1
+            self.prompts += len(batch)
+            self.largest = max(self.largest, len(batch))
+            self.wait_seconds += sum(started - item[3] for item in batch)
+        for item, output in zip(batch, outputs):
+            item[2].set_result(output)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "prompts": self.prompts,
+                "mean_batch_size": round(self.prompts / self.batches, 2) if self.batches else 0.0,
+                "largest_batch": self.largest,
+                "wait_mean": round(self.wait_seconds / self.prompts, 4) if self.prompts else 0.0,
+                "queue_depth": self._queue.qsize(),
+            }
+
+
+__all__ = ["MicroBatcher"]
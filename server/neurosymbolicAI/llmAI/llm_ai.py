@@ -1,7 +1,11 @@
+import os
+import threading
 import torch
 import transformers
 from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline
 import re
+from server import metrics
+from .batching import MicroBatcher
 
 MIN_TRANSFORMERS_VERSION = '4.25.1'
 
@@ -10,9 +14,37 @@ assert transformers.__version__ >= MIN_TRANSFORMERS_VERSION, f'Please upgrade tr
 
 MODEL_ID = "Waterhorse/chessgpt-chat-v1"
 
+# Concurrent generations are batched up to CAISSA_LLM_BATCH_SIZE prompts, waiting at most
+# CAISSA_LLM_BATCH_WAIT_MS for a batch to fill. A batch size of 1 generates every prompt alone.
+BATCH_SIZE = int(os.getenv("CAISSA_LLM_BATCH_SIZE", "8"))
+BATCH_WAIT_MS = float(os.getenv("CAISSA_LLM_BATCH_WAIT_MS", "10"))
+
+# CPU inference: CAISSA_LLM_INT8=1 quantises the linear layers to int8 (measure the gain with
+# scripts/benchmark_chessgpt.py first), torch runs CAISSA_TORCH_THREADS intra-op threads (0 keeps
+# its default), and CAISSA_LLM_BACKEND=onnx runs the model with ONNX Runtime, exported once to
+# CAISSA_ONNX_DIR when that is set.
+CPU_INT8 = os.getenv("CAISSA_LLM_INT8", "0") == "1"
+TORCH_THREADS = int(os.getenv("CAISSA_TORCH_THREADS", "0"))
+BACKEND = os.getenv("CAISSA_LLM_BACKEND", "torch")
+ONNX_DIR = os.getenv("CAISSA_ONNX_DIR")
+
+# Local safetensors copy of the weights, written by scripts/export_chessgpt.py. Safetensors files are
+# memory-mapped, so worker processes loading the same copy share its pages instead of each holding one.
+WEIGHTS_DIR = os.getenv("CAISSA_LLM_WEIGHTS_DIR")
+
 class ChessGPT:
-    def __init__(self):
-        self.tokenizer = AutoTokenizer.from_pretrained(MODEL_ID)
+    def __init__(self, int8=None, threads=None, backend=None):
+        '''
+        :param: :int8: quantise the linear layers to int8 when running on CPU, CAISSA_LLM_INT8 by default
+        :param: :threads: torch intra-op threads on CPU, CAISSA_TORCH_THREADS by default
+        :param: :backend: "torch" or "onnx", CAISSA_LLM_BACKEND by default
+        '''
+        int8 = CPU_INT8 if int8 is None else int8
+        threads = TORCH_THREADS if threads is None else threads
+        backend = BACKEND if backend is None else backend
+        
+        source = WEIGHTS_DIR if WEIGHTS_DIR and os.path.isdir(WEIGHTS_DIR) else MODEL_ID
+        self.tokenizer = AutoTokenizer.from_pretrained(source)
         if torch.cuda.is_available():
             device = "cuda"
             dtype = torch.float16
@@ -22,34 +54,68 @@ class ChessGPT:
         else:
             device = "cpu"
             dtype = torch.float32
-
-        self.model = AutoModelForCausalLM.from_pretrained(
-            MODEL_ID,
-            low_cpu_mem_usage=True,
-            trust_remote_code=True,
-            torch_dtype=dtype,
-        )
-        self.model = self.model.to(device)
+        
+        if device == "cpu" and threads > 0:
+            torch.set_num_threads(threads)
+        
+        self.backend = "torch"
+        self.quantized = False
+        self.model = self.load_onnx() if device == "cpu" and backend == "onnx" else None
+        if self.model is None:
+            self.model = AutoModelForCausalLM.from_pretrained(
+                source,
+                low_cpu_mem_usage=True,
+                trust_remote_code=True,
+                torch_dtype=dtype,
+                **({"use_safetensors": True} if source != MODEL_ID else {}),
+            )
+            self.model = self.model.to(device)
+            if device == "cpu" and int8:
+                # dynamic quantisation: int8 weights, activations quantised on the fly
+                self.model = torch.ao.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+                self.quantized = True
+        
+        # the model is already loaded, so the pipeline takes no loading options
         self.generator = pipeline(
             task="text-generation",
             model=self.model,
             tokenizer=self.tokenizer,
-            model_kwargs={'device_map': "auto", "load_in_8bit": True},
             max_new_tokens=200,
         )
+        
+        # decoder-only models are padded on the left, so every prompt of a batch ends where generation starts
+        self.tokenizer.padding_side = "left"
+        if getattr(self.tokenizer, "pad_token", None) is None:
+            self.tokenizer.pad_token = getattr(self.tokenizer, "eos_token", None)
+        self.batcher = None
+        if BATCH_SIZE > 1:
+            self.batcher = MicroBatcher(self.generate_batch, BATCH_SIZE, BATCH_WAIT_MS / 1000)
+            metrics.register("chessgpt_batching", self.batcher.stats)
              
         
+    def load_onnx(self):
+        '''
+        ChessGPT exported to ONNX Runtime, None when optimum[onnxruntime] is not installed.
+        '''
+        try:
+            from optimum.onnxruntime import ORTModelForCausalLM
+        except ImportError:
+            print("CAISSA_LLM_BACKEND=onnx needs optimum[onnxruntime], running ChessGPT with torch")
+            return None
+        
+        if ONNX_DIR and os.path.isdir(ONNX_DIR):
+            model = ORTModelForCausalLM.from_pretrained(ONNX_DIR)
+        else:
+            model = ORTModelForCausalLM.from_pretrained(MODEL_ID, export=True)
+            if ONNX_DIR:
+                model.save_pretrained(ONNX_DIR)
+        
+        self.backend = "onnx"
+        return model
+    
     def predict(self, fen_string):
         prompt = f"""With the FEN board state {fen_string} give next UCI move?"""
-        inputs = self.tokenizer(prompt, return_tensors='pt').to(self.model.device)
-        input_length = inputs.input_ids.shape[1]
-        outputs = self.model.generate(
-            **inputs, max_new_tokens=10, do_sample=True, temperature=0.1, top_p=0.7, top_k=50, return_dict_in_generate=True, pad_token_id=self.tokenizer.eos_token_id, 
-        )
-        
-        token = outputs.sequences[0, input_length:]
-        output_str = self.tokenizer.decode(token)
-        return output_str
+        return self.generate(prompt, max_new_tokens=10, do_sample=True, temperature=0.1, top_p=0.7, top_k=50)
     
     def play_puzzle(self, fen_string, strategies):
         ls = ""
@@ -66,28 +132,46 @@ class ChessGPT:
         {ls}. The solutions are provided in both SAN format as 
         """
 
-        inputs = self.tokenizer(prompt, return_tensors='pt').to(self.model.device)
-        input_length = inputs.input_ids.shape[1]
-        outputs = self.model.generate(
-            **inputs, max_new_tokens=128, do_sample=True, temperature=0.01, top_p=0.7, top_k=50, return_dict_in_generate=True, pad_token_id=self.tokenizer.eos_token_id
-        )
-        
-        token = outputs.sequences[0, input_length:]
-        output_str = self.tokenizer.decode(token)
+        output_str = self.generate(prompt, max_new_tokens=128, do_sample=True, temperature=0.01, top_p=0.7, top_k=50)
         
         return self.extract_uci(output_str)
         
     def ask(self, prompt):
-        inputs = self.tokenizer(prompt, return_tensors='pt').to(self.model.device)
+        return self.generate(prompt, max_new_tokens=128, do_sample=True, temperature=0.7, top_p=0.7, top_k=50)
+    
+    def generate(self, prompt, **settings):
+        '''
+        Generate a completion of a prompt, batched with concurrent prompts of the same settings.
+        
+        :param: :prompt: text to complete
+        :param: :settings: keyword arguments of model.generate
+        '''
+        if self.batcher is None:
+            return self.generate_batch([prompt], settings)[0]
+        return self.batcher.submit(prompt, tuple(sorted(settings.items())))
+    
+    def generate_batch(self, prompts, settings):
+        '''
+        Run model.generate once on a left-padded batch of prompts.
+        
+        :return: the decoded completion of each prompt, up to its end-of-sequence token
+        '''
+        inputs = self.tokenizer(prompts, return_tensors='pt', padding=True).to(self.model.device)
         input_length = inputs.input_ids.shape[1]
-        outputs = self.model.generate(
-            **inputs, max_new_tokens=128, do_sample=True, temperature=0.7, top_p=0.7, top_k=50, return_dict_in_generate=True, pad_token_id=self.tokenizer.eos_token_id
-        )
+        with torch.inference_mode():
+            outputs = self.model.generate(
+                **inputs, **settings, return_dict_in_generate=True, pad_token_id=self.tokenizer.eos_token_id
+            )
         
-        token = outputs.sequences[0, input_length:]
-        output_str = self.tokenizer.decode(token)
+        completions = []
+        for sequence in outputs.sequences:
+            tokens = sequence[input_length:].tolist()
+            # finished sequences are padded until the longest one of the batch is done
+            if self.tokenizer.eos_token_id in tokens:
+                tokens = tokens[:tokens.index(self.tokenizer.eos_token_id) + 1]
+            completions.append(self.tokenizer.decode(tokens))
         
-        return output_str
+        return completions
     
     def extract_uci(self, fen_string):
         # Regular expression pattern to match UCI moves
@@ -106,3 +190,18 @@ class ChessGPT:
     def pipeline(self, prompt):
         output = self.generator(prompt)
         return output
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+def get_chessgpt():
+    '''
+    The ChessGPT of this process, loaded on first use and shared by every caller.
+    '''
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = ChessGPT()
+    return _shared
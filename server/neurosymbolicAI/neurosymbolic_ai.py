@@ -1,5 +1,5 @@
-from .symbolicAI import Symbolic
-from .llmAI import ChessGPT # predict next move
+from .symbolicAI import RecordingGraph, Symbolic
+from .llmAI import get_chessgpt # predict next move
 from os.path import join, dirname
 from dotenv import load_dotenv
 import os
@@ -29,10 +29,23 @@ class NeuroSymbolic():
     reason_flag = True
     
     def __init__(self):
-        skip_llm = os.getenv("CAISSA_SKIP_LLM") == "1"
-        self.gpt = None if skip_llm else ChessGPT()
+        self.skip_llm = os.getenv("CAISSA_SKIP_LLM") == "1"
+        self._gpt = None
         self.symbolic = Symbolic()
         self.symbolic.consult(KB_PATH)
+    
+    @property
+    def gpt(self):
+        '''
+        ChessGPT shared by every instance of the process, loaded on first use. None when CAISSA_SKIP_LLM=1.
+        '''
+        if self._gpt is None and not self.skip_llm:
+            self._gpt = get_chessgpt()
+        return self._gpt
+    
+    @gpt.setter
+    def gpt(self, model):
+        self._gpt = model
         
     def predict(self, fen_string):
         if self.gpt is None:
@@ -94,8 +107,11 @@ class NeuroSymbolic():
                 return "incorrect position"
             else:
                 piece = pieces[0]['Piece']
-                self.symbolic.construct_graph(player)
-                result = self.symbolic.reason(piece, player, from_uci, to_uci)
+                # the tactics are worked out on a recording graph, so the knowledge graph served to the chat is left as it is
+                recorder = Symbolic(graph=RecordingGraph())
+                recorder.prolog = self.symbolic.prolog
+                recorder.suggest_tactics(player)
+                result = recorder.reason(piece, player, from_uci, to_uci)
         else:
             return "incorrect uci"
          
@@ -110,14 +126,11 @@ class NeuroSymbolic():
         if fen_string == None:
             return "Enter a valid FEN"
 
-        if self.gpt is None:
+        if self.gpt is None and not test:
             return ("LLM disabled via CAISSA_SKIP_LLM=1; no prediction available.", "", [])
 
-        output = self.predict(f"""{fen_string}""")
-        
-        # For testing purposes
-        if test:
-            output = move
+        # For testing purposes the given move is explained instead of a prediction
+        output = move if test else self.predict(f"""{fen_string}""")
         
         if (fen_string[0] == '{'):
             fen_string = re.findall(r'\{(.*?)\}', fen_string)[0]
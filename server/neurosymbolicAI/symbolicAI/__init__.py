@@ -1,2 +1,3 @@
 from .symbolic_ai import Symbolic
-from .symbolic_ai import InferenceGraph
\ No newline at end of file
+from .symbolic_ai import InferenceGraph
+from .symbolic_ai import RecordingGraph
\ No newline at end of file
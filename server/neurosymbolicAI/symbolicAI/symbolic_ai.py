@@ -3,7 +3,13 @@ from dotenv import load_dotenv
 from pyswip import Prolog
 from neo4j import GraphDatabase
 import chess
+import os
+import re
+import threading
+import functools
 from server.config import get_secret
+from server.cache import LRUCache, GRAPH_VERSION_BUMP, GRAPH_VERSION_QUERY
+from server import metrics
 
 # Load environment variables
 dotenv_path = join(dirname(__file__), '.env')
@@ -12,13 +18,20 @@ load_dotenv(dotenv_path)
 URI = get_secret("NEO4J_URI")
 USER = get_secret("NEO4J_USERNAME")
 PASSWORD = get_secret("NEO4J_PASSWORD")
+
+# pyswip drives a single SWI-Prolog engine per process, shared by every Symbolic
+# instance. Entry points that may run on worker threads hold this lock.
+prolog_lock = threading.RLock()
+
+# claim fields are interpolated into Prolog queries, only plain atoms are allowed
+_PROLOG_ATOM = re.compile(r"[a-z][a-z0-9_]*")
 
 class Symbolic():
     
-    def __init__(self):
+    def __init__(self, graph=None):
         self.board = chess.Board()
         self.prolog = Prolog()
-        self.graph = InferenceGraph(URI, USER, PASSWORD)
+        self.graph = graph if graph is not None else InferenceGraph(URI, USER, PASSWORD)
     
     def consult(self, filepath):
         self.filepath = filepath
@@ -27,15 +40,16 @@ class Symbolic():
     def parse_fen(self, fen_string):
         query = None
         self.fen_string = fen_string
-        try:
-            query = self.prolog.query(f"""parse_fen("{fen_string}")""")
-            result = list(query)
-            return result
-        except Exception as e:
-            print(f"Error during Prolog query: {e}")
-        finally:
-            if query is not None:
-                query.close()
+        with prolog_lock:
+            try:
+                query = self.prolog.query(f"""parse_fen("{fen_string}")""")
+                result = list(query)
+                return result
+            except Exception as e:
+                print(f"Error during Prolog query: {e}")
+            finally:
+                if query is not None:
+                    query.close()
         
     def display_board_gui(self):
         return self.board
@@ -79,6 +93,14 @@ class Symbolic():
             
     def reason(self, piece, color, from_position, to_position):
         return self.graph.fetch_suggest(piece, color, from_position, to_position)
+    
+    def suggest_tactics(self, player):
+        '''
+        Add the Suggest relations of every tactic the player can play in the loaded position.
+        :param: :player: color to move
+        '''
+        for tactic in (self.discover_attack, self.fork, self.skewer, self.absolute_pin, self.relative_pin, self.interference, self.mate_in_two, self.hanging_piece, self.mate):
+            tactic(player)
         
     def destruct_graph(self):
         self.graph.destroy()
@@ -952,6 +974,29 @@ class Symbolic():
             print(f"Error during Prolog query: {e}")
         finally:
             query.close()
+
+    def threat_moves(self, player):
+        '''
+        Moves of a player that threaten opponent pieces, most threats first. The knowledge graph is not touched.
+        
+        :return: list of (piece, color, from_uci, to_uci, threatened pieces)
+        '''
+        query = None
+        try:
+            query = self.prolog.query(f"""moves_threat({player}, ListOfMoves)""")
+            result = list(query)
+            
+            if result == []:
+                return []
+            
+            moves = [(str(item[0]), str(item[1]), str(item[2]), str(item[3]), list(item[4])) for item in result[0]['ListOfMoves']]
+            return sorted(moves, key=lambda move: len(move[4]), reverse=True)
+        except Exception as e:
+            print(f"Error during Prolog query: {e}")
+            return []
+        finally:
+            if query is not None:
+                query.close()
                 
     def move_defend(self, player):
         try:
@@ -1220,59 +1265,46 @@ class Symbolic():
         finally:
             query.close()
     
-    def evaluate_king_safety(self, player):
+    def evaluate_king_safety(self, player=None):
+        '''
+        Mark each king as safe or unsafe in the knowledge graph.
+
+        Both colours are evaluated in one Prolog pass and written with a single
+        Cypher statement, so the check is cheap enough to run on every position.
+
+        :param: :player: color to evaluate, None or "both" evaluates white and black
+
+        :return: dict mapping each evaluated color to its (king_position, status)
+        '''
+        colors = ["white", "black"] if player in (None, "both") else [player]
+        query = None
+        kings = {}
         try:
-            query1 = self.prolog.query(f"""king_safety({player}, CheckSquareList, SupportSquareList, ControlledSquareList)""")
-            result1 = list(query1)
-            query2 = self.prolog.query(f"""return_pieces(king, {player}, KingUCIPosition)""")
-            result2 = list(query2)
-            
-            if result1 == [] or result2 == []:
-                return None
-            
-            king_position = result2[0]['KingUCIPosition']
-            
-            check_square_tmp = result1[0]['CheckSquareList']
-            check_square_list = []
-            for item in check_square_tmp:
-                position = self.convert_string_to_tuple(item)
-                check_square_list.append(position)
-            
-            support_square_tmp = result1[0]['SupportSquareList']
-            support_square_list = []
-            for item in support_square_tmp:
-                position = self.convert_string_to_tuple(item)
-                support_square_list.append(position)
-            
-            controlled_square_tmp = result1[0]['ControlledSquareList']
-            controlled_square_list = []
-            for item in controlled_square_tmp:
-                position = self.convert_string_to_tuple(item)
-                controlled_square_list.append(position)
+            query = self.prolog.query(f"""member(Color, [{", ".join(colors)}]), return_pieces(king, Color, KingUCIPosition), king_safety(Color, CheckSquareList, SupportSquareList, ControlledSquareList)""")
+            for result in query:
+                color = str(result['Color'])
+                if color in kings:
+                    continue
                 
-            check_square_len = len(check_square_list)
-            support_square_len = len(support_square_list)
-            controlled_square_len = len(controlled_square_list)
-            
-            king_node_props = self.graph.fetch_props("king", player, king_position)
-            
-            if (check_square_len > support_square_len + controlled_square_len) or (controlled_square_len == 1):
-                if "props" in king_node_props[0] and "safe" in king_node_props[0]['props']:
-                    self.graph.remove_property("king", player, king_position, "safe")    
-        
-                if "props" in king_node_props[0] and "unsafe" not in king_node_props[0]['props']:
-                    self.graph.add_property("king", player, king_position, "unsafe")
-            else:
-                if "props" in king_node_props[0] and "unsafe" in king_node_props[0]['props']:
-                    self.graph.remove_property("king", player, king_position, "unsafe") 
+                check_square_len = len(result['CheckSquareList'])
+                support_square_len = len(result['SupportSquareList'])
+                controlled_square_len = len(result['ControlledSquareList'])
+                
+                if (check_square_len > support_square_len + controlled_square_len) or (controlled_square_len == 1):
+                    status = "unsafe"
+                else:
+                    status = "safe"
                 
-                if "props" in king_node_props[0] and "safe" not in king_node_props[0]['props']:
-                    self.graph.add_property("king", player, king_position, "safe")
+                kings[color] = (result['KingUCIPosition'], status)
         except Exception as e:
             print(f"Error during Prolog query: {e}")
+            return None
         finally:
-            query1.close()
-            query2.close(0)
+            if query is not None:
+                query.close()
+        
+        self.graph.set_king_safety([(color, position, status) for color, (position, status) in kings.items()])
+        return kings
     
     def add_strategy(self, player, query, strategy):
         moves = {}
@@ -1297,27 +1329,105 @@ class Symbolic():
         return moves
     
     # Verification
+    def _rebind(self):
+        '''
+        Parse this instance's position again, called with prolog_lock held right before a query.
+        
+        Another instance may have parsed a different position since parse_fen, so
+        binding and querying have to happen under the same lock.
+        '''
+        if getattr(self, "fen_string", None) is not None:
+            self.parse_fen(self.fen_string)
+    
     def verify_position(self, piece, color, position):
-        try:
-            query = self.prolog.query(f"""verify_position({piece}, {"Color" if color == "N/A" else color}, {"Position" if position == "N/A" else position})""")
-            result = list(query)
-            
-            return result
-        except Exception as e:
-            print(f"Error during Prolog query: {e}")
-        finally:
-            query.close()
+        with prolog_lock:
+            self._rebind()
+            try:
+                query = self.prolog.query(f"""verify_position({piece}, {"Color" if color == "N/A" else color}, {"Position" if position == "N/A" else position})""")
+                result = list(query)
+                
+                return result
+            except Exception as e:
+                print(f"Error during Prolog query: {e}")
+            finally:
+                query.close()
     
     def verify_relation(self, piece1, color1, position1, piece2, color2, position2, relation):
-        try:
-            query = self.prolog.query(f"""verify_relation({piece1}, {"Color1" if color1 == "N/A" else color1}, {"Position1" if position1 == "N/A" else position1}, {"Piece2" if piece2 == "N/A" else piece2}, {"Color2" if color2 == "N/A" else color2}, {"Position2" if position2 == "N/A" else position2}, {relation})""")
-            result = list(query)
+        with prolog_lock:
+            self._rebind()
+            try:
+                query = self.prolog.query(f"""verify_relation({piece1}, {"Color1" if color1 == "N/A" else color1}, {"Position1" if position1 == "N/A" else position1}, {"Piece2" if piece2 == "N/A" else piece2}, {"Color2" if color2 == "N/A" else color2}, {"Position2" if position2 == "N/A" else position2}, {relation})""")
+                result = list(query)
 
-            return result
-        except Exception as e:
-            print(f"Error during Prolog query: {e}")
-        finally:
-            query.close()        
+                return result
+            except Exception as e:
+                print(f"Error during Prolog query: {e}")
+            finally:
+                query.close()        
+    
+    def verify_positions(self, claims):
+        '''
+        Check many piece-position claims with a single Prolog query.
+        
+        :param: :claims: list of (piece, color, position) tuples, 'N/A' for an unknown color or position
+        :return: per claim a dict with 'Color' and 'Position' when it holds, None otherwise; None if the query failed
+        '''
+        return self._verify_batch("verify_positions", "position", claims, (1, 2), ("Color", "Position"))
+    
+    def verify_relations(self, claims):
+        '''
+        Check many defend/threat claims with a single Prolog query.
+        
+        :param: :claims: list of (piece1, color1, position1, piece2, color2, position2, relation) tuples, 'N/A' for unknown fields
+        :return: per claim a dict with 'Color1', 'Position1', 'Piece2', 'Color2' and 'Position2' when it holds, None otherwise; None if the query failed
+        '''
+        return self._verify_batch("verify_relations", "relation", claims, (1, 2, 3, 4, 5), ("Color1", "Position1", "Piece2", "Color2", "Position2"))
+    
+    def _verify_batch(self, predicate, functor, claims, optional, names):
+        terms = {}
+        for index, claim in enumerate(claims):
+            args = self._prolog_args(claim, optional)
+            # claims with fields that are not plain atoms cannot hold
+            if args is not None:
+                terms[index] = f"{functor}({', '.join(args)})"
+        
+        results = [None] * len(claims)
+        if not terms:
+            return results
+        
+        query = None
+        with prolog_lock:
+            self._rebind()
+            try:
+                query = self.prolog.query(f"""{predicate}([{', '.join(terms.values())}], Results)""")
+                solutions = list(query)
+            except Exception as e:
+                print(f"Error during Prolog query: {e}")
+                return None
+            finally:
+                if query is not None:
+                    query.close()
+        
+        if len(solutions) == 0:
+            return None
+        
+        for index, result in zip(terms, solutions[0]["Results"]):
+            if isinstance(result, list):
+                results[index] = dict(zip(names, (str(value) for value in result)))
+        
+        return results
+    
+    @staticmethod
+    def _prolog_args(values, optional):
+        args = []
+        for index, value in enumerate(values):
+            if value == "N/A" and index in optional:
+                args.append("_")
+            elif isinstance(value, str) and _PROLOG_ATOM.fullmatch(value):
+                args.append(value)
+            else:
+                return None
+        return args
         
     # Utilities
     @staticmethod
@@ -1332,6 +1442,10 @@ class Symbolic():
         
     
 class InferenceGraph:
+    # Every instance points at the same database, so reads are cached process-wide
+    # and keyed by the version token every write transaction stores in the graph,
+    # which also retires entries after writes made by other worker processes.
+    read_cache = LRUCache(maxsize=int(os.getenv("CAISSA_GRAPH_CACHE_SIZE", "1024")))
     
     def __init__(self, uri, user, password):
         self.driver = GraphDatabase.driver(uri, auth=(user, password))
@@ -1339,110 +1453,153 @@ class InferenceGraph:
     def close(self):
         self.driver.close()
         
-    def create_piece(self, piece, color, position):
+    def _write(self, tx_function, *args):
+        @functools.wraps(tx_function)
+        def _versioned(tx, *args):
+            result = tx_function(tx, *args)
+            self.bump_graph_version(tx)
+            return result
+        
+        try:
+            with self.driver.session() as session:
+                return session.execute_write(_versioned, *args)
+        finally:
+            self.read_cache.clear()
+            
+    def _read(self, tx_function, *args):
         with self.driver.session() as session:
-            session.execute_write(self.create_piece_node, piece, color, position)
+            # The token is read before the query, so rows that already include a
+            # concurrent write are at worst filed under the older token.
+            version = session.execute_read(self.fetch_graph_version)
+            key = (version, tx_function.__name__) + args
+            result = self.read_cache.get_or_load(key, lambda: session.execute_read(tx_function, *args))
+        
+        # Hand out copies so callers cannot mutate cached lists
+        if isinstance(result, list):
+            return list(result)
+        return result
+    
+    @classmethod
+    def cache_stats(cls):
+        return cls.read_cache.stats()
+        
+    def create_piece(self, piece, color, position):
+        self._write(self.create_piece_node, piece, color, position)
             
     def create_square(self, position):
-        with self.driver.session() as session:
-            session.execute_write(self.create_square_node, position)
+        self._write(self.create_square_node, position)
             
     def create_locate(self, piece, color, position):
-        with self.driver.session() as session:
-            session.execute_write(self.create_locate_relation, piece, color, position)
+        self._write(self.create_locate_relation, piece, color, position)
             
     def create_suggest(self, piece, color, from_position, to_position, strategy):
-        with self.driver.session() as session:
-            session.execute_write(self.create_suggest_relation, piece, color, from_position, to_position, strategy)
+        self._write(self.create_suggest_relation, piece, color, from_position, to_position, strategy)
             
     def create_feature(self, piece, color, from_position, to_position, impacted_piece, impacted_piece_color, impacted_piece_position, feature):
-        with self.driver.session() as session:
-            session.execute_write(self.create_feature_relation, piece, color, from_position, to_position, impacted_piece, impacted_piece_color, impacted_piece_position, feature)
+        self._write(self.create_feature_relation, piece, color, from_position, to_position, impacted_piece, impacted_piece_color, impacted_piece_position, feature)
     
     def build_feature(self, piece, color, from_position, to_position, feature):
-        with self.driver.session() as session:
-            session.execute_write(self.build_feature_relation, piece, color, from_position, to_position, feature)
+        self._write(self.build_feature_relation, piece, color, from_position, to_position, feature)
+
+    def build_features(self, moves, feature):
+        '''
+        Create a Feature edge for every (piece, color, from_position, to_position) move in a single transaction.
+        '''
+        moves = [{"piece": piece, "color": color, "from": from_position, "to": to_position} for piece, color, from_position, to_position in moves]
+        if moves:
+            self._write(self.build_features_relation, moves, feature)
             
     def add_property(self, piece, color, position, prop):
-        with self.driver.session() as session:
-            session.execute_write(self.add_property_node, piece, color, position, prop)
+        self._write(self.add_property_node, piece, color, position, prop)
+
+    def set_king_safety(self, kings):
+        '''
+        Replace the safe/unsafe property of every (color, position, status) king in a single transaction.
+        '''
+        kings = [{"color": color, "position": position, "status": status} for color, position, status in kings]
+        if kings:
+            self._write(self.set_king_safety_node, kings)
             
     def remove_property(self, piece, color, position, prop):
-        with self.driver.session() as session:
-            session.execute_write(self.remove_property, piece, color, position, prop)
+        self._write(self.remove_property_node, piece, color, position, prop)
             
     def destroy(self):
-        with self.driver.session() as session:
-            session.execute_write(self.delete_all_nodes)
+        self._write(self.delete_all_nodes)
+
+    def replay(self, writes):
+        '''
+        Apply writes recorded by a RecordingGraph in a single transaction.
+        
+        :param: :writes: list of (tx_function, args) in the order they were recorded, tx_function may be given by name
+        '''
+        def _apply(tx):
+            for tx_function, args in writes:
+                if isinstance(tx_function, str):
+                    tx_function = getattr(InferenceGraph, tx_function)
+                tx_function(tx, *args)
+        
+        self._write(_apply)
             
     def fetch_suggest(self, piece, color, from_position, to_position):
-        with self.driver.session() as session:
-            result = session.execute_read(self.fetch_suggest_relation, piece, color, from_position, to_position)
-            return result
+        return self._read(self.fetch_suggest_relation, piece, color, from_position, to_position)
     
     def fetch_props(self, piece, color, position):
-        with self.driver.session() as session:
-            result = session.execute_read(self.fetch_props_node, piece, color, position)
-            return result
+        return self._read(self.fetch_props_node, piece, color, position)
         
     def add_property_interference(self, piece, color, position, next_position, opponent_piece1, opponent_color1, opponent_position1,  opponent_piece2, opponent_color2, opponent_position2):
-        with self.driver.session() as session:
-            result = session.execute_write(self.add_property_relation_interference, piece, color, position, next_position, opponent_piece1, opponent_color1, opponent_position1,  opponent_piece2, opponent_color2, opponent_position2)
+        self._write(self.add_property_relation_interference, piece, color, position, next_position, opponent_piece1, opponent_color1, opponent_position1,  opponent_piece2, opponent_color2, opponent_position2)
 
     def verify_move_feature(self, piece1, color1, position1, piece2, color2, position2, move, feature):
-        with self.driver.session() as session:
-            result = session.execute_read(self.verify_move_feature_relation, piece1, color1, position1, piece2, color2, position2, move, feature)
-            return result
+        return self._read(self.verify_move_feature_relation, piece1, color1, position1, piece2, color2, position2, move, feature)
+        
+    def verify_move_features(self, claims):
+        '''
+        Check many fully specified move-feature claims with a single UNWIND query.
+        
+        :param: :claims: list of (piece1, color1, position1, piece2, color2, position2, move, feature) tuples
+        :return: one boolean per claim
+        '''
+        claims = tuple(tuple(claim) for claim in claims)
+        if not claims:
+            return []
+        verified = set(self._read(self.verify_move_features_relation, claims))
+        return [index in verified for index in range(len(claims))]
         
     def find_moves(self, feature):
-        with self.driver.session() as session:
-            result = session.execute_read(self.find_move_feature_relation, feature)
-            return result
+        return self._read(self.find_move_feature_relation, feature)
         
     def verify_move_feature_missing_param(self, feature):
-        with self.driver.session() as session:
-            result = session.execute_read(self.verify_move_feature_relation_missing_param, feature)
-            return result
+        return self._read(self.verify_move_feature_relation_missing_param, feature)
         
     def create_discovery_attack_relation(self, piece, color, current_position, next_position, ally_piece, ally_color, ally_position, opponent_piece, opponent_color, opponent_position):
-        with self.driver.session() as session:
-            result = session.execute_write(self.create_discovery_attack, piece, color, current_position, next_position, ally_piece, ally_color, ally_position, opponent_piece, opponent_color, opponent_position)
+        self._write(self.create_discovery_attack, piece, color, current_position, next_position, ally_piece, ally_color, ally_position, opponent_piece, opponent_color, opponent_position)
     
     def create_skewer_relation(self, piece, color, current_position, next_position, opponent_piece1, opponent_color1, opponent_position1, opponent_piece2, opponent_color2, opponent_position2):
-        with self.driver.session() as session:
-            result = session.execute_write(self.create_skewer, piece, color, current_position, next_position, opponent_piece1, opponent_color1, opponent_position1, opponent_piece2, opponent_color2, opponent_position2)
+        self._write(self.create_skewer, piece, color, current_position, next_position, opponent_piece1, opponent_color1, opponent_position1, opponent_piece2, opponent_color2, opponent_position2)
         
     def create_fork_relation(self, piece, color, position, move, opponent_piece, opponent_color, opponent_position):
-        with self.driver.session() as session:
-            result = session.execute_write(self.create_fork, piece, color, position, move, opponent_piece, opponent_color, opponent_position)
+        self._write(self.create_fork, piece, color, position, move, opponent_piece, opponent_color, opponent_position)
     
     def create_absolute_pin_relation(self, piece, color, current_position, next_position, opponent_piece1, opponent_color1, opponent_position1, opponent_piece2, opponent_color2, opponent_position2):
-        with self.driver.session() as session:
-            result = session.execute_write(self.create_absolute_pin, piece, color, current_position, next_position, opponent_piece1, opponent_color1, opponent_position1, opponent_piece2, opponent_color2, opponent_position2)
+        self._write(self.create_absolute_pin, piece, color, current_position, next_position, opponent_piece1, opponent_color1, opponent_position1, opponent_piece2, opponent_color2, opponent_position2)
     
     def create_relative_pin_relation(self, piece, color, current_position, next_position, opponent_piece1, opponent_color1, opponent_position1, opponent_piece2, opponent_color2, opponent_position2):
-        with self.driver.session() as session:
-            result = session.execute_write(self.create_relative_pin, piece, color, current_position, next_position, opponent_piece1, opponent_color1, opponent_position1, opponent_piece2, opponent_color2, opponent_position2)    
+        self._write(self.create_relative_pin, piece, color, current_position, next_position, opponent_piece1, opponent_color1, opponent_position1, opponent_piece2, opponent_color2, opponent_position2)
     
     def create_discovery_check_relation(self, piece, color, current_position, next_position, ally_piece, ally_color, ally_position, opponent_piece, opponent_color, opponent_position):
-        with self.driver.session() as session:
-            result = session.execute_write(self.create_discovery_check, piece, color, current_position, next_position, ally_piece, ally_color, ally_position, opponent_piece, opponent_color, opponent_position)
+        self._write(self.create_discovery_check, piece, color, current_position, next_position, ally_piece, ally_color, ally_position, opponent_piece, opponent_color, opponent_position)
     
     def create_interference_relation(self, piece, color, current_position, next_position, opponent_piece1, opponent_color1, opponent_position1, opponent_piece2, opponent_color2, opponent_position2):
-        with self.driver.session() as session:
-            result = session.execute_write(self.create_interference, piece, color, current_position, next_position, opponent_piece1, opponent_color1, opponent_position1, opponent_piece2, opponent_color2, opponent_position2)        
+        self._write(self.create_interference, piece, color, current_position, next_position, opponent_piece1, opponent_color1, opponent_position1, opponent_piece2, opponent_color2, opponent_position2)
     
     def create_mate_in_two_relation(self, piece, color, current_position, next_position, opponent_piece, opponent_color, opponent_current_position, opponent_next_position, ally_piece, ally_color, ally_current_position, ally_next_position):
-        with self.driver.session() as session:
-            result = session.execute_write(self.create_mate_in_two, piece, color, current_position, next_position, opponent_piece, opponent_color, opponent_current_position, opponent_next_position, ally_piece, ally_color, ally_current_position, ally_next_position)        
+        self._write(self.create_mate_in_two, piece, color, current_position, next_position, opponent_piece, opponent_color, opponent_current_position, opponent_next_position, ally_piece, ally_color, ally_current_position, ally_next_position)
         
     def create_mate_in_one_relation(self, piece, color, current_position, next_position, opponent_piece, opponent_color, opponent_position):
-        with self.driver.session() as session:
-            result = session.execute_write(self.create_mate_in_one, piece, color, current_position, next_position, opponent_piece, opponent_color, opponent_position)        
+        self._write(self.create_mate_in_one, piece, color, current_position, next_position, opponent_piece, opponent_color, opponent_position)
 
     def create_hanging_piece_relation(self, piece, color, current_position, next_position, opponent_piece, opponent_color, opponent_position):
-        with self.driver.session() as session:
-            result = session.execute_write(self.create_hanging_piece, piece, color, current_position, next_position, opponent_piece, opponent_color, opponent_position)        
+        self._write(self.create_hanging_piece, piece, color, current_position, next_position, opponent_piece, opponent_color, opponent_position)
 
     # Specific methods
     @staticmethod
@@ -1485,6 +1642,14 @@ class InferenceGraph:
                """,
                piece=piece, color=color, position=position, prop=prop)
       
+    @staticmethod
+    def set_king_safety_node(tx, kings):
+        tx.run("""UNWIND $kings AS king
+               MATCH (piece:Piece {piece: 'king', color: king.color, position: king.position})
+               SET piece.props = [prop IN coalesce(piece.props, []) WHERE NOT prop IN ['safe', 'unsafe']] + [king.status]
+               """,
+               kings=kings)
+    
     @staticmethod  
     def remove_property_node(tx, piece, color, position, prop):
         tx.run("""MATCH (piece:Piece {piece: $piece, color: $color, position: $position})
@@ -1526,6 +1691,15 @@ class InferenceGraph:
     
         return result.single()
     
+    @staticmethod
+    def bump_graph_version(tx):
+        tx.run(GRAPH_VERSION_BUMP)
+    
+    @staticmethod
+    def fetch_graph_version(tx):
+        record = tx.run(GRAPH_VERSION_QUERY).single()
+        return record["token"] if record else None
+    
     @staticmethod
     def delete_all_nodes(tx):
         tx.run("MATCH (n)"
@@ -1551,6 +1725,18 @@ class InferenceGraph:
     
         return result.single()
     
+    @staticmethod
+    def verify_move_features_relation(tx, claims):
+        keys = ("piece1", "color1", "position1", "piece2", "color2", "position2", "move", "feature")
+        claims = [dict(zip(keys, claim), index=index) for index, claim in enumerate(claims)]
+        result = tx.run("""UNWIND $claims AS claim
+                MATCH (piece:Piece {piece: claim.piece1, color: claim.color1, position: claim.position1}) -[feature:Feature {feature: claim.feature, piece: claim.piece2, color: claim.color2, position: claim.position2}]-> (square:Square {position: claim.move})
+                RETURN DISTINCT claim.index AS index
+               """,
+               claims=claims)
+        
+        return [record["index"] for record in result]
+    
     @staticmethod
     def verify_move_feature_relation_missing_param(tx, feature):
         result = tx.run("""MATCH (piece:Piece) -[feature:Feature {feature: $feature}]-> (square:Square)
@@ -1587,6 +1773,16 @@ class InferenceGraph:
                 CREATE (piece)-[:Feature {feature: $feature}]->(to_square)""",
                 piece=piece, color=color, from_position=from_position, feature=feature, to_position=to_position
                 )
+
+    @staticmethod
+    def build_features_relation(tx, moves, feature):
+        tx.run("""UNWIND $moves AS move
+                MATCH (piece:Piece {piece: move.piece, color: move.color}), (to_square:Square {position: move.to})
+                WITH piece, to_square, move
+                MATCH (piece) -[:Locate]-> (from_square:Square {position: move.from})
+                CREATE (piece)-[:Feature {feature: $feature}]->(to_square)""",
+                moves=moves, feature=feature
+                )
      
     @staticmethod
     def create_discovery_attack(tx, piece, color, current_position, next_position, ally_piece, ally_color, ally_position, opponent_piece, opponent_color, opponent_position):
@@ -1689,6 +1885,39 @@ class InferenceGraph:
             )
 
 
+class RecordingGraph(InferenceGraph):
+    '''
+    Knowledge graph stand-in that records writes instead of running them,
+    so an analysis can be built off the database and applied later with InferenceGraph.replay.
+    '''
+    
+    def __init__(self):
+        self.writes = []
+    
+    def _write(self, tx_function, *args):
+        self.writes.append((tx_function, args))
+    
+    def take(self):
+        writes, self.writes = self.writes, []
+        return writes
+    
+    def close(self):
+        pass
+    
+    def _read(self, tx_function, *args):
+        # there is no driver, and the recorded writes never reach the database
+        raise NotImplementedError(f"RecordingGraph cannot run the read {getattr(tx_function, '__name__', tx_function)}, only fetch_suggest is answered from the recorded writes")
+    
+    def fetch_suggest(self, piece, color, from_position, to_position):
+        # answered from the recorded Suggest writes, they never reach the database
+        return [
+            args[4] for tx_function, args in self.writes
+            if getattr(tx_function, "__name__", tx_function) == "create_suggest_relation" and tuple(args[:4]) == (piece, color, from_position, to_position)
+        ]
+
+
+metrics.register("graph_read_cache", InferenceGraph.cache_stats)
+
 # sym = Symbolic()
 # sym.consult("server/neurosymbolicAI/symbolicAI/general.pl")
 # sym.parse_fen("3r4/7p/8/R1N2bk1/2p5/2P5/PP2r1PP/2KR4 b - - 2 29")
@@ -60,3 +60,31 @@ verify_relation(Piece, Color, UCIPosition, OpponentPiece, OpponentColor, Opponen
     ).
 
 
+% Rule: Verify Positions
+%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+% Description: Check every position(Piece, Color, UCIPosition) claim of list Claims in a single query. Results holds,        %
+%              in order, [Color, UCIPosition] of the first match of each claim or false when the claim does not hold.        %
+%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+verify_positions([], []).
+verify_positions([position(Piece, Color, UCIPosition) | Claims], [Result | Results]):-
+    (
+        verify_position(Piece, Color, UCIPosition)
+    ->  Result = [Color, UCIPosition]
+    ;   Result = false
+    ),
+    verify_positions(Claims, Results).
+
+% Rule: Verify Relations
+%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+% Description: Check every relation(Piece, Color, UCIPosition, Piece2, Color2, UCIPosition2, Relation) claim of list Claims  %
+%              in a single query. Results holds, in order, [Color, UCIPosition, Piece2, Color2, UCIPosition2] of the first   %
+%              match of each claim or false when the claim does not hold.                                                    %
+%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+verify_relations([], []).
+verify_relations([relation(Piece, Color, UCIPosition, Piece2, Color2, UCIPosition2, Relation) | Claims], [Result | Results]):-
+    (
+        verify_relation(Piece, Color, UCIPosition, Piece2, Color2, UCIPosition2, Relation)
+    ->  Result = [Color, UCIPosition, Piece2, Color2, UCIPosition2]
+    ;   Result = false
+    ),
+    verify_relations(Claims, Results).
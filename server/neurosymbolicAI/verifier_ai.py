@@ -1,16 +1,24 @@
 import os
 import json
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from langchain_community.chat_models import ChatOpenAI
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.prompts import PromptTemplate
 from langchain.agents import AgentExecutor, create_react_agent
+from langchain_core.output_parsers import JsonOutputParser
 from kor import create_extraction_chain, Object, Text
 from .symbolicAI import Symbolic
+from .direct_agent import DirectAgent, direct_agents_enabled
+from . import claim_rules
+from .claim_rules import CLAIM_FIELDS
 from server.config import get_secret
+from server.llm_cache import llm_cache
 try:  # pragma: no cover
     from ..prompts import (
         VERIFIER_JSON_PROMPT,
         VERIFIER_FIX_PROMPT,
+        VERIFIER_CLAIMS_PROMPT,
         POSITION_SCHEMA_DESCRIPTION,
         RELATION_SCHEMA_DESCRIPTION,
         MOVE_FEATURE_SCHEMA_DESCRIPTION,
@@ -19,6 +27,7 @@ except ImportError:  # pragma: no cover
     from prompts import (
         VERIFIER_JSON_PROMPT,
         VERIFIER_FIX_PROMPT,
+        VERIFIER_CLAIMS_PROMPT,
         POSITION_SCHEMA_DESCRIPTION,
         RELATION_SCHEMA_DESCRIPTION,
         MOVE_FEATURE_SCHEMA_DESCRIPTION,
@@ -45,6 +54,7 @@ class Verifier():
             model="gpt-4o-mini",
             temperature=0,
             api_key=get_secret("OPENAI_API_KEY"),
+            cache=llm_cache,
         )
 
         self.sym = Symbolic()
@@ -52,25 +62,57 @@ class Verifier():
         
         self.agent_prompt = PromptTemplate.from_template(VERIFIER_JSON_PROMPT)
         
-        self.agent = create_react_agent(self.llm, [], self.agent_prompt)
-        self.agent_executor = AgentExecutor(
-            agent=self.agent,
-            tools=[],
-            verbose=True
-        )
-        
         self.fix_agent_prompt =  PromptTemplate.from_template(VERIFIER_FIX_PROMPT)
         
-        self.fix_agent = create_react_agent(self.llm, [], self.fix_agent_prompt)
-        self.fix_agent_executor = AgentExecutor(
-            agent=self.fix_agent,
-            tools=[],
-            verbose=True,
-        )
+        # neither agent has tools, a single prompt call returns the same Final Answer
+        if direct_agents_enabled():
+            self.agent_executor = DirectAgent(self.llm, self.agent_prompt)
+            self.fix_agent_executor = DirectAgent(self.llm, self.fix_agent_prompt)
+        else:
+            self.agent = create_react_agent(self.llm, [], self.agent_prompt)
+            self.agent_executor = AgentExecutor(
+                agent=self.agent,
+                tools=[],
+                verbose=True
+            )
+            
+            self.fix_agent = create_react_agent(self.llm, [], self.fix_agent_prompt)
+            self.fix_agent_executor = AgentExecutor(
+                agent=self.fix_agent,
+                tools=[],
+                verbose=True,
+            )
+        
+        # one structured call extracting every claim of a commentary
+        self.claims_prompt = PromptTemplate.from_template(VERIFIER_CLAIMS_PROMPT)
+        self.claims_parser = JsonOutputParser()
+        
+        # parse templated commentary with claim_rules, the LLM only sees unmatched sentences
+        self.rule_extraction = os.getenv("CAISSA_VERIFIER_RULE_CLAIMS", "1") != "0"
+        
+        # statements of one commentary checked at the same time
+        self.max_concurrency = int(os.getenv("CAISSA_VERIFIER_CONCURRENCY", "4"))
         
     def parse_fen(self, fen_string: str):
         self.sym.parse_fen(fen_string)
 
+    def _map_statements(self, check_statement, statements) -> list:
+        '''
+        Runs check_statement(index, statement) for every statement, at most max_concurrency at a time.
+        
+        :param: :check_statement: callable returning the verified statements for one commentary statement
+        :param: :statements: commentary statements in their original order
+        :return: one result per statement, in the same order as statements
+        '''
+        
+        if self.max_concurrency <= 1 or len(statements) <= 1:
+            return [check_statement(index, statement) for index, statement in enumerate(statements)]
+        
+        # every statement runs in a copy of the caller's context, which carries the get_openai_callback token counter
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(statements))) as executor:
+            futures = [executor.submit(contextvars.copy_context().run, check_statement, index, statement) for index, statement in enumerate(statements)]
+            return [future.result() for future in futures]
+
     def verify_piece_position(self, response) -> list:
         '''
         Checks whether the position of the piece specified in the commentary is valid.
@@ -109,10 +151,9 @@ class Verifier():
         structured_response = json.loads(str(structured_response['output']).replace("\'", "\""))
         print("after structured_response:", structured_response)
         
-        for index, statement_key in enumerate(structured_response['statements']):
+        def check_statement(index, statement):
+            statement_results = []
             try:
-                print("statement_key:", statement_key) 
-                statement = structured_response['statements'][statement_key]
                 print(f"statement_{index + 1}:", statement)
             
                 structured_filtered_response = chain.invoke(statement)['text']['raw']
@@ -122,41 +163,64 @@ class Verifier():
 
                 piece_info = json.loads(json_response["position schema"]["piece"][0].replace("\'", "\""))
                 print("piece_info:", piece_info)
-                
-                piece = piece_info['piece']
-                color = piece_info['color']
-                position = piece_info['position']
-                
-                print("piece name:", piece)
-                print("color:", color)
-                print("position:", position)
-                
-                # Use Symbolic class to verfiy the statement
-                response = self.sym.verify_position(piece, color, position)
-                print("response:", response)
-                
-                if piece == "N/A"or len(response) == 0:
-                    list_of_statements.append({"statement": statement, "condition": False})
-                elif color == "N/A" or position == "N/A":
-                    if color == "N/A":
-                        color = response[0]['Color']
-
-                    if position == "N/A":
-                        position = response[0]['Position']
-                        
-                    fix_agent_input = {"statement": statement, "piece": piece, "color": color, "position": position}
-                    print("fix_agent_input:", f"""{fix_agent_input}""")
-                    fixed_statement = self.fix_agent_executor.invoke({"input": f"""{fix_agent_input}"""})['output']
-                    print("fixed_statement:", fixed_statement)      
-                    list_of_statements.append({"statement": fixed_statement, "condition": True})              
-                else:
-                    if not(len(response) == 0):
-                        list_of_statements.append({"statement": statement, "condition": True}) 
+
+                statement_results.extend(self._check_position_claim(statement, piece_info))
             except:
                 pass
 
+            return statement_results
+
+        statements = list(structured_response['statements'].values())
+        for statement_results in self._map_statements(check_statement, statements):
+            list_of_statements.extend(statement_results)
+
         return list_of_statements
         
+    def _check_position_claim(self, statement, piece_info, response=None) -> list:
+        '''
+        Checks a single piece-position claim against the symbolic engine.
+        
+        :param: :statement: commentary statement the claim was extracted from
+        :param: :piece_info: dict with piece, color and position, 'N/A' for unknown fields
+        :param: :response: solutions already fetched by a batch query, None queries the engine
+        :return: a list of dict
+        '''
+        
+        statement_results = []
+        
+        piece = piece_info['piece']
+        color = piece_info['color']
+        position = piece_info['position']
+        
+        print("piece name:", piece)
+        print("color:", color)
+        print("position:", position)
+        
+        # Use Symbolic class to verfiy the statement
+        if response is None:
+            response = self.sym.verify_position(piece, color, position)
+        print("response:", response)
+        
+        if piece == "N/A"or len(response) == 0:
+            statement_results.append({"statement": statement, "condition": False})
+        elif color == "N/A" or position == "N/A":
+            if color == "N/A":
+                color = response[0]['Color']
+
+            if position == "N/A":
+                position = response[0]['Position']
+                
+            fix_agent_input = {"statement": statement, "piece": piece, "color": color, "position": position}
+            print("fix_agent_input:", f"""{fix_agent_input}""")
+            fixed_statement = self.fix_agent_executor.invoke({"input": f"""{fix_agent_input}"""})['output']
+            print("fixed_statement:", fixed_statement)      
+            statement_results.append({"statement": fixed_statement, "condition": True})              
+        else:
+            if not(len(response) == 0):
+                statement_results.append({"statement": statement, "condition": True})
+
+        return statement_results
+
     def verify_piece_relation(self, response):
         '''
         Checks whether the move of a piece is legal.
@@ -196,9 +260,9 @@ class Verifier():
         structured_response = json.loads(structured_response['output'].replace("\'", "\""))
         print("after structured_response:", structured_response)
 
-        for index, statement_key in enumerate(structured_response['statements']):
+        def check_statement(index, statement):
+            statement_results = []
             try:
-                statement = structured_response['statements'][statement_key]
                 print(f"statement_{index + 1}:", statement)
             
                 json_response = chain.invoke(statement)['text']['data']['relation schema']['relations'][0]
@@ -210,67 +274,90 @@ class Verifier():
         
                 relation_info = json.loads(json_response)
                 print("relation_info:", relation_info)
-                    
-                piece1 = relation_info['piece']
-                color1 = relation_info['color']
-                position1 = relation_info['position']
-                
-                relation = relation_info['relation']
-                    
-                if relation == "defend":                    
-                    piece2 = relation_info['ally_piece']
-                    color2 = relation_info['ally_color']
-                    position2 = relation_info['ally_position']
-                elif relation == "threat":
-                    piece2 = relation_info['opponent_piece']
-                    color2 = relation_info['opponent_color']
-                    position2 = relation_info['opponent_position']
-                    
-                print("piece1:", piece1)
-                print("color1:", color1)
-                print("position1:", position1)
-                    
-                print("piece2:", piece2)
-                print("color2:", color2)
-                print("position2:", position2)
-                    
-                print("relation:", relation)
-                    
-                # Use Symbolic class to verfiy the statement
-                response = self.sym.verify_relation(piece1, color1, position1, piece2, color2, position2, relation)
-                print(response)
-                
-                if piece1 == "N/A" or relation == "N/A" or len(response) == 0:
-                    list_of_statements.append({"statement": statement, "condition": False})
-                elif color1 == "N/A" or position1 == "N/A" or color2 == "N/A" or position2 == "N/A" or piece2 == "N/A":
-                    if color1 == "N/A":
-                        color1 = response[0]['Color1']
-
-                    if position1 == "N/A":
-                        position1 = response[0]['Position1']
-                        
-                    if piece2 == "N/A":
-                        piece2 = response[0]['Piece2']
-                    
-                    if color2 == "N/A":
-                        color2 = response[0]['Color2']
-                        
-                    if position2 == "N/A":
-                        position2 = response[0]['Position2']
-                        
-                    fix_agent_input = {"statement": statement, "piece1": piece1, "color1": color1, "position1": position1, "piece2": piece2, "color2": color2, "position2": position2, "relation": relation}
-                    print("fix_agent_input:", f"""{fix_agent_input}""")
-                    fixed_statement = self.fix_agent_executor.invoke({"input": f"""{fix_agent_input}"""})['output']
-                    print("fixed_statement:", fixed_statement)      
-                    list_of_statements.append({"statement": fixed_statement, "condition": True})              
-                else:
-                    if not(len(response) == 0):
-                        list_of_statements.append({"statement": statement, "condition": True})
+
+                statement_results.extend(self._check_relation_claim(statement, relation_info))
             except:
                 pass
-                        
+
+            return statement_results
+
+        statements = list(structured_response['statements'].values())
+        for statement_results in self._map_statements(check_statement, statements):
+            list_of_statements.extend(statement_results)
+
         return list_of_statements
 
+    def _check_relation_claim(self, statement, relation_info, response=None) -> list:
+        '''
+        Checks a single defend/threat claim against the symbolic engine.
+        
+        :param: :statement: commentary statement the claim was extracted from
+        :param: :relation_info: dict with the piece, the relation and the ally or opponent piece
+        :param: :response: solutions already fetched by a batch query, None queries the engine
+        :return: a list of dict
+        '''
+        
+        statement_results = []
+        
+        piece1 = relation_info['piece']
+        color1 = relation_info['color']
+        position1 = relation_info['position']
+        
+        relation = relation_info['relation']
+            
+        if relation == "defend":                    
+            piece2 = relation_info['ally_piece']
+            color2 = relation_info['ally_color']
+            position2 = relation_info['ally_position']
+        elif relation == "threat":
+            piece2 = relation_info['opponent_piece']
+            color2 = relation_info['opponent_color']
+            position2 = relation_info['opponent_position']
+            
+        print("piece1:", piece1)
+        print("color1:", color1)
+        print("position1:", position1)
+            
+        print("piece2:", piece2)
+        print("color2:", color2)
+        print("position2:", position2)
+            
+        print("relation:", relation)
+            
+        # Use Symbolic class to verfiy the statement
+        if response is None:
+            response = self.sym.verify_relation(piece1, color1, position1, piece2, color2, position2, relation)
+        print(response)
+        
+        if piece1 == "N/A" or relation == "N/A" or len(response) == 0:
+            statement_results.append({"statement": statement, "condition": False})
+        elif color1 == "N/A" or position1 == "N/A" or color2 == "N/A" or position2 == "N/A" or piece2 == "N/A":
+            if color1 == "N/A":
+                color1 = response[0]['Color1']
+
+            if position1 == "N/A":
+                position1 = response[0]['Position1']
+                
+            if piece2 == "N/A":
+                piece2 = response[0]['Piece2']
+            
+            if color2 == "N/A":
+                color2 = response[0]['Color2']
+                
+            if position2 == "N/A":
+                position2 = response[0]['Position2']
+                
+            fix_agent_input = {"statement": statement, "piece1": piece1, "color1": color1, "position1": position1, "piece2": piece2, "color2": color2, "position2": position2, "relation": relation}
+            print("fix_agent_input:", f"""{fix_agent_input}""")
+            fixed_statement = self.fix_agent_executor.invoke({"input": f"""{fix_agent_input}"""})['output']
+            print("fixed_statement:", fixed_statement)      
+            statement_results.append({"statement": fixed_statement, "condition": True})              
+        else:
+            if not(len(response) == 0):
+                statement_results.append({"statement": statement, "condition": True})
+
+        return statement_results
+
     def verify_piece_move_feature(self, response):
         '''
         Checks whether piece have certain move relation.
@@ -309,9 +396,9 @@ class Verifier():
         print("after structured_response:", structured_response)
 
     
-        for index, statement_key in enumerate(structured_response['statements']): 
+        def check_statement(index, statement):
+            statement_results = []
             try:
-                statement = structured_response['statements'][statement_key]
                 print(f"statement_{index + 1}:", statement)
             
                 json_response = chain.invoke(statement)['text']['data']['move feature schema']['move feature'][0]
@@ -323,157 +410,308 @@ class Verifier():
         
                 move_info = json.loads(json_response)
                 print("move_info:", move_info)
-                 
-                piece1 = move_info['piece']
-                color1 = move_info['color']
-                position1 = move_info['position']
-                
-                feature = move_info['feature']
-                
-                move = move_info['move']
-                print("move:", move)
-                 
-                if feature == "move_defend" or feature == "move_is_protected":                    
-                    piece2 = move_info['ally_piece']
-                    color2 = move_info['ally_color']
-                    position2 = move_info['ally_position']
-                elif feature == "move_threat" or feature == "move_is_attacked":
-                    piece2 = move_info['opponent_piece']
-                    color2 = move_info['opponent_color']
-                    position2 = move_info['opponent_position']
-                
-                print("piece1:", piece1)
-                print("color1:", color1)
-                print("position1:", position1)
-                
-                print("piece2:", piece2)
-                print("color2:", color2)
-                print("position2:", position2)
-                
-                print("feature:", feature)
-                
-                if color1 == "N/A" and not(color2 == "N/A"):
-                    if feature == "move_defend" or feature == "move_is_protected":
-                        color1 = "white" if color2 == "white" else "black"
-                    elif feature == "move_threat" or feature == "move_is_attacked":
-                        color1 = "white" if color2 == "black" else "black"
-                
-                if color2 == "N/A" and not(color1 == "N/A"):
-                    if feature == "move_defend" or feature == "move_is_protected":
-                        color2 = "white" if color1 == "white" else "black"
-                    elif feature == "move_threat" or feature == "move_is_attacked":
-                        color1 = "black" if color1 == "white" else "white"
-                
-                # Use Symbolic class to verfiy the statement
-                if piece1 == "N/A" or feature == "N/A" or color1 == "N/A" or color2 == "N/A":
-                    list_of_statements.append({"statement": statement, "condition": False})
-                elif piece1 == "N/A" or position1 == "N/A" or piece2 == "N/A" or position2 == "N/A":
-                    responses = self.sym.graph.verify_move_feature_missing_param(feature)
-                    # print("responses:", responses)
-                    
-                    list_of_true_elem = []
-                    list_of_false_elem = []
-                   
-                    if not(piece2 == "N/A"):
-                        if not(position2 == "N/A"):
-                            if not(position1 == "N/A"):
-                                for response in responses:
-                                    try:
-                                        if piece1 == response['piece1'] and piece2 == response['piece2'] and color1 == response['color1'] and color2 == response['color2'] and position1 == response['position1'] and position2 == response["position2"] and ((not(move == "N/A") and move == response["to"]) or move == "N/A"):
-                                            list_of_true_elem.append({"statement": statement, "piece1": piece1, "color1": color1, "position1": position1, "from_position": position1, "to_position": response["to"] if move == "N/A" else move, "piece2": piece2, "color2": color2, "position2": position2})
-                                        else:
-                                            list_of_false_elem.append({"statement": statement})
-                                    except:
-                                        pass
-                            else:
-                                for response in responses:
-                                    try:
-                                        if piece1 == response['piece1'] and piece2 == response['piece2'] and color1 == response['color1'] and color2 == response['color2'] and position2 == response['position2'] and ((not(move == "N/A") and move == response["to"]) or move == "N/A"):
-                                            list_of_true_elem.append({"statement": statement, "piece1": piece1, "color1": color1, "position1": response['position1'], "from_position": response['position1'], "to_position": response["to"] if move == "N/A" else move, "piece2": piece2, "color2": color2, "position2": position2})
-                                        else:
-                                            list_of_false_elem.append({"statement": statement})
-                                    except:
-                                        pass
-                        else:
-                            if (position1 == "N/A"):
-                                for response in responses:
-                                    try:
-                                        if piece1 == response['piece1'] and piece2 == response['piece2'] and color1 == response['color1'] and color2 == response['color2'] and position1 == response['position1'] and ((not(move == "N/A") and move == response["to"]) or move == "N/A"):
-                                            list_of_true_elem.append({"statement": statement, "piece1": piece1, "color1": color1, "position1": position1, "from_position": position1, "to_position": response["to"] if move == "N/A" else move, "piece2": piece2, "color2": color2, "position2": response['position2']})
-                                        else:
-                                            list_of_false_elem.append({"statement": statement})
-                                    except:
-                                        pass
-                            else:
-                                for response in responses:
-                                    try:
-                                        if piece1 == response['piece1'] and piece2 == response['piece2'] and color1 == response['color1'] and color2 == response['color2'] and ((not(move == "N/A") and move == response["to"]) or move == "N/A"):
-                                            list_of_true_elem.append({"statement": statement, "piece1": piece1, "color1": color1, "position1": response['position1'], "from_position": response['position1'], "to_position": response["to"] if move == "N/A" else move, "piece2": piece2, "color2": color2, "position2": response['position2']})
-                                        else:
-                                            list_of_false_elem.append({"statement": statement})
-                                    except:
-                                        pass
-                    else:
-                        if not(position2 == "N/A"):
-                            if not(position1 == "N/A"):
-                                for response in responses:
-                                    try:
-                                        if piece1 == response['piece1'] and color1 == response['color1'] and color2 == response['color2'] and position1 == response['position1'] and position2 == response["position2"] and ((not(move == "N/A") and move == response["to"]) or move == "N/A"):
-                                            list_of_true_elem.append({"statement": statement, "piece1": piece1, "color1": color1, "position1": position1, "from_position": position1, "to_position": response["to"] if move == "N/A" else move, "piece2": response['piece2'], "color2": color2, "position2": position2})
-                                        else:
-                                            list_of_false_elem.append({"statement": statement})
-                                    except:
-                                        pass
-                            else:
-                                for response in responses:
-                                    try:
-                                        if piece1 == response['piece1'] and color1 == response['color1'] and color2 == response['color2'] and position2 == response['position2'] and ((not(move == "N/A") and move == response["to"]) or move == "N/A"):
-                                            list_of_true_elem.append({"statement": statement, "piece1": piece1, "color1": color1, "position1": response['position1'], "from_position": response['position1'], "to_position": response["to"] if move == "N/A" else move, "piece2": response['piece2'], "color2": color2, "position2": position2})
-                                        else:
-                                            list_of_false_elem.append({"statement": statement})
-                                    except:
-                                        pass
-                        else:
-                            if (position1 == "N/A"):
-                                for response in responses:
-                                    try:
-                                        if piece1 == response['piece1'] and color1 == response['color1'] and color2 == response['color2'] and position1 == response['position1'] and ((not(move == "N/A") and move == response["to"]) or move == "N/A"):
-                                            list_of_true_elem.append({"statement": statement, "piece1": piece1, "color1": color1, "position1": position1, "from_position": position1, "to_position": response["to"] if move == "N/A" else move, "piece2": response['piece2'], "color2": color2, "position2": response['position2']})
-                                        else:
-                                            list_of_false_elem.append({"statement": statement})
-                                    except:
-                                        pass
-                            else:
-                                for response in responses:
-                                    try:
-                                        if piece1 == response['piece1'] and color1 == response['color1'] and color2 == response['color2'] and ((not(move == "N/A") and move == response["to"]) or move == "N/A"):
-                                            list_of_true_elem.append({"statement": statement, "piece1": piece1, "color1": color1, "position1": response['position1'], "from_position": response['position1'], "to_position": response["to"] if move == "N/A" else move, "piece2": response['piece2'], "color2": color2, "position2": response['position2']})
-                                        else:
-                                            list_of_false_elem.append({"statement": statement})
-                                    except:
-                                        pass
-                                                        
-                    for correct_statement in list_of_true_elem:
-                        try:
-                            print("correct_statement:", f"""{correct_statement}""")
-                            fixed_statement = self.fix_agent_executor.invoke({"input": f"""{correct_statement}"""})['output']
-                            print("fixed_statement:", fixed_statement)      
-                            list_of_statements.append({"statement": fixed_statement, "condition": True})  
-                        except:
-                            pass
-                        
-                    if len(correct_statement) == 0:
-                        list_of_statements.append({"statement": statement, "condition": False}) 
 
-                else:
-                    response = self.sym.graph.verify_move_feature(piece1, color1, position1, piece2, color2, position2, move, feature)
-                    print("response:", response[0]['piece'])
-                    
-                    if response == None or response[0] == None: # Incorrect
-                        list_of_statements.append({"statement": statement, "condition": False})
-                    elif response[0]['piece'] == piece1: # Correct
-                        list_of_statements.append({"statement": statement, "condition": True})    
+                statement_results.extend(self._check_move_feature_claim(statement, move_info))
             except:
                 pass
+
+            return statement_results
+
+        statements = list(structured_response['statements'].values())
+        for statement_results in self._map_statements(check_statement, statements):
+            list_of_statements.extend(statement_results)
+
+        return list_of_statements
+
+    def _check_move_feature_claim(self, statement, move_info, response=None) -> list:
+        '''
+        Checks a single move-feature claim against the knowledge graph.
+        
+        :param: :statement: commentary statement the claim was extracted from
+        :param: :move_info: dict with the piece, the move, the feature and the ally or opponent piece
+        :param: :response: truth value already fetched by a batch query, None queries the graph
+        :return: a list of dict
+        '''
+        
+        statement_results = []
+        
+        piece1 = move_info['piece']
+        color1 = move_info['color']
+        position1 = move_info['position']
+        
+        feature = move_info['feature']
+        
+        move = move_info['move']
+        print("move:", move)
+         
+        if feature == "move_defend" or feature == "move_is_protected":                    
+            piece2 = move_info['ally_piece']
+            color2 = move_info['ally_color']
+            position2 = move_info['ally_position']
+        elif feature == "move_threat" or feature == "move_is_attacked":
+            piece2 = move_info['opponent_piece']
+            color2 = move_info['opponent_color']
+            position2 = move_info['opponent_position']
+        
+        print("piece1:", piece1)
+        print("color1:", color1)
+        print("position1:", position1)
+        
+        print("piece2:", piece2)
+        print("color2:", color2)
+        print("position2:", position2)
+        
+        print("feature:", feature)
+        
+        if color1 == "N/A" and not(color2 == "N/A"):
+            if feature == "move_defend" or feature == "move_is_protected":
+                color1 = "white" if color2 == "white" else "black"
+            elif feature == "move_threat" or feature == "move_is_attacked":
+                color1 = "white" if color2 == "black" else "black"
+        
+        if color2 == "N/A" and not(color1 == "N/A"):
+            if feature == "move_defend" or feature == "move_is_protected":
+                color2 = "white" if color1 == "white" else "black"
+            elif feature == "move_threat" or feature == "move_is_attacked":
+                color1 = "black" if color1 == "white" else "white"
+        
+        # Use Symbolic class to verfiy the statement
+        if piece1 == "N/A" or feature == "N/A" or color1 == "N/A" or color2 == "N/A":
+            statement_results.append({"statement": statement, "condition": False})
+        elif piece1 == "N/A" or position1 == "N/A" or piece2 == "N/A" or position2 == "N/A":
+            responses = self.sym.graph.verify_move_feature_missing_param(feature)
+            # print("responses:", responses)
+            
+            list_of_true_elem = []
+            list_of_false_elem = []
+           
+            if not(piece2 == "N/A"):
+                if not(position2 == "N/A"):
+                    if not(position1 == "N/A"):
+                        for response in responses:
+                            try:
+                                if piece1 == response['piece1'] and piece2 == response['piece2'] and color1 == response['color1'] and color2 == response['color2'] and position1 == response['position1'] and position2 == response["position2"] and ((not(move == "N/A") and move == response["to"]) or move == "N/A"):
+                                    list_of_true_elem.append({"statement": statement, "piece1": piece1, "color1": color1, "position1": position1, "from_position": position1, "to_position": response["to"] if move == "N/A" else move, "piece2": piece2, "color2": color2, "position2": position2})
+                                else:
+                                    list_of_false_elem.append({"statement": statement})
+                            except:
+                                pass
+                    else:
+                        for response in responses:
+                            try:
+                                if piece1 == response['piece1'] and piece2 == response['piece2'] and color1 == response['color1'] and color2 == response['color2'] and position2 == response['position2'] and ((not(move == "N/A") and move == response["to"]) or move == "N/A"):
+                                    list_of_true_elem.append({"statement": statement, "piece1": piece1, "color1": color1, "position1": response['position1'], "from_position": response['position1'], "to_position": response["to"] if move == "N/A" else move, "piece2": piece2, "color2": color2, "position2": position2})
+                                else:
+                                    list_of_false_elem.append({"statement": statement})
+                            except:
+                                pass
+                else:
+                    if (position1 == "N/A"):
+                        for response in responses:
+                            try:
+                                if piece1 == response['piece1'] and piece2 == response['piece2'] and color1 == response['color1'] and color2 == response['color2'] and position1 == response['position1'] and ((not(move == "N/A") and move == response["to"]) or move == "N/A"):
+                                    list_of_true_elem.append({"statement": statement, "piece1": piece1, "color1": color1, "position1": position1, "from_position": position1, "to_position": response["to"] if move == "N/A" else move, "piece2": piece2, "color2": color2, "position2": response['position2']})
+                                else:
+                                    list_of_false_elem.append({"statement": statement})
+                            except:
+                                pass
+                    else:
+                        for response in responses:
+                            try:
+                                if piece1 == response['piece1'] and piece2 == response['piece2'] and color1 == response['color1'] and color2 == response['color2'] and ((not(move == "N/A") and move == response["to"]) or move == "N/A"):
+                                    list_of_true_elem.append({"statement": statement, "piece1": piece1, "color1": color1, "position1": response['position1'], "from_position": response['position1'], "to_position": response["to"] if move == "N/A" else move, "piece2": piece2, "color2": color2, "position2": response['position2']})
+                                else:
+                                    list_of_false_elem.append({"statement": statement})
+                            except:
+                                pass
+            else:
+                if not(position2 == "N/A"):
+                    if not(position1 == "N/A"):
+                        for response in responses:
+                            try:
+                                if piece1 == response['piece1'] and color1 == response['color1'] and color2 == response['color2'] and position1 == response['position1'] and position2 == response["position2"] and ((not(move == "N/A") and move == response["to"]) or move == "N/A"):
+                                    list_of_true_elem.append({"statement": statement, "piece1": piece1, "color1": color1, "position1": position1, "from_position": position1, "to_position": response["to"] if move == "N/A" else move, "piece2": response['piece2'], "color2": color2, "position2": position2})
+                                else:
+                                    list_of_false_elem.append({"statement": statement})
+                            except:
+                                pass
+                    else:
+                        for response in responses:
+                            try:
+                                if piece1 == response['piece1'] and color1 == response['color1'] and color2 == response['color2'] and position2 == response['position2'] and ((not(move == "N/A") and move == response["to"]) or move == "N/A"):
+                                    list_of_true_elem.append({"statement": statement, "piece1": piece1, "color1": color1, "position1": response['position1'], "from_position": response['position1'], "to_position": response["to"] if move == "N/A" else move, "piece2": response['piece2'], "color2": color2, "position2": position2})
+                                else:
+                                    list_of_false_elem.append({"statement": statement})
+                            except:
+                                pass
+                else:
+                    if (position1 == "N/A"):
+                        for response in responses:
+                            try:
+                                if piece1 == response['piece1'] and color1 == response['color1'] and color2 == response['color2'] and position1 == response['position1'] and ((not(move == "N/A") and move == response["to"]) or move == "N/A"):
+                                    list_of_true_elem.append({"statement": statement, "piece1": piece1, "color1": color1, "position1": position1, "from_position": position1, "to_position": response["to"] if move == "N/A" else move, "piece2": response['piece2'], "color2": color2, "position2": response['position2']})
+                                else:
+                                    list_of_false_elem.append({"statement": statement})
+                            except:
+                                pass
+                    else:
+                        for response in responses:
+                            try:
+                                if piece1 == response['piece1'] and color1 == response['color1'] and color2 == response['color2'] and ((not(move == "N/A") and move == response["to"]) or move == "N/A"):
+                                    list_of_true_elem.append({"statement": statement, "piece1": piece1, "color1": color1, "position1": response['position1'], "from_position": response['position1'], "to_position": response["to"] if move == "N/A" else move, "piece2": response['piece2'], "color2": color2, "position2": response['position2']})
+                                else:
+                                    list_of_false_elem.append({"statement": statement})
+                            except:
+                                pass
+                                                
+            for correct_statement in list_of_true_elem:
+                try:
+                    print("correct_statement:", f"""{correct_statement}""")
+                    fixed_statement = self.fix_agent_executor.invoke({"input": f"""{correct_statement}"""})['output']
+                    print("fixed_statement:", fixed_statement)      
+                    statement_results.append({"statement": fixed_statement, "condition": True})  
+                except:
+                    pass
                 
+            if len(list_of_true_elem) == 0:
+                statement_results.append({"statement": statement, "condition": False}) 
+
+        elif response is not None:
+            statement_results.append({"statement": statement, "condition": response})
+        else:
+            response = self.sym.graph.verify_move_feature(piece1, color1, position1, piece2, color2, position2, move, feature)
+            print("response:", response[0]['piece'])
+            
+            if response == None or response[0] == None: # Incorrect
+                statement_results.append({"statement": statement, "condition": False})
+            elif response[0]['piece'] == piece1: # Correct
+                statement_results.append({"statement": statement, "condition": True})
+
+        return statement_results
+
+    def extract_claims(self, response) -> dict:
+        '''
+        Extracts every position, relation and move-feature claim of a commentary.
+        
+        Sentences following the NeuroSymbolic templates are parsed by claim_rules, the rest
+        are extracted with a single LLM call that is skipped when every sentence was matched.
+        
+        :param: :response: response propagated from the chess solver
+        :return: dict with "positions", "relations" and "move_features" lists, missing fields set to 'N/A'
+        '''
+        
+        if not self.rule_extraction:
+            return self._extract_claims_with_llm(response)
+        
+        claims, unmatched = claim_rules.extract_claims(response)
+        print("rule claims:", claims)
+        
+        if unmatched:
+            llm_claims = self._extract_claims_with_llm(" ".join(unmatched))
+            for kind in CLAIM_FIELDS:
+                claims[kind].extend(llm_claims[kind])
+        
+        return claims
+
+    def _extract_claims_with_llm(self, response) -> dict:
+        '''
+        Extracts every claim of a commentary with a single LLM call.
+        
+        :param: :response: commentary, or the sentences of it claim_rules could not parse
+        :return: dict with "positions", "relations" and "move_features" lists, missing fields set to 'N/A'
+        '''
+        
+        message = self.llm.invoke(self.claims_prompt.format(input=response))
+        output = getattr(message, "content", message)
+        print("claims output:", output)
+        parsed = self.claims_parser.parse(output)
+        
+        claims = {}
+        for kind, fields in CLAIM_FIELDS.items():
+            claims[kind] = []
+            for claim in parsed.get(kind) or []:
+                if not isinstance(claim, dict):
+                    continue
+                normalized = {"statement": str(claim.get("statement", ""))}
+                for field in fields:
+                    value = claim.get(field)
+                    value = "N/A" if value is None else str(value).strip()
+                    normalized[field] = "N/A" if value.upper() in ("N/A", "") else value.lower()
+                claim = normalized
+                claims[kind].append(claim)
+        
+        return claims
+
+    def _verify_claims_in_batch(self, claims) -> dict:
+        '''
+        Checks the claims of a commentary with one Prolog query per kind and one Cypher query.
+        
+        Claims missing from the result (failed batch, or move features with unknown fields)
+        are checked one by one.
+        
+        :param: :claims: dict returned by extract_claims
+        :return: dict mapping (kind, index) to the response the matching _check_* method expects
+        '''
+        
+        batched = {}
+        
+        positions = [(claim["piece"], claim["color"], claim["position"]) for claim in claims["positions"]]
+        solutions = self.sym.verify_positions(positions) if positions else None
+        for index, solution in enumerate(solutions or []):
+            batched[("positions", index)] = [] if solution is None else [solution]
+        
+        relations = []
+        for claim in claims["relations"]:
+            side = "ally" if claim["relation"] == "defend" else "opponent"
+            relations.append((claim["piece"], claim["color"], claim["position"], claim[f"{side}_piece"], claim[f"{side}_color"], claim[f"{side}_position"], claim["relation"]))
+        solutions = self.sym.verify_relations(relations) if relations else None
+        for index, solution in enumerate(solutions or []):
+            batched[("relations", index)] = [] if solution is None else [solution]
+        
+        move_features = {}
+        for index, claim in enumerate(claims["move_features"]):
+            side = "ally" if claim["feature"] in ("move_defend", "move_is_protected") else "opponent"
+            fields = (claim["piece"], claim["color"], claim["position"], claim[f"{side}_piece"], claim[f"{side}_color"], claim[f"{side}_position"], claim["move"], claim["feature"])
+            if "N/A" not in fields:
+                move_features[index] = fields
+        if move_features:
+            try:
+                verified = self.sym.graph.verify_move_features(list(move_features.values()))
+                batched.update((("move_features", index), condition) for index, condition in zip(move_features, verified))
+            except Exception as exc:
+                print("move features could not be checked in batch:", exc)
+        
+        return batched
+
+    def verify_commentary(self, response) -> list:
+        '''
+        Verifies every claim of a commentary from one structured extraction call.
+        
+        :param: :response: response propagated from the chess solver
+        :return: a list of dict
+        '''
+        
+        claims = self.extract_claims(response)
+        print("claims:", claims)
+        
+        checks = {
+            "positions": self._check_position_claim,
+            "relations": self._check_relation_claim,
+            "move_features": self._check_move_feature_claim,
+        }
+        batched = self._verify_claims_in_batch(claims)
+        jobs = [(checks[kind], claim, batched.get((kind, index))) for kind in checks for index, claim in enumerate(claims[kind])]
+        
+        def check_claim(index, job):
+            check, claim, response = job
+            try:
+                return check(claim["statement"], claim, response)
+            except Exception as exc:
+                print(f"claim_{index + 1} could not be checked:", exc)
+                return []
+        
+        list_of_statements = []
+        for statement_results in self._map_statements(check_claim, jobs):
+            list_of_statements.extend(statement_results)
+        
         return list_of_statements
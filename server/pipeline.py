@@ -1,15 +1,23 @@
 from json import tool
 import json
+import asyncio
+import contextvars
 import os
 import operator
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import TypedDict, Annotated, Union
 
 # LangChain
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.agents import Tool, AgentExecutor, create_react_agent
 from langchain_core.agents import AgentAction, AgentFinish
+from langchain_core.runnables import RunnableLambda
 from langchain.prompts import PromptTemplate
 from langchain_community.chat_models import ChatOpenAI
+from langchain_community.callbacks import get_openai_callback
 
 # LangGraph
 from langgraph.graph import END, StateGraph
@@ -21,20 +29,42 @@ except ImportError:  # pragma: no cover
     from neurosymbolicAI import Verifier, Builder
 
 try:  # pragma: no cover
-    from .reinforced_agent import generate_response
+    from .reinforced_agent import generate_response, agenerate_response
 except ImportError:  # pragma: no cover
-    from reinforced_agent import generate_response
+    from reinforced_agent import generate_response, agenerate_response
 
 try:  # pragma: no cover
     from .config import get_secret
 except ImportError:  # pragma: no cover
     from config import get_secret
 
+try:  # pragma: no cover
+    from .llm_cache import llm_cache
+except ImportError:  # pragma: no cover
+    from llm_cache import llm_cache
+
 try:  # pragma: no cover
     from .prompts import PIPELINE_MAIN_PROMPT, PIPELINE_VERIFIER_PROMPT
 except ImportError:  # pragma: no cover
     from prompts import PIPELINE_MAIN_PROMPT, PIPELINE_VERIFIER_PROMPT
 
+try:  # pragma: no cover
+    from .pool import InstancePool, pool_size
+    from . import metrics
+except ImportError:  # pragma: no cover
+    from pool import InstancePool, pool_size
+    import metrics
+
+try:  # pragma: no cover
+    from .router import main_router
+except ImportError:  # pragma: no cover
+    from router import main_router
+
+try:  # pragma: no cover
+    from .streaming import FinalAnswerStreamer
+except ImportError:  # pragma: no cover
+    from streaming import FinalAnswerStreamer
+
 class bcolors:
     HEADER = '\033[95m'
     OKBLUE = '\033[94m'
@@ -65,8 +95,67 @@ llm = ChatOpenAI(
     model="gpt-4o-mini",
     temperature=0,
     api_key=get_secret("OPENAI_API_KEY"),
+    cache=llm_cache,
 )
 
+# Long-lived Verifier and Builder instances, so the knowledge base is consulted
+# once per instance instead of once per tool call. The factories look the
+# classes up at call time.
+verifier_pool = InstancePool(lambda: Verifier(), pool_size("verifier", 3))
+builder_pool = InstancePool(lambda: Builder(), pool_size("builder", 1))
+
+metrics.register("verifier_pool", verifier_pool.stats)
+metrics.register("builder_pool", builder_pool.stats)
+
+# Run every verifier check on each commentary instead of asking the verifier
+# agent to pick one. Set CAISSA_VERIFIER_FANOUT=0 to restore the routed path.
+VERIFIER_FANOUT = os.getenv("CAISSA_VERIFIER_FANOUT", "1") != "0"
+# Extract every claim of the commentary with one structured LLM call instead of
+# splitting it into statements and running one extraction per statement and check.
+VERIFIER_SINGLE_EXTRACTION = os.getenv("CAISSA_VERIFIER_SINGLE_EXTRACTION", "1") != "0"
+# Let the local classifier pick the main route and only call the main agent when
+# it is not confident. Set CAISSA_LOCAL_ROUTER=0 to always ask the LLM.
+LOCAL_ROUTER = os.getenv("CAISSA_LOCAL_ROUTER", "1") != "0"
+# Limits of the reflex loop of one chat() call, 0 disables a limit. The token
+# budget counts OpenAI tokens of the calls made by chat(), the verifier threads included.
+REFLEX_MAX_ITERATIONS = int(os.getenv("CAISSA_REFLEX_MAX_ITERATIONS", "3"))
+REFLEX_TIME_BUDGET = float(os.getenv("CAISSA_REFLEX_TIME_BUDGET", "120"))
+REFLEX_TOKEN_BUDGET = int(os.getenv("CAISSA_REFLEX_TOKEN_BUDGET", "0"))
+# Share of true statements at which a commentary is accepted, 0 accepts any
+# commentary with at least one true statement.
+REFLEX_ACCEPT_RATIO = float(os.getenv("CAISSA_REFLEX_ACCEPT_RATIO", "0"))
+# Events a chat_stream keeps for a slow client before the pipeline waits for it.
+STREAM_QUEUE_SIZE = int(os.getenv("CAISSA_STREAM_QUEUE_SIZE", "256"))
+
+class ReflexBudget:
+    '''
+    Limits on the reflex loop of a single chat() call.
+    
+    :param: :max_iterations: number of commentary regenerations allowed, 0 for no limit
+    :param: :time_budget: seconds the loop may run for, 0 for no limit
+    :param: :token_budget: tokens the call may spend, 0 for no limit
+    :param: :tokens_used: zero-argument callable returning the tokens spent so far
+    '''
+    
+    def __init__(self, max_iterations=None, time_budget=None, token_budget=None, tokens_used=None):
+        self.max_iterations = REFLEX_MAX_ITERATIONS if max_iterations is None else max_iterations
+        time_budget = REFLEX_TIME_BUDGET if time_budget is None else time_budget
+        self.deadline = time.monotonic() + time_budget if time_budget else None
+        self.token_budget = REFLEX_TOKEN_BUDGET if token_budget is None else token_budget
+        self.tokens_used = tokens_used or (lambda: 0)
+    
+    def exhausted(self, iterations: int):
+        '''
+        :return: the name of the exhausted limit, None while another reflex is allowed
+        '''
+        if self.max_iterations and iterations >= self.max_iterations:
+            return "max_iterations"
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return "time_budget"
+        if self.token_budget and self.tokens_used() >= self.token_budget:
+            return "token_budget"
+        return None
+
 # Agent State class
 class AgentState(TypedDict):
     '''
@@ -76,6 +165,10 @@ class AgentState(TypedDict):
     :param: :verifier_agent_outcome: output of verifier agent
     :param: :pipeline_history: conversation history before agent execution
     :param: :final_answer: final state
+    :param: :reflex_iterations: number of times the commentary was regenerated
+    :param: :stop_reason: why the pipeline stopped
+    :param: :budget: ReflexBudget limiting the reflex loop
+    :param: :on_token: callable receiving the commentary tokens as they are generated, None when not streaming
     '''
     input: str
     fen: str 
@@ -84,6 +177,10 @@ class AgentState(TypedDict):
     pipeline_history: Annotated[list[tuple[AgentAction, str]], operator.add]
     status: Union[AgentAction, AgentFinish, None]
     final_answer: str
+    reflex_iterations: int
+    stop_reason: str
+    budget: ReflexBudget
+    on_token: object
 
 # Tools
 def verify_piece_position(state) -> list:
@@ -106,12 +203,9 @@ def verify_piece_position(state) -> list:
     response = state['commentary_agent_outcome']
     print(bcolors.BOLD + "commentary:" + bcolors.ENDC, response)
     
-    # instantiate a verifier object
-    verifier = Verifier()
-    
-    verifier.parse_fen(fen_string)
-    
-    verifier_output = verifier.verify_piece_position(response)
+    # borrow a verifier bound to the current position
+    with verifier_pool.acquire(fen_string) as verifier:
+        verifier_output = verifier.verify_piece_position(response)
 
     print("--------------------------------------------------------------------------------------------------------------------------------------------------------\n")
     
@@ -137,12 +231,9 @@ def verify_piece_relation(state) -> list:
     response = state['commentary_agent_outcome']
     print("Commentary:", response)
     
-    # Instantiate a Verifier object
-    verifier = Verifier()
-    
-    verifier.parse_fen(fen_string)
-    
-    verifier_output = verifier.verify_piece_relation(response)
+    # Borrow a Verifier bound to the current position
+    with verifier_pool.acquire(fen_string) as verifier:
+        verifier_output = verifier.verify_piece_relation(response)
     
     print("Verifier Output:", verifier_output)
     print("--------------------------------------------------------------------------------------------------------------------------------------------------------\n")
@@ -169,12 +260,36 @@ def verify_move_relation(state) -> list:
     response = state['commentary_agent_outcome']
     print("Commentary:", response)
     
-    # Instantiate a Verifier object
-    verifier = Verifier()
+    # Borrow a Verifier bound to the current position
+    with verifier_pool.acquire(fen_string) as verifier:
+        verifier_output = verifier.verify_piece_move_feature(response)
     
-    verifier.parse_fen(fen_string)
+    print("Verifier Output:", verifier_output)
+    print("--------------------------------------------------------------------------------------------------------------------------------------------------------\n")
+
+    return verifier_output
+
+def verify_commentary(state) -> list:
+    '''
+    Verifies every position, relation and move-feature claim of a chess commentary from a single extraction call.
+    
+    :param: :state: graph's state. for more info visit: https://langchain-ai.github.io/langgraph/
+    
+    :return: list of statements and their condition.
+    '''
+    
+    print(bcolors.OKCYAN + "verify_commentary function" + bcolors.ENDC)
+    print(bcolors.RED + "state:" + bcolors.ENDC, state)
+    
+    # Forsyth–Edwards Notation (FEN) of a chessboard
+    fen_string = state['fen']
     
-    verifier_output = verifier.verify_piece_move_feature(response)
+    # the response of the chess solver
+    response = state['commentary_agent_outcome']
+    
+    # Borrow a Verifier bound to the current position
+    with verifier_pool.acquire(fen_string) as verifier:
+        verifier_output = verifier.verify_commentary(response)
     
     print("Verifier Output:", verifier_output)
     print("--------------------------------------------------------------------------------------------------------------------------------------------------------\n")
@@ -195,14 +310,43 @@ def generate_commentary(state) -> dict:
     
     input = state['input']
     status = state['status']
+    on_token = state.get('on_token')
+    callbacks = [FinalAnswerStreamer(on_token)] if on_token else None
 
     try:
         if status == "Reinforced Agent":        
-            agent_outcome = generate_response(prompt=input)
+            agent_outcome = generate_response(prompt=input, callbacks=callbacks)
             return {"commentary_agent_outcome": agent_outcome}
         elif status == "Reflex":
             feedback = state["verifier_agent_outcome"]
-            agent_outcome = generate_response(prompt=input, feedback=feedback)
+            agent_outcome = generate_response(prompt=input, feedback=feedback, callbacks=callbacks)
+            return {"commentary_agent_outcome": agent_outcome}
+    except:
+        return {"status": "N/A"}
+
+async def agenerate_commentary(state) -> dict:
+    '''
+    Async version of generate_commentary, awaiting the chess solver agent.
+    
+    :param: :state: graph's state. for more info visit: https://langchain-ai.github.io/langgraph/
+    
+    :return: a commentary generated from the chess solver agent.
+    '''
+    
+    print(bcolors.OKCYAN + "agenerate_commentary" + bcolors.ENDC, state)
+    
+    input = state['input']
+    status = state['status']
+    on_token = state.get('on_token')
+    callbacks = [FinalAnswerStreamer(on_token)] if on_token else None
+
+    try:
+        if status == "Reinforced Agent":        
+            agent_outcome = await agenerate_response(prompt=input, callbacks=callbacks)
+            return {"commentary_agent_outcome": agent_outcome}
+        elif status == "Reflex":
+            feedback = state["verifier_agent_outcome"]
+            agent_outcome = await agenerate_response(prompt=input, feedback=feedback, callbacks=callbacks)
             return {"commentary_agent_outcome": agent_outcome}
     except:
         return {"status": "N/A"}
@@ -229,8 +373,8 @@ def build_relation(state) -> None:
         return {"status": "N/A", "final_answer": failure_message}
 
     try:
-        builder = Builder()
-        builder.build_relations(input)
+        with builder_pool.acquire() as builder:
+            builder.build_relations(input)
         return {
             "status": "End",
             "final_answer": success_message,
@@ -306,8 +450,38 @@ def run_main(state) -> dict:
     print("user_input:", user_input)
     print("--------------------------------------------------------------------------------------------------------------------------------------------------------\n")
 
+    local_route = main_router.route(user_input) if LOCAL_ROUTER else None
+    if local_route is not None:
+        print("local router:", local_route)
+        return {"status": local_route, "pipeline_history": [("Main Agent", local_route)]}
+
     main_agent_result = main_agent_runnable.invoke({"input": user_input})
-    main_agent_outcome = main_agent_result.get('output', "")
+    return _main_route(main_agent_result.get('output', ""))
+
+async def arun_main(state) -> dict:
+    '''
+    Async version of run_main, awaiting the main agent when the local router defers.
+    
+    :param: :state: graph's state. for more info visit: https://langchain-ai.github.io/langgraph/
+    
+    :return: the name of the sub-agent to take based on the user.
+    '''
+    
+    user_input = state['input']
+    print(bcolors.OKCYAN + "arun_main function" + bcolors.ENDC, user_input)
+
+    local_route = main_router.route(user_input) if LOCAL_ROUTER else None
+    if local_route is not None:
+        print("local router:", local_route)
+        return {"status": local_route, "pipeline_history": [("Main Agent", local_route)]}
+
+    main_agent_result = await main_agent_runnable.ainvoke({"input": user_input})
+    return _main_route(main_agent_result.get('output', ""))
+
+def _main_route(main_agent_outcome: str) -> dict:
+    '''
+    Maps the answer of the main agent to the sub-agent to take.
+    '''
     print("main_agent_outcome:", main_agent_outcome)
 
     normalized_outcome = " ".join(main_agent_outcome.replace("`", " ").strip().split()).lower()
@@ -398,6 +572,67 @@ def execute_tools(state):
         "pipeline_history": [("Tiny Agent", verification)],
     }
     
+def verify_all(state) -> dict:
+    '''
+    Runs all verifier checks on the commentary concurrently and merges their statements.
+    With single extraction enabled the checks share one claim extraction call.
+
+    The LLM extraction calls overlap; the Prolog queries are serialized by the
+    symbolic layer because SWI-Prolog runs a single engine per process.
+
+    :param: :state: graph's state. for more info visit: https://langchain-ai.github.io/langgraph/
+
+    :return: merged list of statements and their condition.
+    '''
+
+    print(bcolors.OKCYAN + "verify_all function" + bcolors.ENDC)
+    print(bcolors.RED + "state:" + bcolors.ENDC, state)
+
+    if state.get('commentary_agent_outcome') is None or state.get('status') == "N/A":
+        return {"verifier_agent_outcome": "N/A", "status": "N/A", "pipeline_history": [("Tiny Agent", "N/A")]}
+
+    if VERIFIER_SINGLE_EXTRACTION:
+        checks = {"Verify Commentary": verify_commentary}
+    else:
+        checks = {
+            "Verify Piece Position": verify_piece_position,
+            "Verify Piece Relation": verify_piece_relation,
+            "Verify Piece Move Feature": verify_move_relation,
+        }
+
+    # each check runs in a copy of this context, so get_openai_callback also counts its LLM calls
+    with ThreadPoolExecutor(max_workers=len(checks)) as executor:
+        futures = {name: executor.submit(contextvars.copy_context().run, check, state) for name, check in checks.items()}
+
+    verification = []
+    seen = set()
+    failures = 0
+    for name, future in futures.items():
+        try:
+            statements = future.result()
+        except Exception as exc:
+            print(bcolors.WARNING + f"{name} failed: {exc}" + bcolors.ENDC)
+            failures += 1
+            continue
+
+        for statement in statements or []:
+            key = (str(statement.get('statement')), statement.get('condition'))
+            if key not in seen:
+                seen.add(key)
+                verification.append(statement)
+
+    if failures == len(checks):
+        return {"verifier_agent_outcome": "N/A", "status": "N/A", "pipeline_history": [("Tiny Agent", "N/A")]}
+
+    print(bcolors.BOLD + "verification:" + bcolors.ENDC, verification)
+    print("--------------------------------------------------------------------------------------------------------------------------------------------------------\n")
+
+    return {
+        "verifier_agent_outcome": verification,
+        "status": "Verified",
+        "pipeline_history": [("Tiny Agent", verification)],
+    }
+
 def reflex_checkpoint(state):
     '''
     Acts as a checkpoint to determine whether to verbally reinforce the commentary agent.
@@ -424,12 +659,14 @@ def reflex_checkpoint(state):
         return {
             "status": "End",
             "final_answer": state.get("commentary_agent_outcome", "Sorry, I do not know the answer!"),
+            "stop_reason": "unverified",
         }
     if isinstance(verification, str):
         print("reflex_checkpoint: unexpected verification type, returning commentary directly.")
         return {
             "status": "End",
             "final_answer": state.get("commentary_agent_outcome", "Sorry, I do not know the answer!"),
+            "stop_reason": "unverified",
         }
     
     if isinstance(verification, dict) and "pipeline_history" in verification:
@@ -454,7 +691,8 @@ def reflex_checkpoint(state):
             summary = summary + f"The statement {statement} is {elem['condition']}. "
             list_of_verified_statements.append(elem)
             
-    if not(len(list_of_verified_statements) == 0):
+    verified_ratio = len(list_of_verified_statements) / len(json_verification) if json_verification else 0
+    if not(len(list_of_verified_statements) == 0) and verified_ratio >= REFLEX_ACCEPT_RATIO:
         flag = True
             
     for index, elem in enumerate(list_of_verified_statements):
@@ -472,9 +710,22 @@ def reflex_checkpoint(state):
     print("--------------------------------------------------------------------------------------------------------------------------------------------------------\n")
 
     if flag: # The commentary is correct
-        return {"verifier_agent_outcome": verification, "status": "End", "final_answer": commentary}
-    else: # The commentary is incorrect
-        return {"verifier_agent_outcome": summary, "status": "Reflex"}
+        stop_reason = "verified" if verified_ratio == 1 else "partially_verified"
+        return {"verifier_agent_outcome": verification, "status": "End", "final_answer": commentary, "stop_reason": stop_reason}
+    
+    # The commentary is incorrect, regenerate it unless the budget is spent
+    iterations = state.get("reflex_iterations", 0)
+    budget = state.get("budget")
+    exhausted = budget.exhausted(iterations) if budget is not None else None
+    if exhausted:
+        print(bcolors.WARNING + f"reflex budget exhausted ({exhausted}) after {iterations} iterations" + bcolors.ENDC)
+        return {
+            "verifier_agent_outcome": summary,
+            "status": "End",
+            "final_answer": commentary or "Sorry, I do not know the answer!",
+            "stop_reason": exhausted,
+        }
+    return {"verifier_agent_outcome": summary, "status": "Reflex", "reflex_iterations": iterations + 1}
     
 def selection_checkpoint(state):
     '''
@@ -528,11 +779,16 @@ def should_continue(state) -> str:
 workflow = StateGraph(AgentState)
 
 # Nodes
-workflow.add_node("main_agent", run_main)
+# The LLM-bound nodes have an async version, awaited when the graph runs through
+# achat/achat_stream; the other nodes run on LangGraph's thread executor there.
+workflow.add_node("main_agent", RunnableLambda(run_main, afunc=arun_main))
 workflow.add_node("build_agent", build_relation)
-workflow.add_node("commentary_agent", generate_commentary)
-workflow.add_node("verifier_agent", run_verifier)
-workflow.add_node("tiny_agent", execute_tools)
+workflow.add_node("commentary_agent", RunnableLambda(generate_commentary, afunc=agenerate_commentary))
+if VERIFIER_FANOUT:
+    workflow.add_node("verifier_agent", verify_all)
+else:
+    workflow.add_node("verifier_agent", run_verifier)
+    workflow.add_node("tiny_agent", execute_tools)
 workflow.add_node("reflex_checkpoint", reflex_checkpoint)
 
 # Always call main agent first.
@@ -541,8 +797,11 @@ workflow.set_entry_point("main_agent")
 # Edges
 workflow.add_edge("build_agent", END)
 workflow.add_edge("commentary_agent", "verifier_agent")
-workflow.add_edge("verifier_agent", "tiny_agent")
-workflow.add_edge("tiny_agent", "reflex_checkpoint")
+if VERIFIER_FANOUT:
+    workflow.add_edge("verifier_agent", "reflex_checkpoint")
+else:
+    workflow.add_edge("verifier_agent", "tiny_agent")
+    workflow.add_edge("tiny_agent", "reflex_checkpoint")
 
 # Conditional Edges
 workflow.add_conditional_edges(
@@ -567,32 +826,198 @@ workflow.add_conditional_edges(
 # Graph
 app = workflow.compile()
 
-def chat(input, fen_string) -> str:
+def _pipeline_inputs(input, fen_string, usage, on_token=None) -> dict:
+    budget = ReflexBudget(tokens_used=lambda: usage.total_tokens)
+    return {"input": input, "status": "Begin", "fen": fen_string, "pipeline_history": [], "reflex_iterations": 0, "budget": budget, "on_token": on_token}
+
+def _pipeline_result(results) -> dict:
     '''
-    Starts the pipeline for either generating chess commentary or building new relations.
+    :return: dict with "answer", "reflex_iterations" and "stop_reason" of the node outputs of one run
+    '''
+    answer = "Sorry, I do not know the answer!"
+    reflex_iterations = 0
+    stop_reason = "no_answer"
+    
+    for result in reversed(results):
+        if 'final_answer' in result:
+            answer = result['final_answer']
+            stop_reason = result.get('stop_reason', "completed")
+            break
+    
+    for result in results:
+        if isinstance(result, dict) and 'reflex_iterations' in result:
+            reflex_iterations = result['reflex_iterations']
+    
+    return {"answer": answer, "reflex_iterations": reflex_iterations, "stop_reason": stop_reason}
+
+def _record_step(s, results, on_step) -> None:
+    node, result = list(s.items())[0]
+    results.append(result)
+    print(bcolors.OKGREEN + "Result:" + bcolors.ENDC, result)
+    print("--------------------------------------------------------------------------------------------------------------------------------------------------------\n") 
+    if on_step is not None:
+        on_step(node, result)
+
+def _stream_event(node, result) -> tuple:
+    step = {"node": node, "status": result.get("status") if isinstance(result, dict) else None}
+    if isinstance(result, dict) and "reflex_iterations" in result:
+        step["reflex_iterations"] = result["reflex_iterations"]
+    return "node", step
+
+def _run_pipeline(input, fen_string, on_step=None, on_token=None, cancel=None) -> dict:
+    '''
+    Runs the pipeline once.
     
     :param: :input: user query
     :param: :fen_string: current forsyth-edwards notation of a chessboard 
+    :param: :on_step: callable receiving the name and output of every node as it finishes
+    :param: :on_token: callable receiving the commentary tokens as they are generated
+    :param: :cancel: threading.Event stopping the pipeline before its next node once set
     
-    :return: text generated from the chatbot
+    :return: dict with "answer", "reflex_iterations" and "stop_reason"
     '''
     
-    inputs = {"input": input, "status": "Begin", "fen": fen_string, "pipeline_history": []}
-    
     results = []
     
     try:   
-        for s in app.stream(inputs):
-            result = list(s.values())[0]
-            results.append(result)
-            print(bcolors.OKGREEN + "Result:" + bcolors.ENDC, result)
-            print("--------------------------------------------------------------------------------------------------------------------------------------------------------\n") 
-        
-        for result in reversed(results):
-            if 'final_answer' in result:
-                return result['final_answer']
+        with get_openai_callback() as usage:
+            for s in app.stream(_pipeline_inputs(input, fen_string, usage, on_token)):
+                _record_step(s, results, on_step)
+                if cancel is not None and cancel.is_set():
+                    return {"answer": "Sorry, I do not know the answer!", "reflex_iterations": 0, "stop_reason": "cancelled"}
+    except Exception as exc:
+        print(f"Error while running chat pipeline: {exc}")
+        return {"answer": "Sorry, I do not know the answer!", "reflex_iterations": 0, "stop_reason": "error"}
+    
+    return _pipeline_result(results)
 
-        return "Sorry, I do not know the answer!"
+async def _arun_pipeline(input, fen_string, on_step=None, on_token=None) -> dict:
+    '''
+    Async version of _run_pipeline, driving the graph with astream.
+    '''
+    
+    results = []
+    
+    try:   
+        with get_openai_callback() as usage:
+            async for s in app.astream(_pipeline_inputs(input, fen_string, usage, on_token)):
+                _record_step(s, results, on_step)
     except Exception as exc:
         print(f"Error while running chat pipeline: {exc}")
-        return "Sorry, I do not know the answer!"
+        return {"answer": "Sorry, I do not know the answer!", "reflex_iterations": 0, "stop_reason": "error"}
+    
+    return _pipeline_result(results)
+
+def chat(input, fen_string, details=False):
+    '''
+    Starts the pipeline for either generating chess commentary or building new relations.
+    
+    :param: :input: user query
+    :param: :fen_string: current forsyth-edwards notation of a chessboard 
+    :param: :details: also report how many reflex iterations ran and why the pipeline stopped
+    
+    :return: text generated from the chatbot, or a dict with "answer", "reflex_iterations" and "stop_reason" when details is set
+    '''
+    
+    result = _run_pipeline(input, fen_string)
+    
+    if details:
+        return result
+    return result["answer"]
+
+def chat_stream(input, fen_string):
+    '''
+    Runs the pipeline on a worker thread and yields its progress as it happens.
+    
+    Closing the generator, as the server does when the client disconnects, stops
+    the pipeline before its next node.
+    
+    :param: :input: user query
+    :param: :fen_string: current forsyth-edwards notation of a chessboard 
+    
+    :return: generator of (event, data) pairs: ("node", {"node", "status"}) when a node finishes,
+             ("token", {"text"}) for each commentary token and a final ("done", {"answer", "reflex_iterations", "stop_reason"})
+    '''
+    
+    events = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+    cancelled = threading.Event()
+    
+    def put(item):
+        # wait for a slow reader, but not for one that is gone
+        while not cancelled.is_set():
+            try:
+                events.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+    
+    def on_step(node, result):
+        put(_stream_event(node, result))
+    
+    def on_token(text):
+        put(("token", {"text": text}))
+    
+    def run():
+        put(("done", _run_pipeline(input, fen_string, on_step=on_step, on_token=on_token, cancel=cancelled)))
+    
+    threading.Thread(target=run, name="chat-stream", daemon=True).start()
+    
+    try:
+        while True:
+            event, data = events.get()
+            yield event, data
+            if event == "done":
+                return
+    finally:
+        cancelled.set()
+
+async def achat(input, fen_string, details=False):
+    '''
+    Async version of chat, awaiting the LLM calls of the pipeline instead of blocking a thread on them.
+    
+    :param: :input: user query
+    :param: :fen_string: current forsyth-edwards notation of a chessboard 
+    :param: :details: also report how many reflex iterations ran and why the pipeline stopped
+    
+    :return: text generated from the chatbot, or a dict with "answer", "reflex_iterations" and "stop_reason" when details is set
+    '''
+    
+    result = await _arun_pipeline(input, fen_string)
+    
+    if details:
+        return result
+    return result["answer"]
+
+async def achat_stream(input, fen_string):
+    '''
+    Async version of chat_stream, running the pipeline as a task of the current event loop.
+    
+    :return: async generator of the (event, data) pairs described in chat_stream
+    '''
+    
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+    
+    # LangChain may call sync callbacks from its thread executor
+    def put(item):
+        loop.call_soon_threadsafe(events.put_nowait, item)
+    
+    def on_step(node, result):
+        put(_stream_event(node, result))
+    
+    def on_token(text):
+        put(("token", {"text": text}))
+    
+    async def run():
+        put(("done", await _arun_pipeline(input, fen_string, on_step=on_step, on_token=on_token)))
+    
+    task = asyncio.create_task(run())
+    try:
+        while True:
+            event, data = await events.get()
+            yield event, data
+            if event == "done":
+                return
+    finally:
+        if not task.done():
+            task.cancel()
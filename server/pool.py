@@ -0,0 +1,89 @@
+'''
+Pools of long-lived Verifier and Builder instances.
+
+Constructing either class builds an LLM client, a Symbolic (Prolog engine plus a
+full consult of the knowledge base and a Neo4j driver) and its agent executors.
+The pipeline borrows instances from a pool instead, so a chat turn only pays for
+binding the current position.
+'''
+
+from __future__ import annotations
+
+import os
+import threading
+from contextlib import contextmanager
+
+
+class InstancePool:
+    '''
+    Thread-safe pool handing out reusable instances created by a factory.
+
+    Acquiring never blocks: when every instance is busy a new one is created, and
+    instances returned while the pool already holds maxsize idle ones are dropped.
+
+    :param: :factory: zero-argument callable building a new instance
+    :param: :maxsize: number of idle instances kept between requests
+    '''
+
+    def __init__(self, factory, maxsize: int = 2):
+        self.factory = factory
+        self.maxsize = maxsize
+        self._idle = []
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    @contextmanager
+    def acquire(self, fen_string: str | None = None):
+        '''
+        Borrow an instance for the duration of a with block.
+
+        SWI-Prolog is a single engine per process, so another instance may have
+        parsed a different position since this one was last used. The position
+        is therefore re-parsed on every acquire rather than cached per instance,
+        and the verify queries of Symbolic parse it once more under prolog_lock,
+        since other threads can rebind the engine while the instance is borrowed.
+
+        :param: :fen_string: forsyth-edwards notation to bind before use, None skips binding
+        '''
+        with self._lock:
+            instance = self._idle.pop() if self._idle else None
+            if instance is not None:
+                self.reused += 1
+        if instance is None:
+            instance = self.factory()
+            with self._lock:
+                self.created += 1
+
+        if fen_string is not None:
+            instance.parse_fen(fen_string)
+
+        try:
+            yield instance
+        finally:
+            with self._lock:
+                if len(self._idle) < self.maxsize:
+                    self._idle.append(instance)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._idle.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "idle": len(self._idle),
+                "maxsize": self.maxsize,
+                "created": self.created,
+                "reused": self.reused,
+            }
+
+
+def pool_size(name: str, default: int = 2) -> int:
+    '''
+    Read a pool size from the environment, e.g. CAISSA_VERIFIER_POOL_SIZE.
+    '''
+    return int(os.getenv(f"CAISSA_{name.upper()}_POOL_SIZE", str(default)))
+
+
+__all__ = ["InstancePool", "pool_size"]
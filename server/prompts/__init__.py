@@ -8,8 +8,9 @@ from .agents import (
     BUILDER_AGENT_PROMPT,
     VERIFIER_JSON_PROMPT,
     VERIFIER_FIX_PROMPT,
+    VERIFIER_CLAIMS_PROMPT,
 )
-from .selectors import PIPELINE_MAIN_PROMPT, PIPELINE_VERIFIER_PROMPT
+from .selectors import PIPELINE_MAIN_PROMPT, PIPELINE_MAIN_EXAMPLES, PIPELINE_VERIFIER_PROMPT
 from .tools import CYPHER_GENERATION_TEMPLATE
 from .schemas import (
     POSITION_SCHEMA_DESCRIPTION,
@@ -23,7 +24,9 @@ __all__ = [
     "BUILDER_AGENT_PROMPT",
     "VERIFIER_JSON_PROMPT",
     "VERIFIER_FIX_PROMPT",
+    "VERIFIER_CLAIMS_PROMPT",
     "PIPELINE_MAIN_PROMPT",
+    "PIPELINE_MAIN_EXAMPLES",
     "PIPELINE_VERIFIER_PROMPT",
     "CYPHER_GENERATION_TEMPLATE",
     "POSITION_SCHEMA_DESCRIPTION",
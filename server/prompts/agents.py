@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 from pathlib import Path
+from textwrap import dedent, indent
 
 from .placeholders import (
     _replace_once,
@@ -11,6 +12,11 @@ from .placeholders import (
     apply_tool_placeholders,
     apply_interaction_placeholders,
 )
+from .schemas import (
+    POSITION_SCHEMA_DESCRIPTION,
+    RELATION_SCHEMA_DESCRIPTION,
+    MOVE_FEATURE_SCHEMA_DESCRIPTION,
+)
 
 _TEXT_DIR = Path(__file__).with_name("text")
 
@@ -43,6 +49,12 @@ def _replace_section(text: str, start_marker: str, end_marker: str, replacement:
     return text[:start] + replacement + text[end:]
 
 
+def _schema_block(description: str) -> str:
+    """Re-indent a Kor schema description so it nests under a prompt section."""
+
+    return indent(dedent(description).strip(), "    ")
+
+
 def _build_reinforced_agent_prompt(base_prompt: str) -> str:
     """Derive the reinforced prompt from the classic prompt to avoid duplication."""
 
@@ -139,6 +151,11 @@ _verifier_fix_text = apply_json_placeholders(_load_text("verifier_fix_prompt.txt
 _verifier_fix_text = apply_tool_placeholders(_verifier_fix_text)
 _verifier_fix_text = apply_interaction_placeholders(_verifier_fix_text)
 VERIFIER_FIX_PROMPT = _verifier_fix_text
+_verifier_claims_text = _load_text("verifier_claims_prompt.txt")
+_verifier_claims_text = _replace_once(_verifier_claims_text, "<<POSITION_SCHEMA_BLOCK>>", _schema_block(POSITION_SCHEMA_DESCRIPTION))
+_verifier_claims_text = _replace_once(_verifier_claims_text, "<<RELATION_SCHEMA_BLOCK>>", _schema_block(RELATION_SCHEMA_DESCRIPTION))
+_verifier_claims_text = _replace_once(_verifier_claims_text, "<<MOVE_FEATURE_SCHEMA_BLOCK>>", _schema_block(MOVE_FEATURE_SCHEMA_DESCRIPTION))
+VERIFIER_CLAIMS_PROMPT = _verifier_claims_text
 
 __all__ = [
     "CLASSIC_AGENT_PROMPT",
@@ -146,4 +163,5 @@ __all__ = [
     "BUILDER_AGENT_PROMPT",
     "VERIFIER_JSON_PROMPT",
     "VERIFIER_FIX_PROMPT",
+    "VERIFIER_CLAIMS_PROMPT",
 ]
@@ -45,6 +45,8 @@ _main_text = _inject_examples(_main_text, "<<ROUTER_EXAMPLES_BLOCK>>", _main_exa
 _main_text = apply_tool_placeholders(_main_text)
 _main_text = apply_interaction_placeholders(_main_text)
 PIPELINE_MAIN_PROMPT = _main_text
+# (input, route) pairs shown to the main router, also used to fit the local router
+PIPELINE_MAIN_EXAMPLES = [(example[-2], example[-1]) for example in _main_examples]
 
 _verifier_text = _load_text("pipeline_verifier_prompt.txt")
 _verifier_examples = [
@@ -58,4 +60,4 @@ _verifier_text = apply_tool_placeholders(_verifier_text)
 _verifier_text = apply_interaction_placeholders(_verifier_text)
 PIPELINE_VERIFIER_PROMPT = _verifier_text
 
-__all__ = ["PIPELINE_MAIN_PROMPT", "PIPELINE_VERIFIER_PROMPT"]
+__all__ = ["PIPELINE_MAIN_PROMPT", "PIPELINE_MAIN_EXAMPLES", "PIPELINE_VERIFIER_PROMPT"]
@@ -1,13 +1,12 @@
 from langchain.agents import AgentExecutor, create_react_agent
 from langchain.tools import Tool
-from langchain.chains.conversation.memory import ConversationBufferWindowMemory
 from langchain.prompts import PromptTemplate
 # from gemini_llm import llm
 
 try:  # pragma: no cover
-    from .llama_llm import llm
+    from .llama_llm import llm, streaming_llm
 except ImportError:  # pragma: no cover
-    from llama_llm import llm
+    from llama_llm import llm, streaming_llm
 
 try:  # pragma: no cover
     from .neurosymbolicAI import NeuroSymbolic
@@ -57,10 +56,36 @@ agent_executor = AgentExecutor(
     handle_parsing_errors="If the generate Cypher Query syntax is incorrect or invalid, you MUST use FULL CONTEXT If output list is NOT EMPTY OTHERWISE TRY AGAIN",
 )
 
-def generate_response(prompt, feedback = ""):
+# Same agent on a streaming LLM, used when the caller listens to the generated tokens
+streaming_agent_executor = AgentExecutor(
+    agent=create_react_agent(streaming_llm, tools, agent_prompt),
+    tools=tools,
+    verbose=True,
+    handle_parsing_errors="If the generate Cypher Query syntax is incorrect or invalid, you MUST use FULL CONTEXT If output list is NOT EMPTY OTHERWISE TRY AGAIN",
+)
+
+def generate_response(prompt, feedback = "", callbacks = None):
     '''
     Create a handler that calls the Conversational agent and returns a response to be rendered in the UI.
+    
+    :param: :callbacks: LangChain callbacks receiving the generated tokens, e.g. a FinalAnswerStreamer
+    '''
+    if callbacks:
+        response = streaming_agent_executor.invoke({"input": prompt, "feedback": feedback}, config={"callbacks": callbacks})
+    else:
+        response = agent_executor.invoke({"input": prompt, "feedback": feedback})
+
+    return response['output']
+
+async def agenerate_response(prompt, feedback = "", callbacks = None):
+    '''
+    Async version of generate_response, awaiting the Conversational agent.
+    
+    :param: :callbacks: LangChain callbacks receiving the generated tokens, e.g. a FinalAnswerStreamer
     '''
-    response = agent_executor.invoke({"input": prompt, "feedback": feedback})
+    if callbacks:
+        response = await streaming_agent_executor.ainvoke({"input": prompt, "feedback": feedback}, config={"callbacks": callbacks})
+    else:
+        response = await agent_executor.ainvoke({"input": prompt, "feedback": feedback})
 
     return response['output']
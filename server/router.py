@@ -0,0 +1,133 @@
+'''
+Local classifier for the main pipeline router.
+
+run_main only has to choose between the Reinforced Agent (questions and commentary
+requests about the position) and the Builder Agent (definitions of a new relation
+or feature). Those two kinds of input look very different, so a token naive Bayes
+model fitted on the router examples of PIPELINE_MAIN_PROMPT, combined with a few
+phrase cues, settles most inputs locally. Inputs it is unsure about still go to the
+LLM router.
+'''
+
+from __future__ import annotations
+
+import math
+import os
+import re
+import threading
+from collections import Counter
+
+try:  # pragma: no cover
+    from .prompts import PIPELINE_MAIN_EXAMPLES
+    from . import metrics
+except ImportError:  # pragma: no cover
+    from prompts import PIPELINE_MAIN_EXAMPLES
+    import metrics
+
+BUILDER = "Builder Agent"
+REINFORCED = "Reinforced Agent"
+
+_TOKEN = re.compile(r"[a-z_]+")
+
+# (pattern, route, weight in log-odds towards the Builder Agent)
+_CUES = [
+    (re.compile(r"\bis an? (?:new )?(?:feature|relation|relationship|tactic|move)\b"), BUILDER, 4.0),
+    (re.compile(r"\b(?:define|create|add|build)s? (?:an? )?(?:new )?(?:feature|relation|relationship|tactic)\b"), BUILDER, 4.0),
+    (re.compile(r"\bis defined as\b|\bmeans that\b|\bis called\b"), BUILDER, 3.0),
+    (re.compile(r"\?\s*$"), REINFORCED, 4.0),
+    (re.compile(r"^(?:what|which|where|who|how|why|when|is|are|can|could|does|do|should|would)\b"), REINFORCED, 3.0),
+    (re.compile(r"^(?:please|give|explain|describe|suggest|comment|show|tell|find|list|verify)\b"), REINFORCED, 3.0),
+    (re.compile(r"\bcommentary\b|\bbest move\b|\bnext move\b"), REINFORCED, 2.0),
+]
+
+
+def _tokens(text: str) -> list:
+    return _TOKEN.findall(text.lower())
+
+
+class IntentRouter:
+    '''
+    Route a user input to the Builder or the Reinforced agent without calling the LLM.
+
+    :param: :examples: (input, route) pairs the token model is fitted on
+    :param: :threshold: minimum probability of the chosen route for a local decision
+    '''
+
+    def __init__(self, examples, threshold: float = 0.9):
+        self.threshold = threshold
+        self._counts = {BUILDER: Counter(), REINFORCED: Counter()}
+        self._docs = Counter()
+        for text, route in examples:
+            if route in self._counts:
+                self._counts[route].update(_tokens(text))
+                self._docs[route] += 1
+        self._vocabulary = set(self._counts[BUILDER]) | set(self._counts[REINFORCED])
+        self._lock = threading.Lock()
+        self.local = Counter()
+        self.deferred = 0
+
+    def _log_odds(self, text: str) -> float:
+        '''
+        Log-odds of the Builder Agent under a Laplace-smoothed naive Bayes model plus the phrase cues.
+        '''
+        total = sum(self._docs.values())
+        if total == 0:
+            score = 0.0
+        else:
+            score = math.log((self._docs[BUILDER] + 1) / (self._docs[REINFORCED] + 1))
+            builder_total = sum(self._counts[BUILDER].values()) + len(self._vocabulary)
+            reinforced_total = sum(self._counts[REINFORCED].values()) + len(self._vocabulary)
+            for token in _tokens(text):
+                if token in self._vocabulary:
+                    score += math.log((self._counts[BUILDER][token] + 1) / builder_total)
+                    score -= math.log((self._counts[REINFORCED][token] + 1) / reinforced_total)
+
+        normalized = " ".join(text.lower().split())
+        for pattern, route, weight in _CUES:
+            if pattern.search(normalized):
+                score += weight if route == BUILDER else -weight
+        return score
+
+    def classify(self, text: str) -> tuple:
+        '''
+        :return: tuple of the most likely route and its probability
+        '''
+        score = max(min(self._log_odds(text), 50.0), -50.0)
+        probability = 1 / (1 + math.exp(-score))
+        if probability >= 0.5:
+            return BUILDER, probability
+        return REINFORCED, 1 - probability
+
+    def route(self, text: str):
+        '''
+        :return: the route when the classifier is confident enough, None to defer to the LLM router
+        '''
+        route, confidence = self.classify(text)
+        with self._lock:
+            if confidence >= self.threshold:
+                self.local[route] += 1
+                return route
+            self.deferred += 1
+        return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            local = sum(self.local.values())
+            decisions = local + self.deferred
+            return {
+                "local": dict(self.local),
+                "deferred": self.deferred,
+                "local_rate": round(local / decisions, 4) if decisions else 0.0,
+                "threshold": self.threshold,
+            }
+
+
+main_router = IntentRouter(
+    PIPELINE_MAIN_EXAMPLES,
+    threshold=float(os.getenv("CAISSA_ROUTER_CONFIDENCE", "0.9")),
+)
+
+metrics.register("main_router", main_router.stats)
+
+
+__all__ = ["IntentRouter", "main_router", "BUILDER", "REINFORCED"]
@@ -1,12 +1,15 @@
 from __future__ import annotations
 
+import json
 import math
 import multiprocessing
 import os
 import sys
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
@@ -17,19 +20,21 @@ _dependency_error = None
 
 try:  # pragma: no cover
     from server.neurosymbolicAI import NeuroSymbolic
-    from server.neurosymbolicAI.symbolicAI.symbolic_ai import Symbolic
+    from server.neurosymbolicAI.symbolicAI.symbolic_ai import RecordingGraph, Symbolic, prolog_lock
     from server.agent import generate_response
-    from server.pipeline import chat
+    from server.pipeline import chat, chat_stream
 except ImportError:
     try:
         from neurosymbolicAI import NeuroSymbolic  # type: ignore
-        from neurosymbolicAI.symbolicAI.symbolic_ai import Symbolic  # type: ignore
+        from neurosymbolicAI.symbolicAI.symbolic_ai import RecordingGraph, Symbolic, prolog_lock  # type: ignore
         from agent import generate_response  # type: ignore
-        from pipeline import chat  # type: ignore
+        from pipeline import chat, chat_stream  # type: ignore
     except Exception as exc:  # pragma: no cover
         _dependency_error = exc
         NeuroSymbolic = None  # type: ignore
         Symbolic = None  # type: ignore
+        RecordingGraph = None  # type: ignore
+        prolog_lock = threading.RLock()  # type: ignore
 
         def generate_response(*args, **kwargs):  # type: ignore
             raise RuntimeError(
@@ -42,10 +47,18 @@ except ImportError:
                 "chat is unavailable because optional server dependencies "
                 "failed to import."
             ) from _dependency_error
+
+        def chat_stream(*args, **kwargs):  # type: ignore
+            raise RuntimeError(
+                "chat_stream is unavailable because optional server dependencies "
+                "failed to import."
+            ) from _dependency_error
 except Exception as exc:  # pragma: no cover
     _dependency_error = exc
     NeuroSymbolic = None  # type: ignore
     Symbolic = None  # type: ignore
+    RecordingGraph = None  # type: ignore
+    prolog_lock = threading.RLock()  # type: ignore
 
     def generate_response(*args, **kwargs):  # type: ignore
         raise RuntimeError(
@@ -58,7 +71,21 @@ except Exception as exc:  # pragma: no cover
             "chat is unavailable because optional server dependencies "
             "failed to import."
         ) from _dependency_error
+
+    def chat_stream(*args, **kwargs):  # type: ignore
+        raise RuntimeError(
+            "chat_stream is unavailable because optional server dependencies "
+            "failed to import."
+        ) from _dependency_error
 
+from server import metrics
+from server.analysis_store import load_store
+from server.batch import analyse_batch, input_format, parse_upload
+from server.jobs import JobQueue, build_job_store
+from server.sessions import session_store
+from server.speculation import SpeculativeAnalyser, play
+from server.streaming import sse
+
 if NeuroSymbolic is not None:  # pragma: no branch
     ns = NeuroSymbolic()
 else:  # pragma: no cover
@@ -71,6 +98,13 @@ app = Flask(__name__, static_url_path='', static_folder='frontend/build')
 CORS(app, resources={r"*": {"origin": "*"}})
 
 # Helper methods
+def current_session():
+    '''
+    Session of the client sending the current request, keyed by its X-Client-Id header.
+    '''
+    client_id = request.headers.get('X-Client-Id') or request.remote_addr or "anonymous"
+    return session_store.get(client_id)
+
 def execute_tactic(tactic_method, color, description, filepath, fen_string, symbolic_instance=None) -> None:
     '''
     Add a tactic relation to knowledge graph.
@@ -95,6 +129,44 @@ def execute_tactic(tactic_method, color, description, filepath, fen_string, symb
     except Exception as e:
         print(f"Error executing tactic {description}: {e}")
             
+def default_tactics() -> list:
+    '''
+    Every supported tactic as (method, color, description), in the order they are added to the knowledge graph.
+    '''
+    return [
+        (Symbolic.mate, "white", "Mate"),
+        (Symbolic.create_fork_relation, "white", "Fork"),
+        (Symbolic.create_absolute_pin_relation, "white", "Absolute Pin"),
+        (Symbolic.create_relative_pin_relation, "white", "Relative Pin"),
+        (Symbolic.create_skewer_relation, "white", "Skewer"),
+        (Symbolic.create_discovery_attack_relation, "white", "Discover Attack"),
+        (Symbolic.hanging_piece, "white", "Hanging Piece"),
+        (Symbolic.create_interference_relation, "white", "Interference"),
+        (Symbolic.create_mate_in_two_relation, "white", "Mate in 2"),
+        (Symbolic.defend, "white", "Defend"),
+        (Symbolic.threat, "white", "Threat"),
+        (Symbolic.move_defend, "white", "Move Defend"),
+        (Symbolic.move_threat, "white", "Move Threat"),
+        (Symbolic.protected_move, "white", "Protected Move"),
+        (Symbolic.attacked_move, "white", "Attacked Move"),
+        (Symbolic.mate, "black", "Mate"),
+        (Symbolic.create_fork_relation, "black", "Fork"),
+        (Symbolic.create_absolute_pin_relation, "black", "Absolute Pin"),
+        (Symbolic.create_relative_pin_relation, "black", "Relative Pin"),
+        (Symbolic.create_skewer_relation, "black", "Skewer"),
+        (Symbolic.create_discovery_attack_relation, "black", "Discover Attack"),
+        (Symbolic.hanging_piece, "black", "Hanging Piece"),
+        (Symbolic.create_interference_relation, "black", "Interference"),
+        (Symbolic.create_mate_in_two_relation, "black", "Mate in 2"),
+        (Symbolic.defend, "black", "Defend"),
+        (Symbolic.threat, "black", "Threat"),
+        (Symbolic.move_defend, "black", "Move Defend"),
+        (Symbolic.move_threat, "black", "Move Threat"),
+        (Symbolic.protected_move, "black", "Protected Move"),
+        (Symbolic.attacked_move, "black", "Attacked Move"),
+        (Symbolic.evaluate_king_safety, "both", "King Safety")
+    ]
+
 def add_tactics_to_graph(filepath, fen_string, symbolic_instance=None, tactics=None):
     '''
     Add all supported tactics relations to the knowledge graph.
@@ -120,38 +192,7 @@ def add_tactics_to_graph(filepath, fen_string, symbolic_instance=None, tactics=N
         symbolic = symbolic_instance
 
     if tactics is None:
-        tactics = [
-            (Symbolic.mate, "white", "Mate"),
-            (Symbolic.create_fork_relation, "white", "Fork"),
-            (Symbolic.create_absolute_pin_relation, "white", "Absolute Pin"),
-            (Symbolic.create_relative_pin_relation, "white", "Relative Pin"),
-            (Symbolic.create_skewer_relation, "white", "Skewer"),
-            (Symbolic.create_discovery_attack_relation, "white", "Discover Attack"),
-            (Symbolic.hanging_piece, "white", "Hanging Piece"),
-            (Symbolic.create_interference_relation, "white", "Interference"),
-            (Symbolic.create_mate_in_two_relation, "white", "Mate in 2"),
-            (Symbolic.defend, "white", "Defend"),
-            (Symbolic.threat, "white", "Threat"),
-            (Symbolic.move_defend, "white", "Move Defend"),
-            (Symbolic.move_threat, "white", "Move Threat"),
-            (Symbolic.protected_move, "white", "Protected Move"),
-            (Symbolic.attacked_move, "white", "Attacked Move"),
-            (Symbolic.mate, "black", "Mate"),
-            (Symbolic.create_fork_relation, "black", "Fork"),
-            (Symbolic.create_absolute_pin_relation, "black", "Absolute Pin"),
-            (Symbolic.create_relative_pin_relation, "black", "Relative Pin"),
-            (Symbolic.create_skewer_relation, "black", "Skewer"),
-            (Symbolic.create_discovery_attack_relation, "black", "Discover Attack"),
-            (Symbolic.hanging_piece, "black", "Hanging Piece"),
-            (Symbolic.create_interference_relation, "black", "Interference"),
-            (Symbolic.create_mate_in_two_relation, "black", "Mate in 2"),
-            (Symbolic.defend, "black", "Defend"),
-            (Symbolic.threat, "black", "Threat"),
-            (Symbolic.move_defend, "black", "Move Defend"),
-            (Symbolic.move_threat, "black", "Move Threat"),
-            (Symbolic.protected_move, "black", "Protected Move"),
-            (Symbolic.attacked_move, "black", "Attacked Move")
-        ]
+        tactics = default_tactics()
 
     # Ensure Prolog has latest fen before starting
     symbolic.parse_fen(fen_string)
@@ -167,6 +208,93 @@ def add_tactics_to_graph(filepath, fen_string, symbolic_instance=None, tactics=N
             symbolic_instance=symbolic
         )
 
+@contextmanager
+def exclusive_engine():
+    '''
+    Hold the Prolog engine and the knowledge graph: pause the speculative worker and take prolog_lock.
+    
+    Requests rebinding the Prolog engine mid-sweep would add relations of another position.
+    '''
+    if speculator is not None:
+        speculator.pause()
+    try:
+        with prolog_lock:
+            yield
+    finally:
+        if speculator is not None:
+            speculator.resume()
+
+def analyse_position(fen_string) -> dict:
+    '''
+    Build the knowledge graph of a position: its board relations and every tactic.
+    
+    :param: :fen_string: forsyth-edwards notation of a chessboard
+    
+    :return: the fen that was analysed
+    '''
+    with exclusive_engine():
+        ns.symbolic.update_board(fen_string)
+        build_knowledge_graph(fen_string)
+    
+    return {'fen': fen_string}
+
+def build_knowledge_graph(fen_string) -> None:
+    '''
+    Build the knowledge graph of the position loaded in Prolog, replaying a prebuilt
+    or speculative analysis when there is one.
+    
+    :param: :fen_string: forsyth-edwards notation of the loaded position
+    '''
+    writes = analysis_store.get(fen_string) if analysis_store is not None else None
+    if writes is None and speculator is not None:
+        writes = speculator.take(fen_string)
+    if writes is not None:
+        ns.symbolic.graph.replay(writes)
+        return
+    
+    ns.symbolic.construct_graph()
+    add_tactics_to_graph(KB_PATH, fen_string, symbolic_instance=ns.symbolic)
+
+# Upper bound of the worker threads of one /analyze_batch request
+BATCH_WORKERS = int(os.getenv("CAISSA_BATCH_WORKERS", "2"))
+
+# Analysis jobs share the process-wide Prolog engine, so one worker is the default.
+# The job store lets any server worker process answer /analysis/<job_id>.
+analysis_jobs = JobQueue(
+    analyse_position,
+    workers=int(os.getenv("CAISSA_ANALYSIS_WORKERS", "1")),
+    store=build_job_store(),
+)
+
+metrics.register("analysis_jobs", analysis_jobs.stats)
+
+# Prebuilt analyses of known positions, see scripts/build_analysis_store.py
+analysis_store = load_store(os.getenv("CAISSA_ANALYSIS_STORE"))
+if analysis_store is not None:
+    metrics.register("analysis_store", analysis_store.stats)
+
+# Speculative analysis of the likely replies after /make_move, off unless CAISSA_SPECULATE=1
+speculator = None
+if os.getenv("CAISSA_SPECULATE", "0") == "1" and RecordingGraph is not None:
+    speculator = SpeculativeAnalyser(
+        Symbolic(graph=RecordingGraph()),
+        default_tactics(),
+        replies=int(os.getenv("CAISSA_SPECULATE_REPLIES", "3")),
+        cpu_share=float(os.getenv("CAISSA_SPECULATE_CPU", "0.5")),
+    )
+    metrics.register("speculation", speculator.stats)
+
+@app.before_request
+def pause_speculation():
+    # the speculative worker shares the Prolog engine, it only runs between requests
+    if speculator is not None:
+        speculator.pause()
+
+@app.teardown_request
+def resume_speculation(exc=None):
+    if speculator is not None:
+        speculator.resume()
+
 # GET APIs
 @app.route("/legal_moves", methods=['GET'])
 def get_legal_moves():
@@ -180,12 +308,32 @@ def get_legal_moves():
     if not piece or not color or not position:
         return jsonify({'error': 'Missing parameters'}), 400
     
-    ns.symbolic.parse_fen("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")
-    list_of_moves = ns.symbolic.legal_moves(piece, color, position)
+    with exclusive_engine():
+        ns.symbolic.parse_fen("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")
+        list_of_moves = ns.symbolic.legal_moves(piece, color, position)
     
     return jsonify({
         'legal_moves': list_of_moves
     })
+
+@app.route("/analysis/<job_id>", methods=['GET'])
+def get_analysis(job_id):
+    '''
+    Poll an analysis job submitted through /analysis.
+    '''
+    job = analysis_jobs.get(job_id)
+    
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    
+    return jsonify(job.to_dict())
+
+@app.route("/metrics", methods=['GET'])
+def get_metrics():
+    '''
+    Report cache hit rates and other runtime counters.
+    '''
+    return jsonify(metrics.snapshot())
     
 # POST APIs
 @app.route("/reinforced_chatbot", methods=['POST'])
@@ -195,18 +343,55 @@ def post_message_with_reinforced_chatbot():
     '''
     data = request.json
     prompt = data.get('prompt')
-    fen_string = data.get('fen')
+    session = current_session()
+    fen_string = data.get('fen') or session.fen
+    session.fen = fen_string
     
     try:
-        response = chat(input=prompt, fen_string=fen_string)
+        result = chat(input=prompt, fen_string=fen_string, details=True)
     except Exception as e:
         print(f"Error {e}")
-        response = "Try Again!"
+        result = {'answer': "Try Again!", 'reflex_iterations': 0, 'stop_reason': "error"}
     
+    session.record(prompt, result['answer'])
     return jsonify({
-        'answer': response,
+        'answer': result['answer'],
+        'reflex_iterations': result['reflex_iterations'],
+        'stop_reason': result['stop_reason'],
     })
     
+@app.route("/reinforced_chatbot/stream", methods=['POST'])
+def stream_message_with_reinforced_chatbot():
+    '''
+    Chat with Caïssa llm enhanced by langGraph, streaming the progress of every pipeline node
+    and the commentary tokens as server-sent events (node, token and a final done event).
+    '''
+    data = request.json
+    prompt = data.get('prompt')
+    session = current_session()
+    fen_string = data.get('fen') or session.fen
+    session.fen = fen_string
+    
+    def events():
+        stream = chat_stream(input=prompt, fen_string=fen_string)
+        try:
+            for event, payload in stream:
+                if event == "done":
+                    session.record(prompt, payload['answer'])
+                yield sse(event, payload)
+        except Exception as e:
+            print(f"Error {e}")
+            yield sse("done", {'answer': "Try Again!", 'reflex_iterations': 0, 'stop_reason': "error"})
+        finally:
+            # a client that disconnects before the done event stops the pipeline
+            stream.close()
+    
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={'Cache-Control': "no-cache", 'X-Accel-Buffering': "no"},
+    )
+    
 @app.route("/chatbot", methods=['POST'])
 def post_message():
     '''
@@ -214,12 +399,15 @@ def post_message():
     '''
     data = request.json
     prompt = data.get('prompt')
+    session = current_session()
     
     try:
-        response = generate_response(prompt)
+        response = generate_response(session.context(prompt))
     except Exception as e:
         print(f"Error {e}")
         response = "Try Again!"
+    
+    session.record(prompt, response)
 
     return jsonify({
         'answer': response,
@@ -231,14 +419,48 @@ def post_tactic():
     Chat with neurosymbolic module.
     '''
     data = request.json
-    fen_string = data.get('fen')
-    ns.symbolic.parse_fen(fen_string)
-    response = ns.suggest(fen_string = fen_string, move = None, test = False)
+    session = current_session()
+    fen_string = data.get('fen') or session.fen
+    session.fen = fen_string
+    with prolog_lock:
+        ns.symbolic.parse_fen(fen_string)
+        response = ns.suggest(fen_string = fen_string, move = None, test = False)
     
     return jsonify({
         'answer': response
     })
     
+@app.route("/analyze_batch", methods=['POST'])
+def analyze_batch():
+    '''
+    Analyse a JSONL or CSV of positions (fen, optional moves and themes), streaming
+    one JSON result per line as the positions complete.
+    
+    The file is sent as the request body or as the "file" field of a form upload.
+    Query parameters: workers, predict=0 to only explain the given moves and
+    lichess=1 to apply the first move of each row as in the Lichess puzzle export.
+    '''
+    upload = request.files.get('file') if request.files else None
+    try:
+        if upload is not None:
+            text = upload.read().decode("utf-8")
+            fmt = input_format(upload.filename or "")
+        else:
+            text = request.get_data(as_text=True)
+            fmt = "csv" if "csv" in (request.content_type or "") else "jsonl"
+        
+        records = parse_upload(text, fmt, lichess=request.args.get('lichess') == "1")
+        workers = min(int(request.args.get('workers', BATCH_WORKERS)), BATCH_WORKERS)
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+    predict = request.args.get('predict', "1") != "0"
+    
+    def results():
+        for result in analyse_batch(ns, records, workers=workers, predict=predict):
+            yield json.dumps(result) + "\n"
+    
+    return Response(stream_with_context(results()), mimetype="application/x-ndjson")
+    
 @app.route("/make_move", methods=['POST'])
 def make_move():
     '''
@@ -252,25 +474,62 @@ def make_move():
     to_position = data.get('to_position')
     promotion = data.get('promotion') 
     print(f'FEN String: {fen_string}')   
-    ns.symbolic.parse_fen(fen_string)
-    ns.symbolic.display_board_cli()
-    print(f"Making move: {piece} from {from_position} to {to_position} for {color} with promotion: {promotion}")
-    result, new_board = ns.symbolic.make_move(piece, color, from_position, to_position)
-    ns.symbolic.display_board_cli()
-    
-    if new_board is None:
-        new_board = []
-    else:
-        if not promotion:
-            ns.symbolic.construct_graph()
-            add_tactics_to_graph(KB_PATH, fen_string, symbolic_instance=ns.symbolic)
+    if speculator is not None:
+        speculator.cancel()
+    next_fen = None
+    with exclusive_engine():
+        ns.symbolic.parse_fen(fen_string)
+        ns.symbolic.display_board_cli()
+        print(f"Making move: {piece} from {from_position} to {to_position} for {color} with promotion: {promotion}")
+        result, new_board = ns.symbolic.make_move(piece, color, from_position, to_position)
+        ns.symbolic.display_board_cli()
+        
+        if new_board is None:
+            new_board = []
+        else:
+            if not promotion:
+                next_fen = play(fen_string, color, from_position, to_position)
+                if next_fen is not None:
+                    # replays the speculated analysis when this move was one of the predicted replies
+                    build_knowledge_graph(next_fen)
+                else:
+                    ns.symbolic.construct_graph()
+                    add_tactics_to_graph(KB_PATH, fen_string, symbolic_instance=ns.symbolic)
             
+    if speculator is not None and next_fen is not None:
+        speculator.speculate(next_fen, "black" if color == "white" else "white")
+    
     print(f"Move result: {result}, New board: {new_board}")
     return jsonify({
         'move_status': len(result) != 0,
         'new_board': new_board
     })
 
+@app.route("/analysis", methods=['POST'])
+def post_analysis():
+    '''
+    Set a forsyth-edwards notation and analyse it in the background.
+    
+    The board is returned at once together with a job id. Poll /analysis/<job_id>,
+    or pass a callback_url to receive the job as JSON once the graph is ready.
+    '''
+    data = request.json
+    fen_string = data.get('fen_string')
+    callback_url = data.get('callback_url')
+    if callback_url is not None and not analysis_jobs.callback_allowed(callback_url):
+        return jsonify({'error': 'callback_url must be an http(s) URL on a host listed in CAISSA_WEBHOOK_HOSTS'}), 400
+    current_session().fen = fen_string
+    with prolog_lock:
+        ns.symbolic.update_board(fen_string)
+        board = ns.symbolic.get_board()
+    job = analysis_jobs.submit(fen_string, callback_url=callback_url)
+    
+    return jsonify({
+        "board": board,
+        "job_id": job.id,
+        "status": job.status,
+    }), 202
+
 @app.route("/set_fen", methods=['POST'])
 def set_fen():
     '''
@@ -278,10 +537,11 @@ def set_fen():
     '''
     data = request.json
     fen_string = data.get('fen_string')
-    ns.symbolic.update_board(fen_string)
-    board = ns.symbolic.get_board()
-    ns.symbolic.construct_graph()
-    add_tactics_to_graph(KB_PATH, fen_string, symbolic_instance=ns.symbolic)
+    current_session().fen = fen_string
+    with exclusive_engine():
+        ns.symbolic.update_board(fen_string)
+        board = ns.symbolic.get_board()
+        build_knowledge_graph(fen_string)
     
     return jsonify({
         "board": board
@@ -0,0 +1,190 @@
+'''
+Per-client conversation state.
+
+The agent executors are stateless and shared by every client, and the Prolog
+engine behind NeuroSymbolic is a single process-wide engine. What differs between
+clients, their recent exchanges and the position they are looking at, lives in a
+Session. Sessions are kept in a bounded LRU store: idle sessions are evicted and,
+when a spill directory is configured, written to disk and restored on the next
+request of that client.
+'''
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+try:  # pragma: no cover
+    from . import metrics
+except ImportError:  # pragma: no cover
+    import metrics
+
+
+class Session:
+    '''
+    Conversation window and current position of one client.
+
+    :param: :client_id: identifier sent by the client
+    :param: :window: number of previous exchanges kept
+    '''
+
+    def __init__(self, client_id: str, window: int = 3):
+        self.client_id = client_id
+        self.fen = None
+        self.history = deque(maxlen=window)
+        self.last_seen = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, prompt: str, answer: str) -> None:
+        with self._lock:
+            self.history.append((prompt, answer))
+
+    def context(self, prompt: str) -> str:
+        '''
+        Prefix a prompt with the previous exchanges of the session.
+        '''
+        with self._lock:
+            history = list(self.history)
+        if not history:
+            return prompt
+        previous = "\n".join(f"User: {question}\nAssistant: {answer}" for question, answer in history)
+        return f"Previous conversation:\n{previous}\n\nCurrent question: {prompt}"
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {"client_id": self.client_id, "fen": self.fen, "history": list(self.history)}
+
+    @classmethod
+    def from_dict(cls, data: dict, window: int = 3) -> "Session":
+        session = cls(data["client_id"], window)
+        session.fen = data.get("fen")
+        session.history.extend(tuple(exchange) for exchange in data.get("history", []))
+        return session
+
+
+class SessionStore:
+    '''
+    Thread-safe LRU store of sessions with idle eviction.
+
+    :param: :maxsize: number of sessions kept in memory, the least recently used ones are evicted first
+    :param: :idle_ttl: seconds after which an unused session is evicted, None keeps sessions until they are pushed out
+    :param: :window: number of previous exchanges kept per session
+    :param: :spill_dir: directory evicted sessions are written to, None drops them
+    '''
+
+    def __init__(self, maxsize: int = 1000, idle_ttl: float | None = 1800, window: int = 3, spill_dir: str | None = None):
+        self.maxsize = maxsize
+        self.idle_ttl = idle_ttl
+        self.window = window
+        self.spill_dir = spill_dir
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.restored = 0
+        self.evicted = 0
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def _spill_path(self, client_id: str) -> str:
+        return os.path.join(self.spill_dir, hashlib.sha256(client_id.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, client_id: str) -> Session:
+        '''
+        Session of a client, created or restored from disk when it is not in memory.
+        '''
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(client_id)
+            if session is None:
+                session = self._restore(client_id)
+                if session is None:
+                    session = Session(client_id, self.window)
+                    self.created += 1
+                self._sessions[client_id] = session
+            else:
+                self._sessions.move_to_end(client_id)
+            session.last_seen = now
+            evicted = self._evict(now)
+
+        for old in evicted:
+            self._spill(old)
+        return session
+
+    def _restore(self, client_id: str):
+        if not self.spill_dir:
+            return None
+        path = self._spill_path(client_id)
+        try:
+            with open(path, encoding="utf-8") as file:
+                data = json.load(file)
+            os.remove(path)
+        except (OSError, ValueError):
+            return None
+        self.restored += 1
+        return Session.from_dict(data, self.window)
+
+    def _evict(self, now: float) -> list:
+        evicted = []
+        while len(self._sessions) > self.maxsize:
+            evicted.append(self._sessions.popitem(last=False)[1])
+        if self.idle_ttl is not None:
+            # sessions are ordered by last use, so the idle ones come first
+            while self._sessions:
+                session = next(iter(self._sessions.values()))
+                if now - session.last_seen < self.idle_ttl:
+                    break
+                evicted.append(self._sessions.popitem(last=False)[1])
+        self.evicted += len(evicted)
+        return evicted
+
+    def _spill(self, session: Session) -> None:
+        if not self.spill_dir:
+            return
+        try:
+            with open(self._spill_path(session.client_id), "w", encoding="utf-8") as file:
+                json.dump(session.to_dict(), file)
+        except OSError as exc:
+            print(f"Could not spill session {session.client_id}: {exc}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sessions.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "active": len(self._sessions),
+                "maxsize": self.maxsize,
+                "created": self.created,
+                "restored": self.restored,
+                "evicted": self.evicted,
+            }
+
+
+def build_session_store() -> SessionStore:
+    '''
+    Build the process-wide session store from the environment.
+
+    CAISSA_SESSION_MAX, CAISSA_SESSION_IDLE (seconds, 0 for no idle eviction),
+    CAISSA_SESSION_WINDOW (previous exchanges kept, 0 disables the conversation
+    memory) and CAISSA_SESSION_SPILL_DIR configure it.
+    '''
+    idle_ttl = float(os.getenv("CAISSA_SESSION_IDLE", "1800"))
+    return SessionStore(
+        maxsize=int(os.getenv("CAISSA_SESSION_MAX", "1000")),
+        idle_ttl=idle_ttl or None,
+        window=int(os.getenv("CAISSA_SESSION_WINDOW", "3")),
+        spill_dir=os.getenv("CAISSA_SESSION_SPILL_DIR") or None,
+    )
+
+
+session_store = build_session_store()
+
+metrics.register("sessions", session_store.stats)
+
+
+__all__ = ["Session", "SessionStore", "build_session_store", "session_store"]
@@ -0,0 +1,259 @@
+'''
+Speculative analysis of the positions a move is likely to lead to.
+
+After a move the next request is usually about the position after one of a
+handful of replies. SpeculativeAnalyser uses the time the user spends thinking
+to build the knowledge-graph analysis of the opponent's most threatening
+replies (ranked with the moves_threat heuristic) off the database: a Symbolic
+instance backed by a RecordingGraph collects the writes, which are replayed in
+one transaction when the position is actually requested.
+
+The worker shares the process-wide Prolog engine, so it only runs between
+requests: every step holds prolog_lock, waits while a request is in flight,
+and restores the position it started from. It sleeps after each step to stay
+under its CPU share, and a new move cancels whatever it is still working on.
+'''
+
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+
+import chess
+
+from server.cache import LRUCache
+
+
+def position_key(fen: str) -> str:
+    '''
+    Key of a position: its piece placement, as python-chess writes it.
+
+    The client sends every board with " b KQkq - 0 1" whoever is to move, so the
+    side to move, castling rights, en passant square and move clocks of a FEN say
+    nothing about the position and are left out of the key.
+
+    :raises ValueError: when fen is not a valid FEN
+    '''
+    return chess.Board(fen).board_fen()
+
+
+def play(fen: str, color: str, from_position: str, to_position: str):
+    '''
+    FEN after color moves from from_position to to_position, None when the move is illegal.
+
+    Pawns reaching the last rank are promoted to a queen.
+    '''
+    try:
+        board = chess.Board(fen)
+        board.turn = color == "white"
+        for uci in (from_position + to_position, from_position + to_position + "q"):
+            move = chess.Move.from_uci(uci)
+            if board.is_legal(move):
+                board.push(move)
+                return board.fen()
+    except ValueError:
+        pass
+    return None
+
+
+def _prolog_lock():
+    # imported on use so the server still starts when the symbolic dependencies are missing
+    try:  # pragma: no cover
+        from .neurosymbolicAI.symbolicAI.symbolic_ai import prolog_lock
+    except ImportError:  # pragma: no cover
+        from neurosymbolicAI.symbolicAI.symbolic_ai import prolog_lock
+    return prolog_lock
+
+
+class SpeculativeAnalyser:
+    '''
+    Background worker precomputing the analyses of likely next positions.
+
+    :param: :recorder: Symbolic instance whose graph is a RecordingGraph
+    :param: :tactics: (method, color, description) tactics run on every candidate, as in add_tactics_to_graph
+    :param: :replies: number of candidate replies analysed after a move
+    :param: :cpu_share: fraction of the time the worker may be busy, it sleeps for the rest
+    :param: :cache_size: number of analyses kept
+    '''
+
+    def __init__(self, recorder, tactics, replies: int = 3, cpu_share: float = 0.5, cache_size: int = 16):
+        self.recorder = recorder
+        self.tactics = tactics
+        self.replies = replies
+        self.cpu_share = min(max(cpu_share, 0.01), 1.0)
+        self.cache = LRUCache(maxsize=cache_size)
+        self._generation = 0
+        self._request = None
+        self._condition = threading.Condition()
+        self._foreground = 0
+        self._working = False
+        self._thread = None
+        self.started = 0
+        self.analysed = 0
+        self.cancelled = 0
+        self.hits = 0
+        self.misses = 0
+        self.busy_seconds = 0.0
+
+    def speculate(self, fen: str, player: str) -> None:
+        '''
+        Analyse the best replies of player in the position, cancelling the previous speculation.
+
+        :param: :fen: position after the move that was just played
+        :param: :player: color to reply
+        '''
+        with self._condition:
+            self._generation += 1
+            self._request = (self._generation, fen, player)
+            self.started += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._work, name="speculation", daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    def cancel(self) -> None:
+        '''
+        Drop the running speculation, called when a real move arrives.
+        '''
+        with self._condition:
+            self._generation += 1
+            self._request = None
+
+    def take(self, fen: str):
+        '''
+        Recorded writes of a speculated position, None when it was not analysed.
+        '''
+        try:
+            writes = self.cache.get(position_key(fen))
+        except ValueError:
+            writes = None
+        if writes is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return writes
+
+    def pause(self) -> None:
+        '''
+        Mark a request in flight, waiting for the current speculative step to finish.
+        '''
+        with self._condition:
+            self._foreground += 1
+            while self._working:
+                self._condition.wait()
+
+    def resume(self) -> None:
+        with self._condition:
+            self._foreground = max(self._foreground - 1, 0)
+            self._condition.notify_all()
+
+    def _current(self, generation: int) -> bool:
+        return generation == self._generation
+
+    def _work(self) -> None:
+        while True:
+            with self._condition:
+                while self._request is None:
+                    self._condition.wait()
+                request, self._request = self._request, None
+            try:
+                self.run(*request)
+            except Exception as exc:
+                print(f"Speculative analysis failed: {exc}")
+
+    @contextmanager
+    def _step(self, root: str):
+        '''
+        Run one unit of speculative work while no request is in flight, then restore the root position.
+        '''
+        with self._condition:
+            while self._foreground:
+                self._condition.wait()
+            self._working = True
+        start = time.perf_counter()
+        try:
+            with _prolog_lock():
+                try:
+                    yield
+                finally:
+                    self.recorder.parse_fen(root)
+        finally:
+            busy = time.perf_counter() - start
+            with self._condition:
+                self._working = False
+                self.busy_seconds += busy
+                self._condition.notify_all()
+            time.sleep(busy * (1 - self.cpu_share) / self.cpu_share)
+
+    def candidates(self, fen: str, player: str, generation: int) -> list:
+        '''
+        Positions after the most threatening replies of player.
+        '''
+        with self._step(fen):
+            self.recorder.parse_fen(fen)
+            moves = self.recorder.threat_moves(player)
+
+        positions = []
+        for _, _, from_position, to_position, _ in moves:
+            position = play(fen, player, from_position, to_position)
+            if position is not None and position not in positions:
+                positions.append(position)
+            if len(positions) >= self.replies or not self._current(generation):
+                break
+        return positions
+
+    def run(self, generation: int, fen: str, player: str) -> None:
+        '''
+        Analyse the candidate replies of one speculation on the calling thread.
+        '''
+        for position in self.candidates(fen, player, generation):
+            if not self._current(generation):
+                self.cancelled += 1
+                return
+            if self.cache.get(position_key(position)) is not None:
+                continue
+            writes = self.analyse(position, fen, generation)
+            if writes is None:
+                self.cancelled += 1
+                return
+            self.cache.set(position_key(position), writes)
+            self.analysed += 1
+
+    def analyse(self, position: str, root: str, generation: int):
+        '''
+        Record the graph writes of construct_graph and every tactic for a position.
+
+        :return: the recorded writes, None when the speculation was cancelled on the way
+        '''
+        self.recorder.graph.take()
+        steps = [lambda: self.recorder.construct_graph()]
+        steps += [lambda method=method, color=color: method(self.recorder, color) for method, color, _ in self.tactics]
+
+        for step in steps:
+            if not self._current(generation):
+                return None
+            with self._step(root):
+                self.recorder.parse_fen(position)
+                try:
+                    step()
+                except Exception as exc:
+                    print(f"Speculative step failed: {exc}")
+
+        return self.recorder.graph.take()
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "started": self.started,
+                "analysed": self.analysed,
+                "cancelled": self.cancelled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "cached": len(self.cache),
+                "busy_seconds": round(self.busy_seconds, 4),
+                "cpu_share": self.cpu_share,
+            }
+
+
+__all__ = ["SpeculativeAnalyser", "play", "position_key"]
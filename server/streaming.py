@@ -0,0 +1,70 @@
+'''
+Helpers for streaming the reinforced pipeline to the UI as server-sent events.
+
+The commentary agent is a ReAct agent, so the tokens it generates are mostly
+Thought / Action lines; FinalAnswerStreamer only forwards the tokens that follow
+"Final Answer:". sse() formats one event of the /reinforced_chatbot/stream route.
+'''
+
+from __future__ import annotations
+
+import json
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+FINAL_ANSWER_PREFIX = "Final Answer:"
+
+
+class FinalAnswerStreamer(BaseCallbackHandler):
+    '''
+    LangChain callback forwarding the Final Answer tokens of a ReAct agent as they are generated.
+
+    :param: :on_token: callable receiving each piece of the final answer
+    '''
+
+    # called on the event loop by async LLM runs instead of through the thread executor
+    run_inline = True
+
+    def __init__(self, on_token):
+        self.on_token = on_token
+        self._reset()
+
+    def _reset(self) -> None:
+        self._buffer = ""
+        self._streaming = False
+        self._started = False
+
+    def on_llm_start(self, *args, **kwargs) -> None:
+        self._reset()
+
+    def on_chat_model_start(self, *args, **kwargs) -> None:
+        self._reset()
+
+    def on_llm_new_token(self, token: str, **kwargs) -> None:
+        if not self._streaming:
+            self._buffer += token
+            index = self._buffer.find(FINAL_ANSWER_PREFIX)
+            if index < 0:
+                return
+            self._streaming = True
+            token = self._buffer[index + len(FINAL_ANSWER_PREFIX):]
+            self._buffer = ""
+
+        if not self._started:
+            token = token.lstrip()
+            self._started = bool(token)
+        if token:
+            self.on_token(token)
+
+
+def sse(event: str, data) -> str:
+    '''
+    Format a server-sent event.
+
+    :param: :event: event name
+    :param: :data: JSON-serialisable payload
+    '''
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+__all__ = ["FinalAnswerStreamer", "sse"]
@@ -1,3 +1,6 @@
+import os
+import re
+
 from langchain_community.chains.graph_qa.cypher import GraphCypherQAChain
 from langchain.prompts.prompt import PromptTemplate
 # from gemini_llm import llm
@@ -17,6 +20,13 @@ try:  # pragma: no cover
 except ImportError:  # pragma: no cover
     from prompts import CYPHER_GENERATION_TEMPLATE
 
+try:  # pragma: no cover
+    from ..cache import LRUCache, GRAPH_VERSION_QUERY
+    from .. import metrics
+except ImportError:  # pragma: no cover
+    from cache import LRUCache, GRAPH_VERSION_QUERY
+    import metrics
+
 cypher_prompt = PromptTemplate.from_template(CYPHER_GENERATION_TEMPLATE)
 
 if graph is not None:  # pragma: no branch
@@ -25,7 +35,7 @@ if graph is not None:  # pragma: no branch
         graph=graph,
         verbose=True,
         cypher_prompt=cypher_prompt,
-        # return_intermediate_steps=True,
+        return_intermediate_steps=True,
         return_direct=True,
         # validate_cypher=True,
         allow_dangerous_requests=True,
@@ -35,12 +45,158 @@ if graph is not None:  # pragma: no branch
 else:  # pragma: no cover
     _cypher_chain = None
 
+# Generated Cypher only depends on the question and the schema, so it is kept
+# across positions. Query results are keyed by the version token stored in the
+# graph and go stale as soon as any worker rebuilds it for another position.
+_cypher_cache = LRUCache(
+    maxsize=int(os.getenv("CAISSA_CYPHER_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("CAISSA_CYPHER_CACHE_TTL", "86400")),
+)
+_result_cache = LRUCache(maxsize=int(os.getenv("CAISSA_CYPHER_RESULT_CACHE_SIZE", "512")))
+
+
+def _graph_version():
+    """
+    Read the version token every knowledge-graph write stores in the database.
+    """
+    rows = graph.query(GRAPH_VERSION_QUERY)
+    return rows[0]["token"] if rows else None
+
+
+def _normalize_question(question):
+    """
+    Reduce a tool input to a cache key: the question text, lower-cased, with
+    whitespace collapsed and trailing punctuation dropped. Inputs that carry
+    anything besides the question are not cached.
+    """
+    if isinstance(question, dict):
+        if set(question) - {"query", "question"}:
+            return None
+        question = question.get("query", question.get("question"))
+    if not isinstance(question, str):
+        return None
+    normalized = re.sub(r"\s+", " ", question).strip().lower().rstrip("?.! ")
+    return normalized or None
+
+
+def _generated_cypher(result):
+    if not isinstance(result, dict):
+        return None
+    for step in result.get("intermediate_steps") or []:
+        if isinstance(step, dict) and step.get("query"):
+            return step["query"]
+    return None
+
+
+# Question shapes the chatbot asks over and over, answered with fixed,
+# parameterised Cypher instead of an LLM-generated query. Patterns run on the
+# normalised question, so they only need to match lower-case text without a
+# trailing question mark.
+_COLOR = r"(?P<color>white|black)"
+_PIECE = r"(?P<piece>king|queen|rook|bishop|knight|pawn)"
+_SQUARE = r"[a-h][1-8]"
+_TACTIC_NAMES = {
+    "fork": "fork",
+    "skewer": "skewer",
+    "discovered attack": "discovered attack",
+    "discovery attack": "discovered attack",
+    "discovered check": "discovered check",
+    "discovery check": "discovered check",
+    "absolute pin": "absolute pin",
+    "relative pin": "relative pin",
+    "interference": "interference",
+    "hanging piece": "hanging piece",
+    "mate in one": "mateIn1",
+    "mate in 1": "mateIn1",
+    "mate in two": "mateIn2",
+    "mate in 2": "mateIn2",
+}
+_TACTIC = "(?P<tactic>" + "|".join(sorted((re.escape(name) for name in _TACTIC_NAMES), key=len, reverse=True)) + ")"
+
+_INTENT_CYPHER = {
+    "piece_position": """MATCH (p:Piece {color: $color, piece: $piece})-[:Locate]->(s:Square)
+RETURN s.position AS position""",
+    "tactic_supports_move": """MATCH (p:Piece {piece: $piece, color: $color, position: $from_position})-[t:Tactic {tactic_name: $tactic}]->(s:Square {position: $to_position})
+RETURN properties(t) AS tactic""",
+    "tactics_for_color": """MATCH (p:Piece {color: $color})-[t:Tactic]->(s:Square)
+RETURN t.tactic_name AS tactic, p.piece AS piece, p.position AS from, s.position AS to""",
+    "moves_by_tactic": """MATCH (p:Piece {color: $color})-[t:Tactic {tactic_name: $tactic}]->(s:Square)
+RETURN p.piece AS piece, p.position AS from, s.position AS to""",
+    "attacked_pieces": """MATCH (attacker:Piece)-[:Suggest {tactic: "threat"}]->(s:Square)<-[:Locate]-(target:Piece {color: $color})
+WHERE attacker.color <> $color
+RETURN DISTINCT target.piece AS piece, target.position AS position, attacker.piece AS attacker, attacker.position AS attacker_position""",
+    "defended_pieces": """MATCH (defender:Piece {color: $color})-[:Suggest {tactic: "defend"}]->(s:Square)<-[:Locate]-(target:Piece {color: $color})
+RETURN DISTINCT target.piece AS piece, target.position AS position, defender.piece AS defender, defender.position AS defender_position""",
+    "pieces_defended_by": """MATCH (p1:Piece {piece: $piece, color: $color})-[:Suggest {tactic: "defend"}]->(s1:Square)
+MATCH (p2:Piece {color: $color})-[:Locate]->(s1)
+RETURN p2.piece, p2.color, s1.position""",
+    "pieces_threatened_by": """MATCH (p1:Piece {piece: $piece, color: $color})-[:Suggest {tactic: "threat"}]->(s1:Square)
+MATCH (p2:Piece)-[:Locate]->(s1)
+WHERE p2.color <> $color
+RETURN p2.piece, p2.color, s1.position""",
+}
+
+_INTENT_PATTERNS = [
+    ("piece_position", rf"(?:what is the position of|where is) the {_COLOR} {_PIECE}"),
+    ("tactic_supports_move", rf"does the {_TACTIC} tactic support the move of (?:the )?{_COLOR} {_PIECE} from (?P<from_position>{_SQUARE}) to (?P<to_position>{_SQUARE})"),
+    ("tactics_for_color", rf"(?:what|which) tactics (?:are )?(?:available )?for {_COLOR}"),
+    ("tactics_for_color", rf"(?:what|which) tactics does {_COLOR} have"),
+    ("moves_by_tactic", rf"(?:what|which) moves (?:does|can) {_COLOR} (?:have|play) (?:for|with) (?:a |an |the )?{_TACTIC}"),
+    ("moves_by_tactic", rf"(?:what|which) are the {_COLOR} {_TACTIC} moves"),
+    ("attacked_pieces", rf"(?:what|which) {_COLOR} pieces are (?:attacked|threatened|under attack|under threat)"),
+    ("defended_pieces", rf"(?:what|which) {_COLOR} pieces are (?:defended|protected)"),
+    ("pieces_defended_by", rf"(?:what|which) (?:ally )?pieces does the {_COLOR} {_PIECE} defend"),
+    ("pieces_threatened_by", rf"(?:what|which) (?:opponent |enemy )?pieces does the {_COLOR} {_PIECE} (?:threat|threaten|attack)"),
+]
+_INTENTS = [(name, re.compile(pattern + "$")) for name, pattern in _INTENT_PATTERNS]
+
+_route_counts = {"fast_path": 0, "fallback": 0}
+_intent_counts = {name: 0 for name in _INTENT_CYPHER}
+
+
+def _match_intent(normalized_question):
+    """
+    Return (intent name, Cypher, parameters) for a recognised question shape, or None.
+    """
+    if normalized_question is None:
+        return None
+    for name, pattern in _INTENTS:
+        match = pattern.match(normalized_question)
+        if match:
+            params = match.groupdict()
+            if "tactic" in params:
+                params["tactic"] = _TACTIC_NAMES[params["tactic"]]
+            return name, _INTENT_CYPHER[name], params
+    return None
+
+
+def routing_stats():
+    total = _route_counts["fast_path"] + _route_counts["fallback"]
+    return {
+        **_route_counts,
+        "fast_path_ratio": round(_route_counts["fast_path"] / total, 4) if total else 0.0,
+        "intents": dict(_intent_counts),
+    }
+
+
+def cache_stats():
+    return {"cypher": _cypher_cache.stats(), "result": _result_cache.stats()}
+
+
+metrics.register("cypher_qa_cache", cache_stats)
+metrics.register("cypher_qa_routing", routing_stats)
+
 
 def cypher_qa(question):
     """
     Thin wrapper around the GraphCypherQAChain that prints helpful diagnostics
     every time the tool is invoked. Whatever input LangChain passes through
     (string or dict) is forwarded unchanged to the underlying chain.
+
+    Recognised question shapes are answered with a fixed Cypher template.
+    Questions seen before skip Cypher generation: the cached Cypher is run
+    directly against the graph, or its rows are reused if the position has
+    not changed since.
     """
     print("\n[CypherQA] Incoming question/input:", question)
     if _cypher_chain is None:  # pragma: no cover
@@ -51,12 +207,55 @@ def cypher_qa(question):
             ) from GRAPH_ERROR
         raise RuntimeError("GraphCypherQAChain is unavailable: graph not initialized.")
 
+    key = _normalize_question(question)
+    intent = _match_intent(key)
+    if intent is not None:
+        name, cypher, params = intent
+        _route_counts["fast_path"] += 1
+        _intent_counts[name] += 1
+        result_key = (cypher, tuple(sorted(params.items())), _graph_version())
+        context = _result_cache.get(result_key)
+        if context is None:
+            try:
+                context = graph.query(cypher, params)
+            except Exception as exc:  # noqa: BLE001
+                print("[CypherQA] Error while executing template query:", exc)
+                raise
+            _result_cache.set(result_key, context)
+        print(f"[CypherQA] Matched intent {name} with parameters:", params)
+        return {"query": question, "result": list(context)}
+
+    _route_counts["fallback"] += 1
+    cypher = _cypher_cache.get(key) if key is not None else None
+    if cypher is not None:
+        result_key = (cypher, _graph_version())
+        context = _result_cache.get(result_key)
+        if context is None:
+            try:
+                context = graph.query(cypher)[: getattr(_cypher_chain, "top_k", 10)]
+            except Exception as exc:  # noqa: BLE001
+                print("[CypherQA] Error while executing cached query:", exc)
+                raise
+            _result_cache.set(result_key, context)
+        print("[CypherQA] Cache hit, reused Cypher:", cypher)
+        return {"query": question, "result": list(context)}
+
+    # read before the chain queries the graph, only needed if the rows get cached
+    version = _graph_version() if key is not None else None
     try:
         result = _cypher_chain.invoke(question)
     except Exception as exc:  # noqa: BLE001
         print("[CypherQA] Error while executing query:", exc)
         raise
 
+    cypher = _generated_cypher(result)
+    if key is not None and cypher is not None:
+        _cypher_cache.set(key, cypher)
+        _result_cache.set((cypher, version), list(result.get("result") or []))
+    if isinstance(result, dict) and "intermediate_steps" in result:
+        # the agent only ever saw the question and the rows, keep it that way
+        result = {k: v for k, v in result.items() if k != "intermediate_steps"}
+
     if isinstance(result, dict):
         context = result.get("context")
         if context is not None:
@@ -1,7 +1,11 @@
+import contextlib
+import json
 import os
 import sys
 import types
 
+import pytest
+
 
 def _install_module(name: str) -> types.ModuleType:
     """
@@ -33,6 +37,8 @@ for key, value in {
     os.environ.setdefault(key, value)
 
 os.environ.setdefault("CAISSA_SKIP_LLM", "1")
+os.environ.setdefault("CAISSA_LLM_CACHE_PATH", ":memory:")
+os.environ.setdefault("CAISSA_JOB_STORE_PATH", ":memory:")
 
 # streamlit
 streamlit = _install_module("streamlit")
@@ -64,18 +70,83 @@ class _Flask:
 
         return decorator
 
+    def before_request(self, func):
+        return func
+
+    def teardown_request(self, func):
+        return func
+
 
 def _jsonify(*args, **kwargs):
     return {"args": args, "kwargs": kwargs}
 
 
+class _Response:
+    def __init__(self, response=None, *args, **kwargs):
+        self.response = response
+        self.kwargs = kwargs
+
+
 flask.Flask = _Flask
 flask.jsonify = _jsonify
+flask.Response = _Response
+flask.stream_with_context = lambda generator: generator
 flask.request = types.SimpleNamespace()
 
 flask_cors = _install_module("flask_cors")
 flask_cors.CORS = lambda *args, **kwargs: None
 
+# starlette
+starlette_applications = _install_module("starlette.applications")
+starlette_middleware = _install_module("starlette.middleware")
+starlette_cors = _install_module("starlette.middleware.cors")
+starlette_wsgi = _install_module("starlette.middleware.wsgi")
+starlette_responses = _install_module("starlette.responses")
+starlette_routing = _install_module("starlette.routing")
+
+
+class _Starlette:
+    def __init__(self, routes=(), middleware=(), lifespan=None):
+        self.routes = list(routes)
+        self.middleware = list(middleware)
+        self.lifespan = lifespan
+
+
+class _ASGIStub:
+    def __init__(self, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+
+
+class _Route:
+    def __init__(self, path, endpoint=None, methods=None, app=None):
+        self.path = path
+        self.endpoint = endpoint
+        self.methods = methods
+        self.app = app
+
+
+class _JSONResponse:
+    def __init__(self, content, *args, **kwargs):
+        self.content = content
+
+
+class _StreamingResponse:
+    def __init__(self, content, media_type=None, headers=None):
+        self.body_iterator = content
+        self.media_type = media_type
+        self.headers = headers
+
+
+starlette_applications.Starlette = _Starlette
+starlette_middleware.Middleware = _ASGIStub
+starlette_cors.CORSMiddleware = _ASGIStub
+starlette_wsgi.WSGIMiddleware = _ASGIStub
+starlette_responses.JSONResponse = _JSONResponse
+starlette_responses.StreamingResponse = _StreamingResponse
+starlette_routing.Route = _Route
+starlette_routing.Mount = _Route
+
 # torch
 torch = _install_module("torch")
 torch.float16 = "float16"
@@ -100,6 +171,7 @@ class _Backends:
 
 torch.cuda = _Cuda()
 torch.backends = _Backends()
+torch.inference_mode = contextlib.nullcontext
 
 # transformers
 transformers = _install_module("transformers")
@@ -214,6 +286,16 @@ pyswip.Prolog = Prolog
 neo4j = _install_module("neo4j")
 
 
+class _Result(list):
+    def single(self):
+        return self[0] if self else None
+
+
+class _Transaction:
+    def run(self, query, **params):
+        return _Result()
+
+
 class _Session:
     def __enter__(self):
         return self
@@ -221,11 +303,11 @@ class _Session:
     def __exit__(self, exc_type, exc, tb):
         return False
 
-    def execute_write(self, *args, **kwargs):
-        return None
+    def execute_write(self, tx_function, *args):
+        return tx_function(_Transaction(), *args)
 
-    def execute_read(self, *args, **kwargs):
-        return []
+    def execute_read(self, tx_function, *args):
+        return tx_function(_Transaction(), *args)
 
 
 class _Driver:
@@ -249,7 +331,11 @@ chess = _install_module("chess")
 
 
 class Board:
-    pass
+    def __init__(self, fen="rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"):
+        self.fen_string = fen
+
+    def board_fen(self):
+        return self.fen_string.split()[0]
 
 
 chess.Board = Board
@@ -289,11 +375,14 @@ class AgentExecutor:
         self.agent = agent
         self.tools = tools
 
-    def invoke(self, inputs):
+    def invoke(self, inputs, config=None):
         if callable(self.agent):
             return self.agent(inputs)
         return {"output": ""}
 
+    async def ainvoke(self, inputs, config=None):
+        return self.invoke(inputs, config)
+
 
 def create_react_agent(llm, tools, prompt):
     def _agent(inputs):
@@ -355,6 +444,50 @@ class JsonOutputParser:
 
 langchain_output_parsers.JsonOutputParser = JsonOutputParser
 
+# langchain_core.caches / langchain_core.load
+langchain_core_caches = _install_module("langchain_core.caches")
+
+
+class BaseCache:
+    pass
+
+
+langchain_core_caches.BaseCache = BaseCache
+
+# langchain_core.runnables
+langchain_core_runnables = _install_module("langchain_core.runnables")
+
+
+class RunnableLambda:
+    def __init__(self, func, afunc=None):
+        self.func = func
+        self.afunc = afunc
+
+    def invoke(self, inputs, config=None):
+        return self.func(inputs)
+
+    async def ainvoke(self, inputs, config=None):
+        if self.afunc is not None:
+            return await self.afunc(inputs)
+        return self.func(inputs)
+
+
+langchain_core_runnables.RunnableLambda = RunnableLambda
+
+# langchain_core.callbacks
+langchain_core_callbacks = _install_module("langchain_core.callbacks")
+
+
+class BaseCallbackHandler:
+    pass
+
+
+langchain_core_callbacks.BaseCallbackHandler = BaseCallbackHandler
+
+langchain_core_load = _install_module("langchain_core.load")
+langchain_core_load.dumps = json.dumps
+langchain_core_load.loads = json.loads
+
 # langchain_community.chat_models
 langchain_chat = _install_module("langchain_community.chat_models")
 
@@ -369,6 +502,17 @@ class ChatOpenAI:
 
 langchain_chat.ChatOpenAI = ChatOpenAI
 
+# langchain_community.callbacks
+langchain_callbacks = _install_module("langchain_community.callbacks")
+
+
+@contextlib.contextmanager
+def get_openai_callback():
+    yield types.SimpleNamespace(total_tokens=0)
+
+
+langchain_callbacks.get_openai_callback = get_openai_callback
+
 # langchain_google_genai
 langchain_genai = _install_module("langchain_google_genai")
 
@@ -388,6 +532,10 @@ class _CompiledGraph:
     def stream(self, inputs):
         return iter([])
 
+    async def astream(self, inputs):
+        for step in self.stream(inputs):
+            yield step
+
 
 class StateGraph:
     def __init__(self, state_type):
@@ -412,3 +560,87 @@ class StateGraph:
 
 langgraph_graph.StateGraph = StateGraph
 langgraph_graph.END = object()
+
+
+# Fakes shared by the tests of the board and analysis routes of server.server
+class FakeGraph:
+    def __init__(self):
+        self.replayed = []
+
+    def replay(self, writes):
+        self.replayed.append(writes)
+
+
+class FakeSymbolic:
+    """
+    Symbolic stand-in recording the engine and graph calls of the routes.
+
+    on_call, when set, is called with the name of every recorded call.
+    """
+
+    GRAPH_CALLS = ("construct_graph", "add_tactics_to_graph")
+
+    def __init__(self):
+        self.graph = FakeGraph()
+        self.boards = []
+        self.calls = []
+        self.on_call = None
+
+    def called(self, name):
+        self.calls.append(name)
+        if self.on_call is not None:
+            self.on_call(name)
+
+    def builds(self):
+        return [name for name in self.calls if name in self.GRAPH_CALLS]
+
+    def parse_fen(self, fen_string):
+        self.called("parse_fen")
+
+    def update_board(self, fen_string):
+        self.boards.append(fen_string)
+        self.called("update_board")
+
+    def get_board(self):
+        self.called("get_board")
+        return [["r"]]
+
+    def legal_moves(self, piece, color, position):
+        self.called("legal_moves")
+        return ["f3"]
+
+    def display_board_cli(self):
+        pass
+
+    def make_move(self, piece, color, from_position, to_position):
+        self.called("make_move")
+        return ["moved"], [["r"]]
+
+    def construct_graph(self):
+        self.called("construct_graph")
+
+
+@pytest.fixture
+def server_routes(monkeypatch):
+    """
+    server.server with a FakeSymbolic behind ns, no speculator or analysis store,
+    and a request from one client. call(route, json=..., args=...) sets the body
+    and query of the request before calling the route.
+    """
+    from server import server as server_module
+
+    symbolic = FakeSymbolic()
+    monkeypatch.setattr(server_module, "ns", types.SimpleNamespace(symbolic=symbolic))
+    monkeypatch.setattr(server_module, "speculator", None)
+    monkeypatch.setattr(server_module, "analysis_store", None)
+    monkeypatch.setattr(server_module, "add_tactics_to_graph", lambda *args, **kwargs: symbolic.called("add_tactics_to_graph"))
+    monkeypatch.setattr(server_module.request, "headers", {"X-Client-Id": "test-client"}, raising=False)
+
+    def call(route, json=None, args=None):
+        if json is not None:
+            monkeypatch.setattr(server_module.request, "json", json, raising=False)
+        if args is not None:
+            monkeypatch.setattr(server_module.request, "args", args, raising=False)
+        return getattr(server_module, route)()
+
+    return types.SimpleNamespace(module=server_module, symbolic=symbolic, call=call)
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import json
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from server import jobs, metrics  # noqa: E402
+from server.jobs import DONE, FAILED, QUEUED, JobQueue  # noqa: E402
+
+
+def test_jobs_run_in_the_background_and_report_latency():
+    release = threading.Event()
+
+    def handler(fen):
+        release.wait(5)
+        return {"fen": fen}
+
+    analysis = JobQueue(handler)
+    job = analysis.submit("fen-1")
+
+    assert analysis.get(job.id) is job
+    assert job.status in (QUEUED, "running")
+
+    release.set()
+    assert job.finished.wait(5)
+    assert job.to_dict()["status"] == DONE
+    assert job.result == {"fen": "fen-1"}
+
+    stats = analysis.stats()
+    assert stats["completed"] == 1
+    assert stats["queue_depth"] == 0
+    assert stats["run_mean"] >= 0
+
+
+def test_pending_jobs_for_the_same_fen_are_coalesced():
+    analysis = JobQueue(lambda fen: fen, workers=0)
+
+    first = analysis.submit("fen-1")
+    second = analysis.submit("fen-1")
+    other = analysis.submit("fen-2")
+
+    assert second is first
+    assert other is not first
+    assert analysis.stats()["coalesced"] == 1
+    assert analysis.stats()["queue_depth"] == 2
+
+    analysis.run(first)
+    assert analysis.submit("fen-1") is not first
+
+
+def test_failed_jobs_keep_the_error():
+    def handler(fen):
+        raise RuntimeError("neo4j is down")
+
+    analysis = JobQueue(handler, workers=0)
+    job = analysis.submit("fen-1")
+    analysis.run(job)
+
+    assert job.status == FAILED
+    assert job.error == "neo4j is down"
+    assert analysis.stats()["failed"] == 1
+
+
+def test_finished_jobs_are_trimmed_to_the_history():
+    analysis = JobQueue(lambda fen: fen, workers=0, history=2)
+    submitted = [analysis.submit(f"fen-{index}") for index in range(3)]
+    for job in submitted:
+        analysis.run(job)
+
+    assert analysis.get(submitted[0].id) is None
+    assert analysis.get(submitted[2].id) is submitted[2]
+
+
+def test_webhook_receives_the_finished_job(monkeypatch):
+    posted = []
+
+    class Response:
+        def close(self):
+            pass
+
+    class Opener:
+        def open(self, request, timeout):
+            posted.append((request.full_url, json.loads(request.data)))
+            return Response()
+
+    monkeypatch.setattr(jobs, "_opener", Opener())
+    analysis = JobQueue(lambda fen: {"fen": fen}, workers=0, webhook_hosts=["client"])
+    job = analysis.submit("fen-1", callback_url="http://client/analysis-ready")
+    analysis.run(job)
+
+    assert posted == [("http://client/analysis-ready", job.to_dict())]
+
+
+def test_callbacks_are_limited_to_http_on_allowed_hosts(monkeypatch):
+    analysis = JobQueue(lambda fen: {"fen": fen}, workers=0, webhook_hosts=["Client"])
+
+    assert analysis.callback_allowed("https://client:8443/analysis-ready")
+    for url in ["file:///etc/passwd", "gopher://client/", "http://169.254.169.254/latest", "http://client.evil/", 42]:
+        assert not analysis.callback_allowed(url)
+        with pytest.raises(ValueError):
+            analysis.submit("fen-1", callback_url=url)
+
+    monkeypatch.delenv("CAISSA_WEBHOOK_HOSTS", raising=False)
+    assert not JobQueue(lambda fen: fen, workers=0).callback_allowed("http://client/")
+    monkeypatch.setenv("CAISSA_WEBHOOK_HOSTS", "hooks.example, client")
+    assert JobQueue(lambda fen: fen, workers=0).callback_allowed("http://client/")
+
+
+def test_analysis_routes_return_the_board_at_once(monkeypatch, server_routes):
+    analysed = []
+    analysis = JobQueue(lambda fen: analysed.append(fen) or {"fen": fen}, workers=0)
+    monkeypatch.setattr(server_routes.module, "analysis_jobs", analysis)
+
+    response, status = server_routes.call("post_analysis", json={"fen_string": "fen-1"})
+    body = response["args"][0]
+
+    assert status == 202
+    assert body["board"] == [["r"]]
+    assert body["status"] == QUEUED
+    assert analysed == []
+
+    analysis.run(analysis.get(body["job_id"]))
+    polled = server_routes.module.get_analysis(body["job_id"])["args"][0]
+    assert polled["status"] == DONE
+    assert server_routes.module.get_analysis("missing")[1] == 404
+    assert "analysis_jobs" in metrics.snapshot()
+
+    assert server_routes.call("post_analysis", json={"fen_string": "fen-2", "callback_url": "file:///etc/passwd"})[1] == 400
+    assert server_routes.symbolic.boards == ["fen-1"]
+
+
+def probe_prolog_lock(server_routes):
+    """
+    Record, for every engine and graph call, whether another thread would find prolog_lock taken.
+    """
+    prolog_lock = server_routes.module.prolog_lock
+    held = []
+
+    def on_call(name):
+        # a request thread trying to rebind the engine has to wait for the caller
+        def probe():
+            acquired = prolog_lock.acquire(blocking=False)
+            if acquired:
+                prolog_lock.release()
+            held.append((name, not acquired))
+
+        thread = threading.Thread(target=probe)
+        thread.start()
+        thread.join()
+
+    server_routes.symbolic.on_call = on_call
+    return held
+
+
+def test_analysis_job_holds_the_prolog_lock_for_the_whole_sweep(server_routes):
+    held = probe_prolog_lock(server_routes)
+
+    assert server_routes.module.analyse_position("fen-1") == {"fen": "fen-1"}
+    assert server_routes.symbolic.boards == ["fen-1"]
+    assert held == [("update_board", True), ("construct_graph", True), ("add_tactics_to_graph", True)]
+
+
+def test_board_routes_hold_the_prolog_lock(monkeypatch, server_routes):
+    monkeypatch.setattr(server_routes.module, "play", lambda *args: None)
+    held = probe_prolog_lock(server_routes)
+
+    server_routes.call("get_legal_moves", args={"piece": "knight", "color": "white", "position": "g1"})
+    server_routes.call("set_fen", json={"fen_string": "fen-1"})
+    server_routes.call(
+        "make_move",
+        json={"fen_string": "fen-1", "piece": "knight", "color": "white", "from_position": "g1", "to_position": "f3"},
+    )
+
+    assert [name for name, _ in held] == [
+        "parse_fen", "legal_moves",
+        "update_board", "get_board", "construct_graph", "add_tactics_to_graph",
+        "parse_fen", "make_move", "construct_graph", "add_tactics_to_graph",
+    ]
+    assert all(taken for _, taken in held)
+
+
+def test_jobs_can_be_polled_through_another_process(tmp_path):
+    path = str(tmp_path / "jobs.sqlite")
+    submitting = JobQueue(lambda fen: {"fen": fen}, workers=0, store=jobs.JobStore(path))
+    polling = JobQueue(lambda fen: fen, workers=0, store=jobs.JobStore(path))
+
+    job = submitting.submit("fen-1")
+    assert polling.get(job.id).status == QUEUED
+
+    submitting.run(job)
+    polled = polling.get(job.id)
+
+    assert polled.status == DONE
+    assert polled.result == {"fen": "fen-1"}
+    assert polled.finished.is_set()
+    assert polling.get("unknown") is None
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from server.analysis_store import AnalysisStore, load_store, write_store  # noqa: E402
+from server.neurosymbolicAI.symbolicAI.symbolic_ai import InferenceGraph, RecordingGraph  # noqa: E402
+
+START = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+E4 = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+
+
+def recorded(piece):
+    graph = RecordingGraph()
+    graph.destroy()
+    graph.create_piece(piece, "white", "e1")
+    graph.build_features([("knight", "white", "g1", "f3")], "move_defend")
+    return graph.take()
+
+
+def build(path, positions=(START, E4)):
+    write_store(str(path), [(fen, recorded(f"piece-{index}")) for index, fen in enumerate(positions)])
+    return AnalysisStore(str(path))
+
+
+def test_positions_are_looked_up_by_their_piece_placement(tmp_path):
+    store = build(tmp_path / "analysis.store")
+
+    # the client sends every board with " b KQkq - 0 1"
+    writes = store.get(START.replace(" w KQkq - 0 1", " b KQkq - 0 1"))
+
+    assert len(store) == 2
+    assert [name for name, _ in writes] == ["delete_all_nodes", "create_piece_node", "build_features_relation"]
+    assert writes[1][1] == ("piece-0", "white", "e1")
+    assert E4 in store
+    assert store.get("8/8/8/8/8/8/8/8 w - - 0 1") is None
+    assert store.stats()["hits"] == 1 and store.stats()["misses"] == 1
+
+
+def test_many_positions_are_found_by_binary_search(tmp_path):
+    positions = [f"8/8/8/8/8/8/8/{index or ''}K{7 - index or ''} w - - 0 1" for index in range(8)] + [START, E4]
+    store = build(tmp_path / "analysis.store", positions)
+
+    assert all(store.get(fen) is not None for fen in positions)
+    assert [key for key, _ in store.items()] == sorted(fen.split()[0] for fen in positions)
+
+
+class ReplaySession:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute_write(self, tx_function, *args):
+        tx_function(ReplayTx(self.calls), *args)
+
+
+class ReplayTx:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def run(self, query, **params):
+        self.calls.append(params)
+
+
+def test_stored_writes_replay_by_name(tmp_path):
+    store = build(tmp_path / "analysis.store")
+    calls = []
+    graph = InferenceGraph("bolt://stub", "user", "pass")
+    graph.driver = type("Driver", (), {"session": lambda self: ReplaySession(calls)})()
+
+    graph.replay(store.get(E4))
+
+    assert {"piece": "piece-1", "color": "white", "position": "e1"} in calls
+    assert any(params.get("moves") == [{"piece": "knight", "color": "white", "from": "g1", "to": "f3"}] for params in calls)
+
+
+def test_missing_or_foreign_files_are_not_loaded(tmp_path):
+    foreign = tmp_path / "foreign.store"
+    foreign.write_bytes(b"not a store")
+
+    assert load_store(None) is None
+    assert load_store(str(tmp_path / "missing.store")) is None
+    assert load_store(str(foreign)) is None
+
+
+def test_set_fen_of_a_known_position_is_a_lookup(tmp_path, monkeypatch, server_routes):
+    monkeypatch.setattr(server_routes.module, "analysis_store", build(tmp_path / "analysis.store"))
+
+    server_routes.call("set_fen", json={"fen_string": START})
+
+    assert server_routes.symbolic.builds() == []
+    assert server_routes.symbolic.graph.replayed[0][0][0] == "delete_all_nodes"
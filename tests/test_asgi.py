@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import asyncio
+import importlib
+import sys
+import threading
+import types
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+
+async def _agenerate_response(prompt, feedback="", callbacks=None):
+    return f"commentary for {prompt}"
+
+
+@pytest.fixture
+def modules(monkeypatch):
+    '''
+    Import server.pipeline and server.asgi against stub agent modules.
+    '''
+    for name in ("server.reinforced_agent", "server.agent"):
+        stub = types.ModuleType(name)
+        stub.generate_response = lambda *_, **__: "response"
+        stub.agenerate_response = _agenerate_response
+        monkeypatch.setitem(sys.modules, name, stub)
+    for name in ("server.pipeline", "server.asgi"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+
+    return importlib.import_module("server.pipeline"), importlib.import_module("server.asgi")
+
+
+class AsyncApp:
+    def __init__(self):
+        self.inputs = None
+
+    async def astream(self, inputs):
+        self.inputs = inputs
+        yield {"main_agent": {"status": "Reinforced Agent"}}
+        await asyncio.sleep(0)
+        if inputs["on_token"] is not None:
+            inputs["on_token"]("The white pawn")
+        yield {"reflex_checkpoint": {"status": "End", "final_answer": "The white pawn.", "stop_reason": "verified"}}
+
+
+def test_achat_awaits_the_graph(monkeypatch, modules):
+    pipeline, _ = modules
+    monkeypatch.setattr(pipeline, "app", AsyncApp())
+
+    result = asyncio.run(pipeline.achat("Comment on the position", "fen", details=True))
+
+    assert result == {"answer": "The white pawn.", "reflex_iterations": 0, "stop_reason": "verified"}
+
+
+def test_achat_stream_yields_nodes_tokens_and_the_answer(monkeypatch, modules):
+    pipeline, _ = modules
+    monkeypatch.setattr(pipeline, "app", AsyncApp())
+
+    async def collect():
+        return [event async for event in pipeline.achat_stream("Comment on the position", "fen")]
+
+    events = asyncio.run(collect())
+
+    assert [event for event, _ in events] == ["node", "token", "node", "done"]
+    assert events[-1][1]["answer"] == "The white pawn."
+
+
+def test_llm_nodes_await_their_agents(monkeypatch, modules):
+    pipeline, _ = modules
+    calls = []
+
+    class AsyncRunner:
+        async def ainvoke(self, inputs):
+            calls.append(inputs)
+            return {"output": "Builder Agent"}
+
+    monkeypatch.setattr(pipeline, "LOCAL_ROUTER", False)
+    monkeypatch.setattr(pipeline, "main_agent_runnable", AsyncRunner())
+
+    main_node = pipeline.workflow.nodes["main_agent"]
+    commentary_node = pipeline.workflow.nodes["commentary_agent"]
+
+    route = asyncio.run(main_node.ainvoke({"input": "build a relation"}))
+    commentary = asyncio.run(commentary_node.ainvoke({"input": "q", "status": "Reinforced Agent"}))
+
+    assert route["status"] == "Builder Agent"
+    assert calls == [{"input": "build a relation"}]
+    assert commentary == {"commentary_agent_outcome": "commentary for q"}
+
+
+class Request:
+    def __init__(self, data, client_id="client-1"):
+        self.data = data
+        self.headers = {"X-Client-Id": client_id}
+        self.client = None
+
+    async def json(self):
+        return self.data
+
+
+def test_asgi_routes(monkeypatch, modules):
+    _, asgi = modules
+
+    async def achat(input, fen_string, details=False):
+        return {"answer": f"answer to {input}", "reflex_iterations": 1, "stop_reason": "verified"}
+
+    async def agenerate_response(prompt):
+        return f"chat answer to {prompt}"
+
+    monkeypatch.setattr(asgi, "achat", achat)
+    monkeypatch.setattr(asgi, "agenerate_response", agenerate_response)
+
+    reinforced = asyncio.run(asgi.post_message_with_reinforced_chatbot(Request({"prompt": "q", "fen": "fen"})))
+    chatbot = asyncio.run(asgi.post_message(Request({"prompt": "q"}, client_id="client-2")))
+
+    assert reinforced.content == {"answer": "answer to q", "reflex_iterations": 1, "stop_reason": "verified"}
+    assert chatbot.content == {"answer": "chat answer to q"}
+    assert asgi.session_store.get("client-1").fen == "fen"
+    assert {route.path for route in asgi.app.routes} >= {"/reinforced_chatbot", "/reinforced_chatbot/stream", "/chatbot", "/neurosym"}
+
+
+def test_neurosym_runs_on_the_prolog_pool(monkeypatch, modules):
+    _, asgi = modules
+    threads = []
+
+    def suggest(fen_string):
+        threads.append(threading.current_thread().name)
+        return f"tactic for {fen_string}"
+
+    monkeypatch.setattr(asgi, "_suggest", suggest)
+
+    response = asyncio.run(asgi.post_tactic(Request({"fen": "fen"})))
+
+    assert response.content == {"answer": "tactic for fen"}
+    assert threads[0].startswith("prolog")
+
+
+def test_suggest_holds_the_prolog_lock_from_binding_to_the_answer(monkeypatch, modules):
+    _, asgi = modules
+    held = []
+
+    def probe():
+        acquired = asgi.prolog_lock.acquire(blocking=False)
+        if acquired:
+            asgi.prolog_lock.release()
+        held.append(not acquired)
+
+    class FakeNS:
+        symbolic = types.SimpleNamespace(parse_fen=lambda fen_string: None)
+
+        def suggest(self, fen_string, move, test):
+            thread = threading.Thread(target=probe)
+            thread.start()
+            thread.join()
+            return f"tactic for {fen_string}"
+
+    monkeypatch.setattr(asgi.flask_server, "ns", FakeNS())
+
+    assert asgi._suggest("fen") == "tactic for fen"
+    assert held == [True]
+
+
+def test_native_routes_pause_the_speculator(monkeypatch, modules):
+    _, asgi = modules
+    events = []
+
+    class Speculator:
+        def pause(self):
+            events.append("pause")
+
+        def resume(self):
+            events.append("resume")
+
+    async def route(scope, receive, send):
+        events.append(scope["type"])
+
+    monkeypatch.setattr(asgi.flask_server, "speculator", Speculator())
+    middleware = asgi.PauseSpeculation(route)
+
+    asyncio.run(middleware({"type": "http"}, None, None))
+    asyncio.run(middleware({"type": "lifespan"}, None, None))
+
+    assert events == ["pause", "http", "resume", "lifespan"]
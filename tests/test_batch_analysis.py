@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import io
+import json
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from server import batch  # noqa: E402
+from server.batch import ResultWriter, analyse_batch, completed_keys, read_positions, run_batch  # noqa: E402
+
+
+class FakeNeuroSymbolic:
+    def __init__(self):
+        self.suggested = []
+        self.threads = set()
+        self._lock = threading.Lock()
+
+    def predict(self, fen_string):
+        with self._lock:
+            self.threads.add(threading.current_thread().name)
+        return "e2e4"
+
+    def suggest(self, fen_string, move, test):
+        assert test is True
+        if fen_string == "bad":
+            return "Error: I do not know the answer!"
+        if fen_string == "bad-move":
+            return ("Error: Enter a valid UCI position", move, [])
+        self.suggested.append((fen_string, move))
+        return (f"My prediction of the next move is {move}. ", move, [("fork", []), ("pin", [])])
+
+
+def test_read_positions_from_csv_and_jsonl():
+    csv_rows = list(read_positions(io.StringIO("PuzzleId,FEN,Moves,Themes\np1,fen-1,e2e4 e7e5,fork short\n"), "csv"))
+    jsonl_rows = list(read_positions(["{\"fen\": \"fen-2\"}\n", "\n", "{\"fen\": \"fen-3\", \"moves\": [\"d2d4\"]}\n"], "jsonl"))
+
+    assert csv_rows == [{"key": "p1", "fen": "fen-1", "best_move": "e2e4", "themes": ["fork", "short"], "error": None}]
+    assert jsonl_rows == [
+        {"key": "0", "fen": "fen-2", "best_move": None, "themes": [], "error": None},
+        {"key": "1", "fen": "fen-3", "best_move": "d2d4", "themes": [], "error": None},
+    ]
+
+
+def test_malformed_jsonl_lines_are_reported_with_their_number():
+    for line, message in (("{\"fen\": ", "line 2 is not valid JSON"), ("[1, 2]", "line 2 is not a JSON object")):
+        with pytest.raises(ValueError, match=message):
+            list(read_positions(["{\"fen\": \"fen-1\"}\n", line + "\n"], "jsonl"))
+
+
+def test_lichess_rows_apply_the_opponent_move(monkeypatch):
+    class Board:
+        def __init__(self, fen):
+            self.moves = [fen]
+
+        def push_uci(self, move):
+            if move == "z9z9":
+                raise ValueError(f"invalid uci: {move!r}")
+            self.moves.append(move)
+
+        def fen(self):
+            return "+".join(self.moves)
+
+    monkeypatch.setattr(batch.chess, "Board", Board, raising=False)
+    rows = list(read_positions(io.StringIO("PuzzleId,FEN,Moves,Themes\np1,fen-1,e7e5 g1f3,fork\np2,fen-2,z9z9 g1f3,fork\n"), "csv", lichess=True))
+
+    assert rows[0]["fen"] == "fen-1+e7e5"
+    assert rows[0]["best_move"] == "g1f3"
+    assert rows[0]["error"] is None
+
+    # a row whose first move cannot be applied fails alone
+    results = {result["key"]: result for result in analyse_batch(FakeNeuroSymbolic(), rows, workers=1)}
+    assert results["p1"]["error"] is None
+    assert results["p2"]["error"].startswith("cannot apply the first move z9z9")
+
+
+def test_batch_explains_given_moves_and_skips_completed_keys():
+    ns = FakeNeuroSymbolic()
+    records = [
+        {"key": "a", "fen": "fen-a", "best_move": "g1f3", "themes": []},
+        {"key": "b", "fen": "fen-b", "best_move": None, "themes": []},
+        {"key": "c", "fen": "bad", "best_move": "a2a3", "themes": []},
+        {"key": "e", "fen": "bad-move", "best_move": "a2a9", "themes": []},
+        {"key": "d", "fen": None, "best_move": None, "themes": []},
+        {"key": "done", "fen": "fen-done", "best_move": "h2h3", "themes": []},
+    ]
+
+    results = {result["key"]: result for result in analyse_batch(ns, records, workers=3, skip={"done"})}
+
+    assert set(results) == {"a", "b", "c", "d", "e"}
+    assert results["a"]["tactics"] == ["fork", "pin"] and results["a"]["predicted_move"] == "e2e4"
+    assert ("fen-b", "e2e4") in ns.suggested
+    assert results["c"]["error"] == "Error: I do not know the answer!"
+    assert results["d"]["error"] == "missing FEN"
+    assert results["e"]["error"] == "Error: Enter a valid UCI position"
+    assert results["e"]["statement"] is None
+    assert all(name.startswith("batch") for name in ns.threads)
+
+
+def test_run_batch_resumes_from_the_output_file(tmp_path):
+    source = tmp_path / "puzzles.jsonl"
+    source.write_text("".join(json.dumps({"id": f"p{index}", "fen": f"fen-{index}", "moves": "e2e4"}) + "\n" for index in range(5)))
+    output = tmp_path / "results.jsonl"
+    output.write_text(json.dumps({"key": "p0"}) + "\n" + json.dumps({"key": "p1"}) + "\n{\"key\": \"p2")
+
+    ns = FakeNeuroSymbolic()
+    stats = run_batch(ns, str(source), str(output), workers=2, flush_every=2, predict=False)
+
+    assert stats["analysed"] == 3 and stats["skipped"] == 2
+    assert sorted(fen for fen, _ in ns.suggested) == ["fen-2", "fen-3", "fen-4"]
+    assert completed_keys(str(output)) == {"p0", "p1", "p2", "p3", "p4"}
+
+
+def test_csv_results_round_trip(tmp_path):
+    output = tmp_path / "results.csv"
+    with ResultWriter(str(output), flush_every=1) as writer:
+        writer.write({field: None for field in batch.RESULT_FIELDS} | {"key": "p1", "tactics": ["fork"]})
+    with ResultWriter(str(output)) as writer:
+        writer.write({field: None for field in batch.RESULT_FIELDS} | {"key": "p2", "tactics": []})
+
+    assert completed_keys(str(output)) == {"p1", "p2"}
+    assert output.read_text().count("key,fen") == 1
+
+
+def test_analyze_batch_route_streams_ndjson(monkeypatch):
+    from server import server as server_module
+
+    ns = FakeNeuroSymbolic()
+    monkeypatch.setattr(server_module, "ns", ns)
+    monkeypatch.setattr(server_module.request, "files", {}, raising=False)
+    monkeypatch.setattr(server_module.request, "args", {"predict": "0"}, raising=False)
+    monkeypatch.setattr(server_module.request, "content_type", "text/csv", raising=False)
+    monkeypatch.setattr(
+        server_module.request,
+        "get_data",
+        lambda as_text=False: "id,fen,moves\np1,fen-1,e2e4\np2,fen-2,d2d4\n",
+        raising=False,
+    )
+
+    response = server_module.analyze_batch()
+    lines = [json.loads(line) for line in response.response]
+
+    assert response.kwargs["mimetype"] == "application/x-ndjson"
+    assert sorted(line["key"] for line in lines) == ["p1", "p2"]
+    assert all(line["predicted_move"] is None for line in lines)
+
+
+def test_analyze_batch_route_rejects_bad_input(monkeypatch):
+    from server import server as server_module
+
+    monkeypatch.setattr(server_module, "ns", FakeNeuroSymbolic())
+    monkeypatch.setattr(server_module.request, "files", {}, raising=False)
+    monkeypatch.setattr(server_module.request, "content_type", "application/x-ndjson", raising=False)
+
+    monkeypatch.setattr(server_module.request, "args", {}, raising=False)
+    monkeypatch.setattr(server_module.request, "get_data", lambda as_text=False: "{\"fen\": \"fen-1\"}\nnot json\n", raising=False)
+    response, status = server_module.analyze_batch()
+    assert status == 400
+    assert "line 2" in response["args"][0]["error"]
+
+    monkeypatch.setattr(server_module.request, "args", {"workers": "many"}, raising=False)
+    monkeypatch.setattr(server_module.request, "get_data", lambda as_text=False: "{\"fen\": \"fen-1\"}\n", raising=False)
+    assert server_module.analyze_batch()[1] == 400
+
+
+class ScriptedQuery(list):
+    def close(self):
+        pass
+
+
+class ScriptedProlog:
+    '''
+    Prolog engine stand-in: the white knight on f3 forks the black queen and rook by moving to g5.
+    '''
+
+    answers = {
+        "return_pieces(Piece, white, f3)": [{"Piece": "knight"}],
+        "is_legal(Piece, white, f3, g5)": [{"Piece": "knight"}],
+        "move_cause_fork(white, Piece, UCIPosition, ListOfMoves)": [{"Piece": "knight", "UCIPosition": "f3", "ListOfMoves": ["g5"]}],
+        "fork_reason(knight, white, f3, g5, ListOfOpponents)": [{"ListOfOpponents": ["(queen, ,(black, d8))", "(rook, ,(black, h7))"]}],
+    }
+
+    def __init__(self):
+        self.queries = []
+
+    def consult(self, filepath):
+        pass
+
+    def query(self, text):
+        self.queries.append(text)
+        return ScriptedQuery(self.answers.get(text, []))
+
+
+class LiveGraph:
+    '''
+    Knowledge graph served to the chat, the batch must not touch it.
+    '''
+
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append(name)
+
+
+def test_batch_runs_the_real_suggest_path_without_touching_the_live_graph():
+    from server.neurosymbolicAI.neurosymbolic_ai import NeuroSymbolic
+
+    ns = NeuroSymbolic()
+    ns.symbolic.prolog = ScriptedProlog()
+    ns.symbolic.graph = LiveGraph()
+    record = {"key": "p1", "fen": "4k3/8/8/8/8/5N2/8/4K3 w - - 0 1", "best_move": "f3g5", "themes": ["fork"]}
+
+    result = batch.analyse_record(ns, record, predict=False)
+
+    assert result["error"] is None
+    assert result["tactics"] == ["fork"]
+    assert "White knight at f3 moves to g5 to attack black queen at d8 and black rook at h7." in result["statement"]
+    assert ns.symbolic.graph.calls == []
+    assert 'parse_fen("4k3/8/8/8/8/5N2/8/4K3 w - - 0 1")' in ns.symbolic.prolog.queries
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from server.cache import LRUCache  # noqa: E402
+from server.neurosymbolicAI import verifier_ai  # noqa: E402
+from server.neurosymbolicAI.symbolicAI.symbolic_ai import InferenceGraph, Symbolic  # noqa: E402
+
+
+class FakeQuery(list):
+    def close(self):
+        pass
+
+
+class FakeProlog:
+    def __init__(self, results):
+        self.results = results
+        self.queries = []
+
+    def query(self, text):
+        self.queries.append(text)
+        return FakeQuery([{"Results": self.results}])
+
+
+def test_positions_are_checked_in_one_query_with_sanitised_atoms():
+    symbolic = Symbolic()
+    symbolic.prolog = FakeProlog([["white", "g1"], "false"])
+
+    result = symbolic.verify_positions([
+        ("king", "white", "g1"),
+        ("queen", "N/A", "h4"),
+        ("rook", "white), halt, (x", "a1"),
+    ])
+
+    assert symbolic.prolog.queries == ["verify_positions([position(king, white, g1), position(queen, _, h4)], Results)"]
+    assert result == [{"Color": "white", "Position": "g1"}, None, None]
+
+
+def test_relations_fill_unknown_fields_from_the_solution():
+    symbolic = Symbolic()
+    symbolic.prolog = FakeProlog([["white", "a1", "pawn", "white", "a2"]])
+
+    result = symbolic.verify_relations([("rook", "N/A", "a1", "N/A", "white", "a2", "defend")])
+
+    assert symbolic.prolog.queries == ["verify_relations([relation(rook, _, a1, _, white, a2, defend)], Results)"]
+    assert result == [{"Color1": "white", "Position1": "a1", "Piece2": "pawn", "Color2": "white", "Position2": "a2"}]
+
+
+def test_verify_queries_rebind_their_position_under_the_lock():
+    prolog = FakeProlog([["white", "g1"]])
+    first, second = Symbolic(), Symbolic()
+    first.prolog = second.prolog = prolog
+
+    first.parse_fen("fen-1")
+    # another instance rebinds the shared engine before the first one queries
+    second.parse_fen("fen-2")
+    first.verify_positions([("king", "white", "g1")])
+    first.verify_position("king", "white", "g1")
+
+    assert prolog.queries == [
+        'parse_fen("fen-1")',
+        'parse_fen("fen-2")',
+        'parse_fen("fen-1")',
+        "verify_positions([position(king, white, g1)], Results)",
+        'parse_fen("fen-1")',
+        "verify_position(king, white, g1)",
+    ]
+
+
+def test_failed_batch_query_returns_none():
+    symbolic = Symbolic()
+
+    assert symbolic.verify_positions([("king", "white", "g1")]) is None
+
+
+class RecordingSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def execute_read(self, tx_function, *args):
+        if tx_function is InferenceGraph.fetch_graph_version:
+            return "v0"
+        self.driver.reads.append((tx_function.__name__, args))
+        return [1]
+
+
+class RecordingDriver:
+    def __init__(self):
+        self.reads = []
+
+    def session(self):
+        return RecordingSession(self)
+
+
+def test_move_features_are_checked_with_one_unwind_read(monkeypatch):
+    monkeypatch.setattr(InferenceGraph, "read_cache", LRUCache(maxsize=16))
+    graph = InferenceGraph("bolt://stub", "user", "pass")
+    graph.driver = RecordingDriver()
+    claims = [
+        ("knight", "white", "g1", "pawn", "black", "e5", "f3", "move_threat"),
+        ("bishop", "white", "c4", "pawn", "black", "f7", "f7", "move_threat"),
+    ]
+
+    assert graph.verify_move_features(claims) == [False, True]
+    assert graph.verify_move_features(claims) == [False, True]
+    assert graph.verify_move_features([]) == []
+    assert graph.driver.reads == [("verify_move_features_relation", (tuple(claims),))]
+
+
+class FakeMessage:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeLLM:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def invoke(self, prompt):
+        return FakeMessage(json.dumps(self.payload))
+
+
+class FakePrompt:
+    def format(self, **kwargs):
+        return kwargs["input"]
+
+
+class JsonParser:
+    def parse(self, text):
+        return json.loads(text)
+
+
+class BatchGraph:
+    def __init__(self):
+        self.batches = []
+
+    def verify_move_features(self, claims):
+        self.batches.append(claims)
+        return [True for _ in claims]
+
+    def verify_move_feature(self, *args):
+        raise AssertionError("move features must be checked in batch")
+
+
+@pytest.fixture
+def verifier():
+    instance = verifier_ai.Verifier()
+    instance.claims_prompt = FakePrompt()
+    instance.claims_parser = JsonParser()
+    instance.rule_extraction = False
+    instance.sym.graph = BatchGraph()
+
+    def single(*args):
+        raise AssertionError("claims must be checked in batch")
+
+    instance.sym.verify_position = single
+    instance.sym.verify_relation = single
+    return instance
+
+
+def test_verify_commentary_checks_every_kind_in_batch(verifier):
+    verifier.sym.verify_positions = lambda claims: [{"Color": "white", "Position": "g1"}, None]
+    verifier.sym.verify_relations = lambda claims: [{"Color1": "white", "Position1": "a1", "Piece2": "pawn", "Color2": "white", "Position2": "a2"}]
+    verifier.llm = FakeLLM({
+        "positions": [
+            {"statement": "The white king is on g1", "piece": "king", "color": "white", "position": "g1"},
+            {"statement": "The black queen is on h4", "piece": "queen", "color": "black", "position": "h4"},
+        ],
+        "relations": [
+            {
+                "statement": "The white rook at a1 defends the white pawn at a2",
+                "piece": "rook", "color": "white", "position": "a1", "relation": "defend",
+                "ally_piece": "pawn", "ally_color": "white", "ally_position": "a2",
+            },
+        ],
+        "move_features": [
+            {
+                "statement": "The white knight move from g1 to f3 threatens the black pawn at e5",
+                "piece": "knight", "color": "white", "position": "g1", "move": "f3", "feature": "move_threat",
+                "opponent_piece": "pawn", "opponent_color": "black", "opponent_position": "e5",
+            },
+        ],
+    })
+
+    result = verifier.verify_commentary("commentary")
+
+    assert [item["condition"] for item in result] == [True, False, True, True]
+    assert verifier.sym.graph.batches == [[("knight", "white", "g1", "pawn", "black", "e5", "f3", "move_threat")]]
@@ -20,6 +20,9 @@ def builder_module(monkeypatch):
         def build_feature(self, piece, color, from_position, to_position, feature_name):
             self.build_feature_calls.append((piece, color, from_position, to_position, feature_name))
 
+        def build_features(self, moves, feature_name):
+            self.build_feature_calls.append((list(moves), feature_name))
+
     class DummySymbolic:
         def __init__(self):
             self.graph = DummyGraph()
@@ -98,10 +101,10 @@ def test_build_relations_uses_json_parser_and_populates_graph(builder_module):
 
     built = []
 
-    def record_build_feature(piece, color, from_pos, to_pos, feature_name):
-        built.append((piece, color, from_pos, to_pos, feature_name))
+    def record_build_features(moves, feature_name):
+        built.extend((*move, feature_name) for move in moves)
 
-    builder.sym.graph.build_feature = record_build_feature
+    builder.sym.graph.build_features = record_build_features
     builder.extract_relations = lambda description: {"output": "unused"}
 
     try:
@@ -109,5 +112,47 @@ def test_build_relations_uses_json_parser_and_populates_graph(builder_module):
     except AssertionError as exc:
         pytest.fail(str(exc))
 
-    assert built, "Builder must materialize parsed moves via graph.build_feature"
+    assert built, "Builder must materialize parsed moves via graph.build_features"
     assert parser_calls, "Builder must parse the agent output with JsonOutputParser.parse"
+
+
+def test_build_relations_intersects_relations_and_writes_once(builder_module):
+    builder = builder_module.Builder()
+
+    def move(piece, origin, target):
+        return {"piece": piece, "color": "white", "from": origin, "to": target}
+
+    builder.sym.graph.relation_moves = {
+        "move_threat": [move("knight", "g5", "e4"), move("queen", "d1", "h5"), move("knight", "g5", "e4"), move("rook", "a1", "a8")],
+        "move_defend": [move("rook", "a1", "a8"), move("knight", "g5", "e4"), move("bishop", "c1", "g5")],
+    }
+    builder.parser.parse = lambda text: {
+        "name": "threat_defend",
+        "relationships": {"relation_1": "move_threat", "relation_2": "move_defend"},
+    }
+    builder.extract_relations = lambda description: {"output": "unused"}
+
+    builder.build_relations("Moves that both threaten and defend")
+
+    assert builder.sym.graph.build_feature_calls == [
+        ([("knight", "white", "g5", "e4"), ("rook", "white", "a1", "a8")], "threat_defend")
+    ]
+
+
+def test_build_relations_stops_once_the_intersection_is_empty(builder_module):
+    builder = builder_module.Builder()
+
+    builder.sym.graph.relation_moves = {
+        "move_threat": [{"piece": "knight", "color": "white", "from": "g5", "to": "e4"}],
+        "move_defend": [],
+    }
+    builder.parser.parse = lambda text: {
+        "name": "nothing",
+        "relationships": {"relation_1": "move_threat", "relation_2": "move_defend", "relation_3": "protected_move"},
+    }
+    builder.extract_relations = lambda description: {"output": "unused"}
+
+    builder.build_relations("Impossible combination")
+
+    assert builder.sym.graph.find_calls == ["move_threat", "move_defend"]
+    assert builder.sym.graph.build_feature_calls == [([], "nothing")]
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import importlib
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from server.neurosymbolicAI.llmAI import llm_ai  # noqa: E402
+
+
+@pytest.fixture
+def fake_torch(monkeypatch):
+    calls = types.SimpleNamespace(quantized=[], threads=[])
+
+    def quantize_dynamic(model, layers, dtype, inplace):
+        calls.quantized.append((layers, dtype, inplace))
+        return model
+
+    monkeypatch.setattr(llm_ai.torch, "ao", types.SimpleNamespace(quantization=types.SimpleNamespace(quantize_dynamic=quantize_dynamic)), raising=False)
+    monkeypatch.setattr(llm_ai.torch, "nn", types.SimpleNamespace(Linear="Linear"), raising=False)
+    monkeypatch.setattr(llm_ai.torch, "qint8", "qint8", raising=False)
+    monkeypatch.setattr(llm_ai.torch, "set_num_threads", calls.threads.append, raising=False)
+    monkeypatch.setattr(llm_ai, "BATCH_SIZE", 1)
+    return calls
+
+
+def test_cpu_models_are_quantised_and_use_the_configured_threads(fake_torch):
+    model = llm_ai.ChessGPT(int8=True, threads=4)
+
+    assert model.quantized and model.backend == "torch"
+    assert fake_torch.quantized == [({"Linear"}, "qint8", True)]
+    assert fake_torch.threads == [4]
+
+
+def test_quantisation_can_be_turned_off(fake_torch):
+    model = llm_ai.ChessGPT(int8=False, threads=0)
+
+    assert not model.quantized
+    assert fake_torch.quantized == [] and fake_torch.threads == []
+
+
+def test_quantisation_is_opt_in(fake_torch, monkeypatch):
+    monkeypatch.delenv("CAISSA_LLM_INT8", raising=False)
+    importlib.reload(llm_ai)
+    monkeypatch.setattr(llm_ai, "BATCH_SIZE", 1)
+
+    assert not llm_ai.ChessGPT(threads=0).quantized
+
+    monkeypatch.setenv("CAISSA_LLM_INT8", "1")
+    importlib.reload(llm_ai)
+    monkeypatch.setattr(llm_ai, "BATCH_SIZE", 1)
+
+    assert llm_ai.ChessGPT(threads=0).quantized
+
+    monkeypatch.delenv("CAISSA_LLM_INT8")
+    importlib.reload(llm_ai)
+
+
+def test_gpu_models_are_left_alone(fake_torch, monkeypatch):
+    monkeypatch.setattr(llm_ai.torch.cuda, "is_available", lambda: True)
+
+    model = llm_ai.ChessGPT(int8=True, threads=4)
+
+    assert not model.quantized
+    assert fake_torch.threads == []
+
+
+def test_onnx_backend_falls_back_to_torch_without_optimum(fake_torch, monkeypatch):
+    monkeypatch.setitem(sys.modules, "optimum.onnxruntime", None)
+
+    model = llm_ai.ChessGPT(int8=True, backend="onnx")
+
+    assert model.backend == "torch" and model.quantized
+
+
+def test_onnx_backend_exports_once(fake_torch, monkeypatch, tmp_path):
+    loaded = []
+
+    class ORTModelForCausalLM:
+        @classmethod
+        def from_pretrained(cls, model_id, export=False):
+            loaded.append((model_id, export))
+            return cls()
+
+        def save_pretrained(self, path):
+            Path(path).mkdir()
+
+    onnxruntime = types.ModuleType("optimum.onnxruntime")
+    onnxruntime.ORTModelForCausalLM = ORTModelForCausalLM
+    monkeypatch.setitem(sys.modules, "optimum", types.ModuleType("optimum"))
+    monkeypatch.setitem(sys.modules, "optimum.onnxruntime", onnxruntime)
+    monkeypatch.setattr(llm_ai, "ONNX_DIR", str(tmp_path / "onnx"))
+
+    first = llm_ai.ChessGPT(backend="onnx")
+    llm_ai.ChessGPT(backend="onnx")
+
+    assert first.backend == "onnx" and not first.quantized
+    assert loaded == [(llm_ai.MODEL_ID, True), (str(tmp_path / "onnx"), False)]
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import sys
+import threading
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from server.neurosymbolicAI import neurosymbolic_ai  # noqa: E402
+from server.neurosymbolicAI.llmAI import llm_ai  # noqa: E402
+
+
+def test_the_model_is_loaded_once_per_process(monkeypatch):
+    built = []
+
+    class CountingChessGPT:
+        def __init__(self):
+            built.append(self)
+
+    monkeypatch.setattr(llm_ai, "ChessGPT", CountingChessGPT)
+    monkeypatch.setattr(llm_ai, "_shared", None)
+
+    models = []
+    threads = [threading.Thread(target=lambda: models.append(llm_ai.get_chessgpt())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(built) == 1
+    assert all(model is built[0] for model in models)
+
+
+def test_neurosymbolic_loads_chessgpt_on_first_use(monkeypatch):
+    loads = []
+    monkeypatch.delenv("CAISSA_SKIP_LLM", raising=False)
+    monkeypatch.setattr(neurosymbolic_ai, "get_chessgpt", lambda: loads.append(1) or "shared-model")
+
+    first = neurosymbolic_ai.NeuroSymbolic()
+    second = neurosymbolic_ai.NeuroSymbolic()
+    assert loads == []
+
+    assert first.gpt == "shared-model" and second.gpt == "shared-model"
+    assert first.gpt == "shared-model"
+    assert len(loads) == 2
+
+
+def test_skip_llm_never_loads_the_model(monkeypatch):
+    monkeypatch.setenv("CAISSA_SKIP_LLM", "1")
+    monkeypatch.setattr(neurosymbolic_ai, "get_chessgpt", lambda: (_ for _ in ()).throw(AssertionError("loaded")))
+
+    ns = neurosymbolic_ai.NeuroSymbolic()
+
+    assert ns.gpt is None
+    assert ns.predict("8/8/8/8/8/8/8/8 w - - 0 1") == ""
+
+
+def test_local_weights_load_as_safetensors(monkeypatch, tmp_path):
+    loaded = []
+    original = llm_ai.AutoModelForCausalLM.from_pretrained
+
+    def from_pretrained(source, **kwargs):
+        loaded.append((source, kwargs.get("use_safetensors")))
+        return original(source, **kwargs)
+
+    monkeypatch.setattr(llm_ai.AutoModelForCausalLM, "from_pretrained", from_pretrained)
+    monkeypatch.setattr(llm_ai, "BATCH_SIZE", 1)
+    monkeypatch.setattr(llm_ai, "CPU_INT8", False)
+
+    monkeypatch.setattr(llm_ai, "WEIGHTS_DIR", str(tmp_path))
+    llm_ai.ChessGPT()
+    monkeypatch.setattr(llm_ai, "WEIGHTS_DIR", str(tmp_path / "missing"))
+    llm_ai.ChessGPT()
+
+    assert loaded == [(str(tmp_path), True), (llm_ai.MODEL_ID, None)]
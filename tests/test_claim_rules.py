@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from server import metrics  # noqa: E402
+from server.neurosymbolicAI import claim_rules, verifier_ai  # noqa: E402
+
+SUGGEST_FORK = (
+    "My prediction of the next move is e5f7. I am using the fork tactic. "
+    "A fork is a tactic in which a piece attack multiple enemy pieces simultaneously. "
+    "White knight at e5 moves to f7 to attack black queen at d8 and black rook at h8. "
+)
+
+SUGGEST_PIN = (
+    "I am using pin tactic. "
+    "White bishop moves from f1 to b5 causes black knight at c6 to be pinned for black king at e8. "
+)
+
+MOVE_DESCRIPTION = (
+    "The move of white knight from g1 to f3. "
+    "The ally pieces that defend the move are white pawn at g2 and white pawn at e2."
+    "The opponent pieces that are attacked by the move are black pawn at e5."
+)
+
+
+def _statements(claims, kind):
+    return [claim["statement"] for claim in claims[kind]]
+
+
+def test_fork_template_becomes_move_threat_claims():
+    claims, unmatched = claim_rules.extract_claims(SUGGEST_FORK)
+
+    assert unmatched == []
+    assert claims["positions"] == []
+    assert claims["move_features"][0] == {
+        "statement": "The white knight move from e5 to f7 threatens the black queen at d8",
+        "piece": "knight", "color": "white", "position": "e5", "move": "f7", "feature": "move_threat",
+        "ally_piece": "N/A", "ally_color": "N/A", "ally_position": "N/A",
+        "opponent_piece": "queen", "opponent_color": "black", "opponent_position": "d8",
+    }
+    assert claims["move_features"][1]["opponent_position"] == "h8"
+
+
+def test_tactic_outcomes_are_checked_as_current_positions():
+    claims, unmatched = claim_rules.extract_claims(SUGGEST_PIN)
+
+    assert unmatched == []
+    assert _statements(claims, "positions") == [
+        "The white bishop is at f1",
+        "The black knight is at c6",
+        "The black king is at e8",
+    ]
+
+
+def test_move_description_lists_use_the_described_move():
+    claims, unmatched = claim_rules.extract_claims(MOVE_DESCRIPTION)
+
+    assert unmatched == []
+    assert _statements(claims, "positions") == ["The white knight is at g1"]
+    assert [(claim["feature"], claim["ally_position"], claim["opponent_position"]) for claim in claims["move_features"]] == [
+        ("move_is_protected", "g2", "N/A"),
+        ("move_is_protected", "e2", "N/A"),
+        ("move_threat", "N/A", "e5"),
+    ]
+
+
+def test_free_text_relations_and_unmatched_sentences():
+    claims, unmatched = claim_rules.extract_claims(
+        "The white rook at a1 defends the white pawn at a2. The black queen is on h4. The king on g1 is safe."
+    )
+
+    assert _statements(claims, "relations") == ["The white rook at a1 defends the white pawn at a2"]
+    assert _statements(claims, "positions") == ["The black queen is at h4"]
+    assert unmatched == ["The king on g1 is safe."]
+
+
+def test_sentences_without_a_square_still_reach_the_llm():
+    claims, unmatched = claim_rules.extract_claims(
+        "I am using mate tactic. "
+        "A mate is a move that would results opponent's king in check and there is no escape. "
+        "The knight defends the queen. Black is losing material. The position is quiet."
+    )
+
+    assert all(not claims[kind] for kind in claims)
+    assert unmatched == ["The knight defends the queen.", "Black is losing material."]
+
+
+def test_fallback_rate_is_published():
+    before = claim_rules.rule_stats()
+
+    claim_rules.extract_claims("The black queen is on h4. The knight defends the queen. Everything hinges on g1.")
+
+    after = metrics.snapshot()["verifier_claim_rules"]
+    assert after["sentences"] - before["sentences"] == 2
+    assert after["fallback"] - before["fallback"] == 1
+    assert 0 < after["fallback_rate"] <= 1
+
+
+class FakeMessage:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeLLM:
+    def __init__(self, payload):
+        self.payload = payload
+        self.prompts = []
+
+    def invoke(self, prompt):
+        self.prompts.append(prompt)
+        return FakeMessage(json.dumps(self.payload))
+
+
+class FakePrompt:
+    def format(self, **kwargs):
+        return kwargs["input"]
+
+
+class JsonParser:
+    def parse(self, text):
+        return json.loads(text)
+
+
+@pytest.fixture
+def verifier():
+    instance = verifier_ai.Verifier()
+    instance.claims_prompt = FakePrompt()
+    instance.claims_parser = JsonParser()
+    instance.sym.verify_position = lambda piece, color, position: [{}]
+    return instance
+
+
+def test_templated_commentary_needs_no_llm_call(verifier):
+    verifier.llm = FakeLLM({})
+
+    result = verifier.verify_commentary(SUGGEST_PIN)
+
+    assert verifier.llm.prompts == []
+    assert [item["condition"] for item in result] == [True, True, True]
+
+
+def test_only_unmatched_sentences_reach_the_llm(verifier):
+    verifier.llm = FakeLLM({
+        "positions": [{"statement": "The king on g1 is safe", "piece": "king", "color": "N/A", "position": "g1"}],
+    })
+
+    claims = verifier.extract_claims("The black queen is on h4. The king on g1 is safe.")
+
+    assert verifier.llm.prompts == ["The king on g1 is safe."]
+    assert _statements(claims, "positions") == ["The black queen is at h4", "The king on g1 is safe"]
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from server.neurosymbolicAI import verifier_ai  # noqa: E402
+from server.neurosymbolicAI.direct_agent import REACT_STOP, DirectAgent, final_answer  # noqa: E402
+
+
+class FakeMessage:
+    def __init__(self, content):
+        self.content = content
+
+
+class RecordingLLM:
+    def __init__(self, content):
+        self.content = content
+        self.calls = []
+
+    def invoke(self, prompt, stop=None):
+        self.calls.append((prompt, stop))
+        return FakeMessage(self.content)
+
+
+class FormatPrompt:
+    def format(self, **kwargs):
+        return "|".join(f"{key}={kwargs[key]}" for key in sorted(kwargs))
+
+
+def test_final_answer_is_extracted_from_react_text():
+    assert final_answer("Thought: Do I have a JSON response? Yes\nFinal Answer: {\"a\": 1}") == '{"a": 1}'
+    assert final_answer("Final Answer: ```json\n{\"a\": 1}\n```") == '{"a": 1}'
+    assert final_answer("  {\"a\": 1}  ") == '{"a": 1}'
+
+
+def test_direct_agent_makes_one_call_with_the_executor_output_shape():
+    llm = RecordingLLM("Thought: Do I have an answer? Yes\nFinal Answer: The white queen is on d8.")
+    agent = DirectAgent(llm, FormatPrompt())
+
+    result = agent.invoke({"input": "queen d8"})
+
+    assert result == {"input": "queen d8", "output": "The white queen is on d8."}
+    assert llm.calls == [("agent_scratchpad=|input=queen d8|tool_names=|tools=", REACT_STOP)]
+
+
+def test_verifier_agents_are_direct_by_default(monkeypatch):
+    assert isinstance(verifier_ai.Verifier().agent_executor, DirectAgent)
+
+    monkeypatch.setenv("CAISSA_DIRECT_AGENTS", "0")
+    verifier = verifier_ai.Verifier()
+
+    assert not isinstance(verifier.agent_executor, DirectAgent)
+    assert not isinstance(verifier.fix_agent_executor, DirectAgent)
@@ -150,3 +150,101 @@ def test_cypher_qa_raises_when_graph_missing(monkeypatch):
 
     assert "Neo4j graph connection failed" in str(excinfo.value)
     assert excinfo.value.__cause__ is graph_error
+
+
+class RecordingGraph:
+    def __init__(self):
+        self.queries = []
+        self.token = "v0"
+
+    def query(self, cypher, params=None):
+        if "GraphVersion" in cypher:
+            return [{"token": self.token}]
+        self.queries.append((cypher, params) if params is not None else cypher)
+        return [{"tactic": "fork"}]
+
+
+def _chain_with_steps(chain):
+    def invoke(question):
+        chain.invocations.append(question)
+        return {
+            "query": question,
+            "result": [{"tactic": "fork"}],
+            "intermediate_steps": [{"query": "MATCH (n) RETURN n"}, {"context": []}],
+        }
+
+    chain.invoke = invoke
+    return chain
+
+
+def test_cypher_qa_reuses_generated_cypher_and_rows(monkeypatch):
+    graph_obj = RecordingGraph()
+    cypher_module, chain_cls = _reload_cypher(monkeypatch, graph_obj=graph_obj)
+    chain = _chain_with_steps(chain_cls.instances[-1])
+
+    first = cypher_module.cypher_qa("Which squares can the white knight reach?")
+    second = cypher_module.cypher_qa("  which squares can the   white KNIGHT reach ")
+
+    assert chain.invocations == ["Which squares can the white knight reach?"]
+    assert graph_obj.queries == []
+    assert "intermediate_steps" not in first
+    assert first["result"] == second["result"] == [{"tactic": "fork"}]
+    assert cypher_module.cache_stats()["cypher"]["hits"] == 1
+
+
+def test_cypher_qa_reruns_cached_cypher_after_a_graph_write(monkeypatch):
+    graph_obj = RecordingGraph()
+    cypher_module, chain_cls = _reload_cypher(monkeypatch, graph_obj=graph_obj)
+    chain = _chain_with_steps(chain_cls.instances[-1])
+
+    cypher_module.cypher_qa("which squares can the white knight reach")
+    graph_obj.token = "v1"
+    result = cypher_module.cypher_qa("which squares can the white knight reach")
+
+    assert len(chain.invocations) == 1
+    assert graph_obj.queries == ["MATCH (n) RETURN n"]
+    assert result["result"] == [{"tactic": "fork"}]
+
+
+@pytest.mark.parametrize(
+    "question, intent, params",
+    [
+        ("What is the position of the white rook?", "piece_position", {"color": "white", "piece": "rook"}),
+        (
+            "Does the discovered attack tactic support the move of the black queen from f6 to g6?",
+            "tactic_supports_move",
+            {"tactic": "discovered attack", "color": "black", "piece": "queen", "from_position": "f6", "to_position": "g6"},
+        ),
+        ("What tactics are available for white?", "tactics_for_color", {"color": "white"}),
+        ("which moves can black play with a mate in 2", "moves_by_tactic", {"color": "black", "tactic": "mateIn2"}),
+        ("Which white pieces are under attack?", "attacked_pieces", {"color": "white"}),
+        ("What ally pieces does the white rook defend?", "pieces_defended_by", {"color": "white", "piece": "rook"}),
+    ],
+)
+def test_cypher_intents_are_recognised(monkeypatch, question, intent, params):
+    cypher_module, _ = _reload_cypher(monkeypatch, graph_obj=RecordingGraph())
+
+    name, cypher, matched = cypher_module._match_intent(cypher_module._normalize_question(question))
+
+    assert name == intent
+    assert matched == params
+    for value in params.values():
+        assert value not in cypher, "template Cypher must take values as parameters"
+
+
+def test_cypher_qa_answers_known_intents_without_the_chain(monkeypatch):
+    graph_obj = RecordingGraph()
+    cypher_module, chain_cls = _reload_cypher(monkeypatch, graph_obj=graph_obj)
+    chain = _chain_with_steps(chain_cls.instances[-1])
+
+    result = cypher_module.cypher_qa("What tactics are available for black?")
+    cypher_module.cypher_qa("Is the white king safe?")
+
+    assert result["result"] == [{"tactic": "fork"}]
+    assert graph_obj.queries == [(cypher_module._INTENT_CYPHER["tactics_for_color"], {"color": "black"})]
+    assert chain.invocations == ["Is the white king safe?"]
+    stats = cypher_module.routing_stats()
+    assert stats["fast_path"] == 1
+    assert stats["fallback"] == 1
+    assert stats["fast_path_ratio"] == 0.5
+    assert stats["intents"]["tactics_for_color"] == 1
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from server import metrics  # noqa: E402
+from server.cache import GRAPH_VERSION_BUMP, LRUCache  # noqa: E402
+from server.neurosymbolicAI.symbolicAI.symbolic_ai import InferenceGraph, RecordingGraph  # noqa: E402
+
+
+class Database:
+    def __init__(self):
+        self.token = 0
+
+
+class VersionTx:
+    def __init__(self, database):
+        self.database = database
+
+    def run(self, query, **params):
+        if query == GRAPH_VERSION_BUMP:
+            self.database.token += 1
+        return self
+
+    def single(self):
+        return {"token": self.database.token}
+
+
+class CountingSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def execute_read(self, tx_function, *args):
+        if tx_function is InferenceGraph.fetch_graph_version:
+            return tx_function(VersionTx(self.driver.database))
+        self.driver.reads.append((tx_function.__name__, args))
+        return [{"piece": "knight", "color": "white", "from": "g1", "to": "f3"}]
+
+    def execute_write(self, tx_function, *args):
+        self.driver.writes.append((tx_function.__name__, args))
+        # only the version bump appended to every write transaction reaches the fake tx
+        InferenceGraph.bump_graph_version(VersionTx(self.driver.database))
+
+
+class CountingDriver:
+    def __init__(self, database=None):
+        self.database = database or Database()
+        self.reads = []
+        self.writes = []
+
+    def session(self):
+        return CountingSession(self)
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    monkeypatch.setattr(InferenceGraph, "read_cache", LRUCache(maxsize=16))
+    instance = InferenceGraph("bolt://stub", "user", "pass")
+    instance.driver = CountingDriver()
+    return instance
+
+
+def test_repeated_reads_hit_the_cache(graph):
+    first = graph.find_moves("move_threat")
+    second = graph.find_moves("move_threat")
+
+    assert first == second
+    assert len(graph.driver.reads) == 1
+    stats = graph.cache_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_cached_lists_are_copied(graph):
+    graph.find_moves("move_threat").clear()
+
+    assert graph.find_moves("move_threat"), "mutating a returned list must not corrupt the cache"
+
+
+def test_any_write_invalidates_reads(graph):
+    graph.fetch_suggest("knight", "white", "g1", "f3")
+    graph.create_suggest("knight", "white", "g1", "f3", "fork")
+    graph.fetch_suggest("knight", "white", "g1", "f3")
+
+    assert len(graph.driver.reads) == 2
+    assert graph.cache_stats()["invalidations"] == 1
+
+
+def test_writes_from_another_instance_invalidate(graph):
+    other = InferenceGraph("bolt://stub", "user", "pass")
+    other.driver = CountingDriver(graph.driver.database)
+
+    graph.find_moves("move_defend")
+    other.destroy()
+    graph.find_moves("move_defend")
+
+    assert len(graph.driver.reads) == 2
+
+
+def test_writes_from_another_process_invalidate(graph):
+    # another worker process shares the database but not the read cache
+    other = InferenceGraph("bolt://stub", "user", "pass")
+    other.driver = CountingDriver(graph.driver.database)
+    other.read_cache = LRUCache(maxsize=16)
+
+    graph.find_moves("move_defend")
+    other.destroy()
+    graph.find_moves("move_defend")
+
+    assert len(graph.driver.reads) == 2
+    assert graph.cache_stats()["invalidations"] == 0
+
+
+def test_remove_property_runs_the_cypher_helper(graph):
+    graph.remove_property("king", "white", "g1", "safe")
+
+    assert graph.driver.writes == [("remove_property_node", ("king", "white", "g1", "safe"))]
+
+
+def test_cache_stats_are_exposed_through_metrics():
+    assert "graph_read_cache" in metrics.snapshot()
+
+
+def test_build_features_writes_all_moves_in_one_transaction(graph):
+    graph.build_features([("knight", "white", "g5", "e4"), ("rook", "white", "a1", "a8")], "threat_defend")
+    graph.build_features([], "threat_defend")
+
+    assert graph.driver.writes == [
+        (
+            "build_features_relation",
+            (
+                [
+                    {"piece": "knight", "color": "white", "from": "g5", "to": "e4"},
+                    {"piece": "rook", "color": "white", "from": "a1", "to": "a8"},
+                ],
+                "threat_defend",
+            ),
+        )
+    ]
+
+
+def test_recording_graph_refuses_database_reads():
+    recorder = RecordingGraph()
+    recorder.create_suggest("knight", "white", "g1", "f3", "fork")
+
+    assert recorder.fetch_suggest("knight", "white", "g1", "f3") == ["fork"]
+    with pytest.raises(NotImplementedError, match="find_move_feature_relation"):
+        recorder.find_moves("move_threat")
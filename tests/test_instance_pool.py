@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import importlib
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from server.pool import InstancePool  # noqa: E402
+
+
+class CountingVerifier:
+    instances = 0
+
+    def __init__(self):
+        CountingVerifier.instances += 1
+        self.fens = []
+
+    def parse_fen(self, fen_string):
+        self.fens.append(fen_string)
+
+    def verify_piece_position(self, response):
+        return [{"statement": response, "condition": True}]
+
+
+@pytest.fixture(autouse=True)
+def _reset_counter():
+    CountingVerifier.instances = 0
+
+
+def test_instances_are_reused_and_rebound_on_every_acquire():
+    pool = InstancePool(CountingVerifier, maxsize=1)
+
+    with pool.acquire("fen-1") as first:
+        pass
+    with pool.acquire("fen-1") as second:
+        pass
+
+    assert first is second
+    assert CountingVerifier.instances == 1
+    # Prolog state is process-global, so the position is parsed again each time
+    assert first.fens == ["fen-1", "fen-1"]
+    assert pool.stats() == {"idle": 1, "maxsize": 1, "created": 1, "reused": 1}
+
+
+def test_busy_pool_creates_extra_instances_and_keeps_maxsize_idle():
+    pool = InstancePool(CountingVerifier, maxsize=1)
+
+    with pool.acquire() as outer:
+        with pool.acquire() as inner:
+            assert inner is not outer
+
+    assert CountingVerifier.instances == 2
+    assert pool.stats()["idle"] == 1
+    assert outer.fens == []
+
+
+def test_instances_return_to_the_pool_after_errors():
+    pool = InstancePool(CountingVerifier, maxsize=1)
+
+    with pytest.raises(RuntimeError):
+        with pool.acquire("fen") as verifier:
+            raise RuntimeError("llm failure")
+
+    with pool.acquire("fen") as again:
+        assert again is verifier
+
+
+def test_pipeline_verifiers_are_constructed_once(monkeypatch):
+    pipeline = importlib.reload(importlib.import_module("server.pipeline"))
+    monkeypatch.setattr(pipeline, "Verifier", CountingVerifier)
+
+    state = {"fen": "fen", "commentary_agent_outcome": "The white king is on g1."}
+    pipeline.verify_piece_position(state)
+    result = pipeline.verify_piece_position(state)
+
+    assert result == [{"statement": "The white king is on g1.", "condition": True}]
+    assert CountingVerifier.instances == 1
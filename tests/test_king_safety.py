@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from server.neurosymbolicAI.symbolicAI.symbolic_ai import Symbolic  # noqa: E402
+
+
+class FakeQuery(list):
+    def __init__(self, solutions):
+        super().__init__(solutions)
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeProlog:
+    def __init__(self, solutions):
+        self.solutions = solutions
+        self.queries = []
+
+    def query(self, text):
+        query = FakeQuery(self.solutions)
+        self.queries.append((text, query))
+        return query
+
+
+class RecordingGraph:
+    def __init__(self):
+        self.king_safety_calls = []
+
+    def set_king_safety(self, kings):
+        self.king_safety_calls.append(list(kings))
+
+
+def _solution(color, king, checks, supports, controlled):
+    return {
+        "Color": color,
+        "KingUCIPosition": king,
+        "CheckSquareList": ["s"] * checks,
+        "SupportSquareList": ["s"] * supports,
+        "ControlledSquareList": ["s"] * controlled,
+    }
+
+
+@pytest.fixture
+def symbolic():
+    instance = Symbolic()
+    instance.graph = RecordingGraph()
+    return instance
+
+
+def test_both_kings_are_evaluated_in_one_query_and_one_write(symbolic):
+    symbolic.prolog = FakeProlog([
+        _solution("white", "g1", checks=1, supports=2, controlled=2),
+        _solution("black", "e8", checks=4, supports=1, controlled=2),
+    ])
+
+    result = symbolic.evaluate_king_safety()
+
+    assert len(symbolic.prolog.queries) == 1
+    text, query = symbolic.prolog.queries[0]
+    assert "[white, black]" in text
+    assert query.closed
+    assert result == {"white": ("g1", "safe"), "black": ("e8", "unsafe")}
+    assert symbolic.graph.king_safety_calls == [[("white", "g1", "safe"), ("black", "e8", "unsafe")]]
+
+
+def test_single_color_and_duplicate_solutions(symbolic):
+    symbolic.prolog = FakeProlog([
+        _solution("black", "e8", checks=0, supports=0, controlled=1),
+        _solution("black", "e8", checks=0, supports=3, controlled=3),
+    ])
+
+    result = symbolic.evaluate_king_safety("black")
+
+    assert "[black]" in symbolic.prolog.queries[0][0]
+    # a king with a single flight square is unsafe, only the first solution counts
+    assert result == {"black": ("e8", "unsafe")}
+    assert symbolic.graph.king_safety_calls == [[("black", "e8", "unsafe")]]
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from server.neurosymbolicAI.llmAI import llm_ai  # noqa: E402
+from server.neurosymbolicAI.llmAI.batching import MicroBatcher  # noqa: E402
+
+
+def submit_all(batcher, prompts, settings=()):
+    results = {}
+
+    def run(prompt, item_settings):
+        try:
+            results[prompt] = batcher.submit(prompt, item_settings)
+        except Exception as exc:
+            results[prompt] = exc
+
+    threads = [threading.Thread(target=run, args=(prompt, settings[index] if settings else ())) for index, prompt in enumerate(prompts)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+def test_concurrent_prompts_share_a_batch():
+    batches = []
+    batcher = MicroBatcher(lambda prompts, settings: batches.append(prompts) or [p.upper() for p in prompts], max_batch_size=4, max_wait=2)
+
+    results = submit_all(batcher, ["a", "b", "c", "d"])
+
+    assert results == {"a": "A", "b": "B", "c": "C", "d": "D"}
+    assert [sorted(batch) for batch in batches] == [["a", "b", "c", "d"]]
+    assert batcher.stats()["mean_batch_size"] == 4
+
+
+def test_prompts_with_other_settings_get_their_own_batch():
+    batches = []
+    batcher = MicroBatcher(lambda prompts, settings: batches.append((settings, sorted(prompts))) or prompts, max_batch_size=2, max_wait=0.2)
+
+    hot, cold = (("temperature", 0.7),), (("temperature", 0.1),)
+    results = submit_all(batcher, ["a", "b", "c"], settings=[hot, cold, hot])
+
+    assert results == {"a": "a", "b": "b", "c": "c"}
+    assert sorted(batches, key=str) == sorted([({"temperature": 0.7}, ["a", "c"]), ({"temperature": 0.1}, ["b"])], key=str)
+
+
+def test_generation_errors_reach_every_caller():
+    def generate(prompts, settings):
+        raise RuntimeError("out of memory")
+
+    batcher = MicroBatcher(generate, max_batch_size=2, max_wait=1)
+    results = submit_all(batcher, ["a", "b"])
+
+    assert all(isinstance(result, RuntimeError) for result in results.values())
+
+
+class Tokens(list):
+    @property
+    def shape(self):
+        return (len(self), len(self[0]))
+
+    def __getitem__(self, index):
+        value = list.__getitem__(self, index)
+        return Tokens(value) if isinstance(index, slice) else value
+
+    def tolist(self):
+        return list(self)
+
+
+class FakeTokenizer:
+    eos_token_id = 0
+    padding_side = "right"
+
+    def __call__(self, prompts, return_tensors=None, padding=False):
+        assert padding and self.padding_side == "left"
+        width = max(len(prompt) for prompt in prompts)
+        ids = Tokens(Tokens([0] * (width - len(prompt)) + [ord(char) for char in prompt]) for prompt in prompts)
+        self.calls = getattr(self, "calls", 0) + 1
+        return type("Inputs", (dict,), {"input_ids": ids, "to": lambda inputs, device: inputs})(input_ids=ids)
+
+    def decode(self, tokens):
+        return "".join("<eos>" if token == 0 else chr(token) for token in tokens)
+
+
+class FakeModel:
+    device = "cpu"
+
+    def generate(self, input_ids, **kwargs):
+        # the first prompt stops after one token, the second one runs on
+        completions = [[ord("x"), 0, 0], [ord("y"), ord("z"), 0]]
+        return type("Output", (), {"sequences": [Tokens(row + completions[index]) for index, row in enumerate(input_ids)]})()
+
+
+@pytest.fixture
+def chessgpt(monkeypatch):
+    monkeypatch.setattr(llm_ai, "BATCH_SIZE", 4)
+    monkeypatch.setattr(llm_ai, "BATCH_WAIT_MS", 2000)
+    monkeypatch.setattr(llm_ai, "CPU_INT8", False)
+    model = llm_ai.ChessGPT()
+    model.tokenizer = FakeTokenizer()
+    model.tokenizer.padding_side = "left"
+    model.model = FakeModel()
+    return model
+
+
+def test_generate_batch_cuts_every_completion_at_its_end_of_sequence(chessgpt):
+    completions = chessgpt.generate_batch(["ab", "abcd"], {"max_new_tokens": 3})
+
+    assert completions == ["x<eos>", "yz<eos>"]
+
+
+def test_concurrent_asks_run_as_one_generate_call(chessgpt):
+    chessgpt.batcher.max_batch_size = 2
+    results = {}
+    threads = [threading.Thread(target=lambda p=p: results.setdefault(p, chessgpt.ask(p))) for p in ("ab", "abcd")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert chessgpt.tokenizer.calls == 1
+    assert sorted(results.values()) == ["x<eos>", "yz<eos>"]
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from server import llm_cache, metrics  # noqa: E402
+from server.llm_cache import SQLiteLLMCache  # noqa: E402
+
+MODEL = "model=gpt-4o-mini temperature=0"
+
+
+def test_responses_persist_across_instances(tmp_path):
+    path = str(tmp_path / "llm_cache.sqlite")
+    SQLiteLLMCache(path).update("route this question", MODEL, ["Tool: cypher"])
+
+    cache = SQLiteLLMCache(path)
+
+    assert cache.lookup("route this question", MODEL) == ["Tool: cypher"]
+    assert cache.lookup("route this question", "model=gpt-4o temperature=0") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_expired_responses_are_dropped(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(llm_cache.time, "time", lambda: clock[0])
+    cache = SQLiteLLMCache(":memory:", ttl=60)
+    cache.update("prompt", MODEL, ["answer"])
+
+    clock[0] += 59
+    assert cache.lookup("prompt", MODEL) == ["answer"]
+    clock[0] += 2
+    assert cache.lookup("prompt", MODEL) is None
+    assert cache.stats()["size"] == 0
+
+
+def test_size_cap_evicts_least_recently_used(monkeypatch):
+    clock = [0.0]
+
+    def tick():
+        clock[0] += 1
+        return clock[0]
+
+    monkeypatch.setattr(llm_cache.time, "time", tick)
+    cache = SQLiteLLMCache(":memory:", maxsize=2)
+    cache.update("first", MODEL, ["1"])
+    cache.update("second", MODEL, ["2"])
+    cache.lookup("first", MODEL)
+    cache.update("third", MODEL, ["3"])
+
+    assert cache.lookup("second", MODEL) is None
+    assert cache.lookup("first", MODEL) == ["1"]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_disabled_cache(monkeypatch):
+    monkeypatch.setenv("CAISSA_LLM_CACHE", "0")
+
+    assert llm_cache.build_llm_cache() is None
+
+
+def test_llm_clients_are_built_with_the_cache():
+    from server.llama_llm import llm
+    from server.neurosymbolicAI.builder_ai import Builder
+
+    assert llm.kwargs["cache"] is llm_cache.llm_cache
+    assert Builder().llm.kwargs["cache"] is llm_cache.llm_cache
+    assert "llm_cache" in metrics.snapshot()
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import importlib
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from server import metrics  # noqa: E402
+from server.prompts import PIPELINE_MAIN_EXAMPLES  # noqa: E402
+from server.router import BUILDER, REINFORCED, IntentRouter  # noqa: E402
+
+
+@pytest.fixture
+def router():
+    return IntentRouter(PIPELINE_MAIN_EXAMPLES, threshold=0.9)
+
+
+@pytest.mark.parametrize("text, route", PIPELINE_MAIN_EXAMPLES)
+def test_router_examples_are_routed_locally(router, text, route):
+    assert router.route(text) == route
+
+
+@pytest.mark.parametrize(
+    "text, route",
+    [
+        ("A protected_threat is a move that threatens an opponent piece while being protected by an ally.", BUILDER),
+        ("Create a new relation called double_attack for moves that attack two pieces", BUILDER),
+        ("Is the black king safe?", REINFORCED),
+        ("Suggest the best move for white", REINFORCED),
+    ],
+)
+def test_unseen_inputs(router, text, route):
+    assert router.classify(text)[0] == route
+    assert router.route(text) == route
+
+
+def test_low_confidence_defers_to_the_llm(router):
+    assert router.route("white knight on f3") is None
+    assert router.stats()["deferred"] == 1
+
+
+class RecordingRunner:
+    def __init__(self, output):
+        self.output = output
+        self.inputs = []
+
+    def invoke(self, inputs):
+        self.inputs.append(inputs)
+        return {"output": self.output}
+
+
+def test_run_main_only_calls_the_router_agent_when_unsure(monkeypatch):
+    pipeline = importlib.reload(importlib.import_module("server.pipeline"))
+    runner = RecordingRunner("Reinforced Agent")
+    monkeypatch.setattr(pipeline, "main_agent_runnable", runner)
+
+    local = pipeline.run_main({"input": "What does the white knight defend?"})
+    deferred = pipeline.run_main({"input": "white knight on f3"})
+
+    assert local == {"status": REINFORCED, "pipeline_history": [("Main Agent", REINFORCED)]}
+    assert deferred["status"] == REINFORCED
+    assert runner.inputs == [{"input": "white knight on f3"}]
+    assert "main_router" in metrics.snapshot()
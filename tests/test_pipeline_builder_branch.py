@@ -28,3 +28,9 @@ def test_build_relation_records_success_history(monkeypatch, pipeline_module):
     assert result["status"] == "End"
     assert result["final_answer"]
     assert result.get("pipeline_history"), "Builder branch should append a pipeline_history entry on success"
+
+
+def test_pipeline_llm_uses_the_llm_cache(pipeline_module):
+    from server import llm_cache
+
+    assert pipeline_module.llm.kwargs["cache"] is llm_cache.llm_cache
@@ -28,6 +28,10 @@ def _install_stub_module(monkeypatch, fullname, attrs=None):
     return module
 
 
+async def _async_response(*_, **__):
+    return "response"
+
+
 def _load_pipeline_with_stubs(monkeypatch):
     sys.modules.pop("server.pipeline", None)
 
@@ -167,7 +171,7 @@ def _load_pipeline_with_stubs(monkeypatch):
     _install_stub_module(
         monkeypatch,
         "server.reinforced_agent",
-        {"generate_response": lambda *_, **__: "response"},
+        {"generate_response": lambda *_, **__: "response", "agenerate_response": _async_response},
     )
 
     _install_stub_module(
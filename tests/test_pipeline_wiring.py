@@ -31,3 +31,71 @@ def test_run_main_tracks_builder_selection(monkeypatch, pipeline_module):
 
     assert ("Main Agent", "Builder Agent") in result["pipeline_history"]
     assert result["status"] == "Builder Agent"
+
+
+def test_fanout_verifier_replaces_routing_agent(pipeline_module):
+    nodes = pipeline_module.workflow.nodes
+
+    assert nodes["verifier_agent"] is pipeline_module.verify_all
+    assert "tiny_agent" not in nodes
+
+
+def test_verify_all_runs_every_check_and_merges(monkeypatch, pipeline_module):
+    def fake_position(state):
+        return [{"statement": "The white king is on g1.", "condition": True}]
+
+    def fake_relation(state):
+        return [
+            {"statement": "The white king is on g1.", "condition": True},
+            {"statement": "The rook defends the pawn.", "condition": False},
+        ]
+
+    def broken_move(state):
+        raise RuntimeError("extraction failed")
+
+    monkeypatch.setattr(pipeline_module, "VERIFIER_SINGLE_EXTRACTION", False)
+    monkeypatch.setattr(pipeline_module, "verify_piece_position", fake_position)
+    monkeypatch.setattr(pipeline_module, "verify_piece_relation", fake_relation)
+    monkeypatch.setattr(pipeline_module, "verify_move_relation", broken_move)
+
+    result = pipeline_module.verify_all({"fen": "fen", "status": "Reinforced Agent", "commentary_agent_outcome": "text"})
+
+    assert result["verifier_agent_outcome"] == [
+        {"statement": "The white king is on g1.", "condition": True},
+        {"statement": "The rook defends the pawn.", "condition": False},
+    ]
+    assert result["pipeline_history"] == [("Tiny Agent", result["verifier_agent_outcome"])]
+
+
+def test_verify_all_reports_na_when_nothing_can_be_checked(monkeypatch, pipeline_module):
+    def boom(state):
+        raise RuntimeError("fail")
+
+    for name in ("verify_commentary", "verify_piece_position", "verify_piece_relation", "verify_move_relation"):
+        monkeypatch.setattr(pipeline_module, name, boom)
+
+    failed = pipeline_module.verify_all({"fen": "fen", "status": "Reinforced Agent", "commentary_agent_outcome": "text"})
+    skipped = pipeline_module.verify_all({"fen": "fen", "status": "N/A", "commentary_agent_outcome": "text"})
+
+    assert failed["status"] == skipped["status"] == "N/A"
+    assert failed["pipeline_history"] == [("Tiny Agent", "N/A")]
+
+
+def test_verify_all_uses_single_claim_extraction_by_default(monkeypatch, pipeline_module):
+    calls = []
+
+    def fake_commentary(state):
+        calls.append(state["commentary_agent_outcome"])
+        return [{"statement": "The white king is on g1.", "condition": True}]
+
+    def unexpected(state):
+        raise AssertionError("per-check extraction must not run in single extraction mode")
+
+    monkeypatch.setattr(pipeline_module, "verify_commentary", fake_commentary)
+    for name in ("verify_piece_position", "verify_piece_relation", "verify_move_relation"):
+        monkeypatch.setattr(pipeline_module, name, unexpected)
+
+    result = pipeline_module.verify_all({"fen": "fen", "status": "Reinforced Agent", "commentary_agent_outcome": "text"})
+
+    assert calls == ["text"]
+    assert result["verifier_agent_outcome"] == [{"statement": "The white king is on g1.", "condition": True}]
@@ -37,6 +37,7 @@ PROMPT_CASES = [
     ("server.prompts.agents", "BUILDER_AGENT_PROMPT", "server.neurosymbolicAI.builder.agent_prompt"),
     ("server.prompts.agents", "VERIFIER_JSON_PROMPT", "server.neurosymbolicAI.verifier.agent_prompt"),
     ("server.prompts.agents", "VERIFIER_FIX_PROMPT", "server.neurosymbolicAI.verifier.fix_agent_prompt"),
+    ("server.prompts.agents", "VERIFIER_CLAIMS_PROMPT", "server.neurosymbolicAI.verifier.claims_prompt"),
     ("server.prompts.selectors", "PIPELINE_MAIN_PROMPT", "server.pipeline.main_prompt"),
     ("server.prompts.selectors", "PIPELINE_VERIFIER_PROMPT", "server.pipeline.verifier_prompt"),
     (
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import importlib
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+
+@pytest.fixture
+def pipeline():
+    return importlib.reload(importlib.import_module("server.pipeline"))
+
+
+def verified_state(conditions, iterations=0, budget=None):
+    statements = [
+        {"statement": f"The white pawn is at {square}.", "condition": condition}
+        for square, condition in zip("abcdefgh", conditions)
+    ]
+    return {
+        "status": "Reflex",
+        "pipeline_history": [("Verifier Agent", statements)],
+        "reflex_iterations": iterations,
+        "budget": budget,
+    }
+
+
+def test_budget_limits(pipeline):
+    assert pipeline.ReflexBudget(max_iterations=2, time_budget=0).exhausted(1) is None
+    assert pipeline.ReflexBudget(max_iterations=2, time_budget=0).exhausted(2) == "max_iterations"
+    assert pipeline.ReflexBudget(max_iterations=0, time_budget=1e-9).exhausted(5) == "time_budget"
+
+    tokens = pipeline.ReflexBudget(max_iterations=0, time_budget=0, token_budget=100, tokens_used=lambda: 150)
+    assert tokens.exhausted(0) == "token_budget"
+
+
+def test_fully_verified_commentary_is_accepted(pipeline):
+    result = pipeline.reflex_checkpoint(verified_state([True, True]))
+
+    assert result["status"] == "End"
+    assert result["stop_reason"] == "verified"
+
+
+def test_accept_ratio_gates_partially_verified_commentary(pipeline, monkeypatch):
+    budget = pipeline.ReflexBudget(max_iterations=3, time_budget=0)
+
+    result = pipeline.reflex_checkpoint(verified_state([True, False, False], budget=budget))
+    assert result["status"] == "End"
+    assert result["stop_reason"] == "partially_verified"
+    assert result["final_answer"] == "The white pawn is at a."
+
+    monkeypatch.setattr(pipeline, "REFLEX_ACCEPT_RATIO", 0.5)
+    result = pipeline.reflex_checkpoint(verified_state([True, False, False], budget=budget))
+    assert result["status"] == "Reflex"
+    assert result["reflex_iterations"] == 1
+
+
+def test_exhausted_budget_ends_with_the_verified_statements(pipeline, monkeypatch):
+    monkeypatch.setattr(pipeline, "REFLEX_ACCEPT_RATIO", 0.5)
+    budget = pipeline.ReflexBudget(max_iterations=2, time_budget=0)
+
+    result = pipeline.reflex_checkpoint(verified_state([True, False, False], iterations=2, budget=budget))
+    assert result["status"] == "End"
+    assert result["stop_reason"] == "max_iterations"
+    assert result["final_answer"] == "The white pawn is at a."
+
+    result = pipeline.reflex_checkpoint(verified_state([False], iterations=2, budget=budget))
+    assert result["final_answer"] == "Sorry, I do not know the answer!"
+
+
+class FakeApp:
+    def __init__(self, steps):
+        self.steps = steps
+        self.inputs = None
+
+    def stream(self, inputs):
+        self.inputs = inputs
+        return iter(self.steps)
+
+
+def test_chat_reports_iterations_and_stop_reason(pipeline, monkeypatch):
+    app = FakeApp([
+        {"reflex": {"status": "Reflex", "reflex_iterations": 1}},
+        {"reflex": {"status": "Reflex", "reflex_iterations": 2}},
+        {"reflex": {"status": "End", "final_answer": "The white pawn is at e4.", "stop_reason": "max_iterations"}},
+    ])
+    monkeypatch.setattr(pipeline, "app", app)
+
+    result = pipeline.chat("Comment on the position", "8/8/8/8/4P3/8/8/8 w - - 0 1", details=True)
+
+    assert result == {"answer": "The white pawn is at e4.", "reflex_iterations": 2, "stop_reason": "max_iterations"}
+    assert app.inputs["reflex_iterations"] == 0
+    assert isinstance(app.inputs["budget"], pipeline.ReflexBudget)
+    assert pipeline.chat("Comment on the position", "8/8/8/8/4P3/8/8/8 w - - 0 1") == "The white pawn is at e4."
+
+
+# like get_openai_callback, the token counter is found through a context variable
+usage_var = contextvars.ContextVar("usage", default=None)
+
+
+@contextlib.contextmanager
+def counting_callback():
+    usage = types.SimpleNamespace(total_tokens=0)
+    token = usage_var.set(usage)
+    try:
+        yield usage
+    finally:
+        usage_var.reset(token)
+
+
+def spend(tokens):
+    usage = usage_var.get()
+    if usage is not None:
+        usage.total_tokens += tokens
+
+
+def test_tokens_spent_inside_verify_all_count_towards_the_budget(pipeline, monkeypatch):
+    from server.neurosymbolicAI import verifier_ai
+
+    verifier = verifier_ai.Verifier()
+    verifier.max_concurrency = 4
+
+    def check_statement(index, statement):
+        spend(10)
+        return [{"statement": statement, "condition": True}]
+
+    def verify_commentary(state):
+        spend(20)
+        results = verifier._map_statements(check_statement, ["a", "b", "c"])
+        return [statement for statements in results for statement in statements]
+
+    monkeypatch.setattr(pipeline, "VERIFIER_SINGLE_EXTRACTION", True)
+    monkeypatch.setattr(pipeline, "verify_commentary", verify_commentary)
+
+    with counting_callback() as usage:
+        result = pipeline.verify_all({"commentary_agent_outcome": "The white pawn is at e4.", "fen": "fen"})
+
+    assert len(result["verifier_agent_outcome"]) == 3
+    assert usage.total_tokens == 50
+    budget = pipeline.ReflexBudget(max_iterations=0, time_budget=0, token_budget=50, tokens_used=lambda: usage.total_tokens)
+    assert budget.exhausted(0) == "token_budget"
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import sys
+import types
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from server import metrics, sessions  # noqa: E402
+from server.sessions import SessionStore  # noqa: E402
+
+
+def test_sessions_are_kept_per_client():
+    store = SessionStore(maxsize=10, idle_ttl=None)
+
+    alice = store.get("alice")
+    alice.fen = "alice-fen"
+    alice.record("What is the best move?", "Nf3")
+
+    assert store.get("alice") is alice
+    assert store.get("bob").fen is None
+    assert store.get("bob").context("Hi") == "Hi"
+    assert "User: What is the best move?\nAssistant: Nf3" in alice.context("Why?")
+    assert store.stats()["created"] == 2
+
+
+def test_conversation_window_is_bounded():
+    session = SessionStore(window=2).get("alice")
+
+    for turn in range(3):
+        session.record(f"q{turn}", f"a{turn}")
+
+    assert list(session.history) == [("q1", "a1"), ("q2", "a2")]
+
+
+def test_least_recently_used_session_is_evicted():
+    store = SessionStore(maxsize=2, idle_ttl=None)
+    alice = store.get("alice")
+    store.get("bob")
+    store.get("alice")
+    store.get("carol")
+
+    assert store.get("alice") is alice
+    assert store.stats()["evicted"] == 1
+    assert store.get("bob") is not None and store.stats()["created"] == 4
+
+
+def test_idle_sessions_are_evicted(monkeypatch):
+    clock = types.SimpleNamespace(now=0.0)
+    monkeypatch.setattr(sessions.time, "monotonic", lambda: clock.now)
+    store = SessionStore(maxsize=10, idle_ttl=60)
+
+    store.get("alice")
+    clock.now = 30.0
+    store.get("bob")
+    clock.now = 70.0
+    store.get("bob")
+
+    assert store.stats()["active"] == 1
+    assert store.stats()["evicted"] == 1
+
+
+def test_evicted_sessions_spill_to_disk_and_come_back(tmp_path):
+    store = SessionStore(maxsize=1, idle_ttl=None, spill_dir=str(tmp_path))
+    alice = store.get("alice")
+    alice.fen = "alice-fen"
+    alice.record("q", "a")
+
+    store.get("bob")
+    assert len(list(tmp_path.iterdir())) == 1
+
+    restored = store.get("alice")
+    assert restored is not alice
+    assert restored.fen == "alice-fen"
+    assert list(restored.history) == [("q", "a")]
+    assert store.stats()["restored"] == 1
+
+
+def test_chatbot_route_uses_the_client_session(monkeypatch):
+    from server import server as server_module
+
+    prompts = []
+    monkeypatch.setattr(server_module, "session_store", SessionStore())
+    monkeypatch.setattr(server_module, "generate_response", lambda prompt: prompts.append(prompt) or "Nf3")
+    monkeypatch.setattr(server_module.request, "headers", {"X-Client-Id": "alice"}, raising=False)
+
+    monkeypatch.setattr(server_module.request, "json", {"prompt": "Best move?"}, raising=False)
+    server_module.post_message()
+    monkeypatch.setattr(server_module.request, "json", {"prompt": "Why?"}, raising=False)
+    server_module.post_message()
+
+    assert prompts[0] == "Best move?"
+    assert "Assistant: Nf3" in prompts[1] and prompts[1].endswith("Current question: Why?")
+    assert "sessions" in metrics.snapshot()
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import itertools
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from server import speculation  # noqa: E402
+from server.neurosymbolicAI.symbolicAI.symbolic_ai import InferenceGraph, RecordingGraph  # noqa: E402
+from server.speculation import SpeculativeAnalyser, position_key  # noqa: E402
+
+
+class FakeRecorder:
+    def __init__(self, moves):
+        self.graph = RecordingGraph()
+        self.moves = moves
+        self.fens = []
+
+    def parse_fen(self, fen_string):
+        self.fens.append(fen_string)
+
+    def threat_moves(self, player):
+        return self.moves
+
+    def construct_graph(self):
+        self.graph.destroy()
+        self.graph.create_piece("king", "white", "e1")
+
+
+def fork(symbolic, color):
+    symbolic.graph.create_suggest("knight", color, "c3", "d5", "fork")
+
+
+MOVES = [
+    ("knight", "black", "g8", "f6", [("pawn", "white", "e4")]),
+    ("pawn", "black", "e7", "e5", []),
+    ("pawn", "black", "d7", "d5", []),
+]
+
+START = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+E4 = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1"
+REPLIES = {
+    "g8f6": "rnbqkb1r/pppppppp/5n2/8/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 1 2",
+    "e7e5": "rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq e6 0 2",
+    "d7d5": "rnbqkbnr/ppp1pppp/8/3p4/4P3/8/PPPP1PPP/RNBQKBNR w KQkq d6 0 2",
+}
+PLAYED = {(START.split()[0], "e2e4"): E4, **{(E4.split()[0], move): fen for move, fen in REPLIES.items()}}
+
+
+def client_fen(fen):
+    # the client sends every board with the same side to move, castling rights and clocks
+    return fen.split()[0] + " b KQkq - 0 1"
+
+
+def fake_play(fen, color, from_position, to_position):
+    return PLAYED.get((fen.split()[0], from_position + to_position))
+
+
+def make_analyser(monkeypatch, tactics=((fork, "white", "Fork"),), **kwargs):
+    monkeypatch.setattr(speculation, "play", fake_play)
+    kwargs.setdefault("cpu_share", 1.0)
+    return SpeculativeAnalyser(FakeRecorder(MOVES), list(tactics), **kwargs)
+
+
+class CountingSession:
+    def __init__(self, transactions):
+        self.transactions = transactions
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute_write(self, tx_function, *args):
+        self.transactions.append(tx_function)
+        tx_function(RecordingTx(self.transactions), *args)
+
+
+class RecordingTx:
+    def __init__(self, transactions):
+        self.transactions = transactions
+
+    def run(self, query, **params):
+        self.transactions.append(query)
+
+
+def test_top_replies_are_recorded_and_replayed_in_one_transaction(monkeypatch):
+    analyser = make_analyser(monkeypatch, replies=2)
+
+    analyser.run(0, E4, "black")
+
+    assert analyser.stats()["analysed"] == 2
+    assert analyser.take(client_fen(REPLIES["g8f6"])) is not None
+    assert analyser.take(REPLIES["e7e5"]) is not None
+    assert analyser.take(REPLIES["d7d5"]) is None
+    assert analyser.take("not a fen") is None
+    assert analyser.recorder.fens[-1] == E4
+
+    transactions = []
+    graph = InferenceGraph("bolt://stub", "user", "pass")
+    graph.driver = type("Driver", (), {"session": lambda self: CountingSession(transactions)})()
+    graph.replay(analyser.take(REPLIES["g8f6"]))
+
+    assert callable(transactions[0])
+    assert len([item for item in transactions if callable(item)]) == 1
+    assert any("DETACH DELETE" in item.upper() for item in transactions if isinstance(item, str))
+
+
+def test_a_new_move_cancels_the_speculation(monkeypatch):
+    def cancelling_tactic(symbolic, color):
+        analyser.cancel()
+
+    analyser = make_analyser(monkeypatch, tactics=[(cancelling_tactic, "white", "Cancel"), (fork, "white", "Fork")])
+    analyser.run(0, E4, "black")
+
+    stats = analyser.stats()
+    assert stats["cancelled"] == 1
+    assert stats["analysed"] == 0
+    assert stats["cached"] == 0
+
+
+def test_speculation_waits_for_requests_in_flight(monkeypatch):
+    analyser = make_analyser(monkeypatch, replies=1)
+
+    analyser.pause()
+    analyser.speculate(E4, "black")
+    time.sleep(0.05)
+    assert analyser.stats()["analysed"] == 0
+
+    analyser.resume()
+    deadline = time.monotonic() + 5
+    while analyser.stats()["analysed"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert analyser.stats()["analysed"] == 1
+
+
+def test_worker_sleeps_to_stay_under_its_cpu_share(monkeypatch):
+    sleeps = []
+    clock = itertools.count()
+    monkeypatch.setattr(speculation.time, "perf_counter", lambda: float(next(clock)))
+    monkeypatch.setattr(speculation.time, "sleep", sleeps.append)
+    analyser = make_analyser(monkeypatch, replies=1, cpu_share=0.25)
+
+    analyser.run(0, E4, "black")
+
+    assert sleeps and all(duration == 3.0 for duration in sleeps)
+
+
+def test_position_key_is_the_piece_placement():
+    assert position_key("8/8/8/8/8/8/8/K7 w - - 0 1") == position_key("8/8/8/8/8/8/8/K7 b KQkq - 12 40") == "8/8/8/8/8/8/8/K7"
+
+
+def test_make_move_and_set_fen_replay_the_speculated_reply(monkeypatch, server_routes):
+    symbolic = server_routes.symbolic
+    analyser = make_analyser(monkeypatch)
+    speculated = []
+    monkeypatch.setattr(analyser, "speculate", lambda fen, player: speculated.append((fen, player)))
+    monkeypatch.setattr(server_routes.module, "speculator", analyser)
+    monkeypatch.setattr(server_routes.module, "play", fake_play)
+
+    def move(fen, color, from_position, to_position):
+        json = {"fen_string": client_fen(fen), "piece": "pawn", "color": color, "from_position": from_position, "to_position": to_position}
+        return server_routes.call("make_move", json=json)
+
+    move(START, "white", "e2", "e4")
+    assert speculated == [(E4, "black")]
+    assert symbolic.builds() == ["construct_graph", "add_tactics_to_graph"]
+
+    analyser.cache.set(position_key(REPLIES["e7e5"]), ["recorded"])
+    symbolic.calls.clear()
+    move(E4, "black", "e7", "e5")
+
+    assert symbolic.graph.replayed == [["recorded"]]
+    assert symbolic.builds() == []
+    assert speculated[-1] == (REPLIES["e7e5"], "white")
+
+    server_routes.call("set_fen", json={"fen_string": client_fen(REPLIES["e7e5"])})
+
+    assert symbolic.graph.replayed == [["recorded"], ["recorded"]]
+    assert symbolic.builds() == []
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import importlib
+import json
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from server.streaming import FinalAnswerStreamer, sse  # noqa: E402
+
+
+def test_streamer_only_forwards_the_final_answer():
+    tokens = []
+    streamer = FinalAnswerStreamer(tokens.append)
+
+    streamer.on_chat_model_start()
+    for token in ["Thought: I know", " the answer\n", "Final", " Answer: The", " white", " knight"]:
+        streamer.on_llm_new_token(token)
+
+    assert "".join(tokens) == "The white knight"
+
+    # a new LLM call of the agent starts hidden again
+    streamer.on_chat_model_start()
+    streamer.on_llm_new_token("Thought: again")
+    assert "".join(tokens) == "The white knight"
+
+
+def test_sse_format():
+    assert sse("token", {"text": "e4"}) == 'event: token\ndata: {"text": "e4"}\n\n'
+
+
+class StreamingApp:
+    def stream(self, inputs):
+        yield {"main_agent": {"status": "Reinforced Agent"}}
+        for token in ["The white", " pawn"]:
+            inputs["on_token"](token)
+        yield {"commentary_agent": {"commentary_agent_outcome": "The white pawn"}}
+        yield {"reflex_checkpoint": {"status": "End", "final_answer": "The white pawn.", "stop_reason": "verified"}}
+
+
+def test_chat_stream_yields_nodes_tokens_and_the_answer(monkeypatch):
+    pipeline = importlib.reload(importlib.import_module("server.pipeline"))
+    monkeypatch.setattr(pipeline, "app", StreamingApp())
+
+    events = list(pipeline.chat_stream("Comment on the position", "8/8/8/8/4P3/8/8/8 w - - 0 1"))
+
+    assert events == [
+        ("node", {"node": "main_agent", "status": "Reinforced Agent"}),
+        ("token", {"text": "The white"}),
+        ("token", {"text": " pawn"}),
+        ("node", {"node": "commentary_agent", "status": None}),
+        ("node", {"node": "reflex_checkpoint", "status": "End"}),
+        ("done", {"answer": "The white pawn.", "reflex_iterations": 0, "stop_reason": "verified"}),
+    ]
+
+
+class EndlessApp:
+    def __init__(self):
+        self.nodes = 0
+
+    def stream(self, inputs):
+        while True:
+            self.nodes += 1
+            yield {"reflex_checkpoint": {"status": "Reflex", "reflex_iterations": self.nodes}}
+            time.sleep(0.01)
+
+
+def test_closing_the_stream_stops_the_pipeline(monkeypatch):
+    pipeline = importlib.reload(importlib.import_module("server.pipeline"))
+    monkeypatch.setattr(pipeline, "STREAM_QUEUE_SIZE", 2)
+    app = EndlessApp()
+    monkeypatch.setattr(pipeline, "app", app)
+
+    stream = pipeline.chat_stream("Comment on the position", "8/8/8/8/4P3/8/8/8 w - - 0 1")
+    assert next(stream)[0] == "node"
+    stream.close()
+
+    time.sleep(0.2)
+    nodes = app.nodes
+    time.sleep(0.2)
+    assert app.nodes == nodes
+
+
+def test_generate_commentary_streams_through_the_callbacks(monkeypatch):
+    pipeline = importlib.reload(importlib.import_module("server.pipeline"))
+    calls = []
+    monkeypatch.setattr(pipeline, "generate_response", lambda prompt, callbacks=None: calls.append(callbacks) or "ok")
+
+    pipeline.generate_commentary({"input": "q", "status": "Reinforced Agent"})
+    pipeline.generate_commentary({"input": "q", "status": "Reinforced Agent", "on_token": print})
+
+    assert calls[0] is None
+    assert isinstance(calls[1][0], FinalAnswerStreamer)
+
+
+def test_stream_route_emits_server_sent_events(monkeypatch):
+    from server import server as server_module
+
+    monkeypatch.setattr(server_module.request, "json", {"prompt": "q", "fen": "fen"}, raising=False)
+    monkeypatch.setattr(server_module.request, "headers", {"X-Client-Id": "streaming-client"}, raising=False)
+    monkeypatch.setattr(
+        server_module,
+        "chat_stream",
+        lambda input, fen_string: (event for event in [("token", {"text": "e4"}), ("done", {"answer": "e4"})]),
+    )
+
+    response = server_module.stream_message_with_reinforced_chatbot()
+    body = list(response.response)
+
+    assert response.kwargs["mimetype"] == "text/event-stream"
+    assert body[0].startswith("event: token\n")
+    assert json.loads(body[1].split("data: ")[1]) == {"answer": "e4"}
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from server.neurosymbolicAI import verifier_ai  # noqa: E402
+
+
+class FakeMessage:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeLLM:
+    def __init__(self, payload):
+        self.payload = payload
+        self.prompts = []
+
+    def invoke(self, prompt):
+        self.prompts.append(prompt)
+        return FakeMessage(json.dumps(self.payload))
+
+
+class FakePrompt:
+    def format(self, **kwargs):
+        return f"claims for: {kwargs['input']}"
+
+
+class JsonParser:
+    def parse(self, text):
+        return json.loads(text)
+
+
+class FakeGraph:
+    def verify_move_feature(self, piece1, color1, position1, piece2, color2, position2, move, feature):
+        return [{"piece": piece1}]
+
+
+@pytest.fixture
+def verifier(monkeypatch):
+    def no_kor(*args, **kwargs):
+        raise AssertionError("verify_commentary must not build per-statement Kor chains")
+
+    monkeypatch.setattr(verifier_ai, "create_extraction_chain", no_kor)
+    instance = verifier_ai.Verifier()
+    instance.claims_prompt = FakePrompt()
+    instance.claims_parser = JsonParser()
+    # the LLM extraction path; rule-based extraction is covered in test_claim_rules.py
+    instance.rule_extraction = False
+    instance.sym.graph = FakeGraph()
+    instance.sym.verify_position = lambda piece, color, position: [{}] if (piece, color, position) == ("king", "white", "g1") else []
+    instance.sym.verify_relation = lambda *args: [{}]
+    return instance
+
+
+PAYLOAD = {
+    "positions": [
+        {"statement": "The white king is on g1", "piece": "King", "color": "white", "position": "g1"},
+        {"statement": "The black queen is on h4", "piece": "queen", "color": "black", "position": "h4"},
+    ],
+    "relations": [
+        {
+            "statement": "The white rook at a1 defends the white pawn at a2",
+            "piece": "rook", "color": "white", "position": "a1", "relation": "defend",
+            "ally_piece": "pawn", "ally_color": "white", "ally_position": "a2",
+        },
+    ],
+    "move_features": [
+        {
+            "statement": "The white knight move from g1 to f3 threatens the black pawn at e5",
+            "piece": "knight", "color": "white", "position": "g1", "move": "f3", "feature": "move_threat",
+            "opponent_piece": "pawn", "opponent_color": "black", "opponent_position": "e5",
+        },
+    ],
+}
+
+
+def test_extract_claims_uses_one_call_and_fills_missing_fields(verifier):
+    verifier.llm = FakeLLM({"positions": [{"statement": "A king is on e4", "piece": "king", "position": "e4"}]})
+
+    claims = verifier.extract_claims("A king is on e4.")
+
+    assert verifier.llm.prompts == ["claims for: A king is on e4."]
+    assert claims["positions"] == [{"statement": "A king is on e4", "piece": "king", "color": "N/A", "position": "e4"}]
+    assert claims["relations"] == []
+    assert claims["move_features"] == []
+
+
+def test_verify_commentary_checks_every_claim_in_order(verifier):
+    verifier.llm = FakeLLM(PAYLOAD)
+
+    result = verifier.verify_commentary("commentary")
+
+    assert len(verifier.llm.prompts) == 1
+    assert result == [
+        {"statement": "The white king is on g1", "condition": True},
+        {"statement": "The black queen is on h4", "condition": False},
+        {"statement": "The white rook at a1 defends the white pawn at a2", "condition": True},
+        {"statement": "The white knight move from g1 to f3 threatens the black pawn at e5", "condition": True},
+    ]
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from server.neurosymbolicAI import verifier_ai  # noqa: E402
+
+
+class SlowPositionChain:
+    '''
+    Kor chain stand-in that answers later statements faster, so a concurrent
+    run finishes out of order unless the verifier restores statement order.
+    '''
+
+    def __init__(self, positions):
+        self.positions = positions
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def invoke(self, statement):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        index = list(self.positions).index(statement)
+        time.sleep(0.02 * (len(self.positions) - index))
+        with self.lock:
+            self.active -= 1
+        piece = json.dumps(self.positions[statement]).replace('"', "'")
+        return {"text": {"raw": json.dumps({"position schema": {"piece": [piece]}})}}
+
+
+class StubAgentExecutor:
+    def __init__(self, output):
+        self.output = output
+
+    def invoke(self, payload):
+        return {"output": self.output}
+
+
+@pytest.fixture
+def verifier(monkeypatch):
+    positions = {
+        "The white king is on g1.": {"piece": "king", "color": "white", "position": "g1"},
+        "The white queen is on d1.": {"piece": "queen", "color": "white", "position": "d1"},
+        "The black rook is on a8.": {"piece": "rook", "color": "black", "position": "a8"},
+        "The black queen is on h4.": {"piece": "queen", "color": "black", "position": "h4"},
+    }
+    chain = SlowPositionChain(positions)
+    monkeypatch.setattr(verifier_ai, "create_extraction_chain", lambda *args, **kwargs: chain)
+
+    instance = verifier_ai.Verifier()
+    statements = {f"statement_{index + 1}": text for index, text in enumerate(positions)}
+    instance.agent_executor = StubAgentExecutor(json.dumps({"statements": statements}))
+    on_board = {("king", "white", "g1"), ("queen", "white", "d1"), ("rook", "black", "a8")}
+    instance.sym.verify_position = lambda piece, color, position: [{}] if (piece, color, position) in on_board else []
+    return instance, chain
+
+
+def test_statements_are_checked_concurrently_in_order(verifier):
+    instance, chain = verifier
+    instance.max_concurrency = 4
+
+    result = instance.verify_piece_position("commentary")
+
+    assert result == [
+        {"statement": "The white king is on g1.", "condition": True},
+        {"statement": "The white queen is on d1.", "condition": True},
+        {"statement": "The black rook is on a8.", "condition": True},
+        {"statement": "The black queen is on h4.", "condition": False},
+    ]
+    assert chain.peak > 1
+
+
+def test_concurrency_limit_of_one_runs_sequentially(verifier):
+    instance, chain = verifier
+    instance.max_concurrency = 1
+
+    result = instance.verify_piece_position("commentary")
+
+    assert [item["condition"] for item in result] == [True, True, True, False]
+    assert chain.peak == 1